@@ -302,13 +302,15 @@ class GpuPlugin(HHDPlugin):
             self.emit({"type": "settings"})
         self.enabled = enabled
 
-        if self.ppd_conflict and conf.get("tdp.amd_energy.enable", False):
-            conf["tdp.amd_energy.enable"] = False
-            conf["hhd.steamos.gpu_status"] = "conflict"
+        energy = conf.view("tdp.amd_energy")
+        steamos = conf.view("hhd.steamos")
+        if self.ppd_conflict and energy.get("enable", False):
+            energy["enable"] = False
+            steamos["gpu_status"] = "conflict"
             self.emit({"type": "settings"})
 
         if not self.initialized:
-            conf["hhd.steamos.gpu_status"] = "disabled"
+            steamos["gpu_status"] = "disabled"
             return
 
         new_ppd = conf["hhd.settings.amd_energy_ppd"].to(bool)
@@ -332,7 +334,7 @@ class GpuPlugin(HHDPlugin):
         if queue:
             self.queue = None
 
-        if conf["tdp.amd_energy.mode.mode"].to(str) == "auto":
+        if energy["mode.mode"].to(str) == "auto":
             if self.target != self.old_target:
                 self.old_target = self.target
                 self.queue = curr + APPLY_DELAY
@@ -376,23 +378,21 @@ class GpuPlugin(HHDPlugin):
         else:
             self.old_target = None
             if self.supports_boost:
-                new_boost = conf["tdp.amd_energy.mode.manual.cpu_boost"].to(bool)
+                new_boost = energy["mode.manual.cpu_boost"].to(bool)
                 if new_boost != self.old_boost or queue:
                     self.old_boost = new_boost
                     try:
                         set_cpu_boost(new_boost == "enabled")
                         set_frequency_scaling(
                             nonlinear=self.supports_nonlinear
-                            and conf.get(
-                                "tdp.amd_energy.mode.manual.cpu_min_freq", None
-                            )
+                            and energy.get("mode.manual.cpu_min_freq", None)
                             == "nonlinear"
                         )
                     except Exception as e:
                         logger.error(f"Failed to set CPU boost:\n{e}")
 
             if self.supports_epp:
-                new_epp = conf["tdp.amd_energy.mode.manual.cpu_pref"].to(str)
+                new_epp = energy["mode.manual.cpu_pref"].to(str)
                 if new_epp != self.old_epp or queue:
                     self.old_epp = new_epp
                     try:
@@ -403,7 +403,7 @@ class GpuPlugin(HHDPlugin):
                         logger.error(f"Failed to set EPP mode:\n{e}")
 
             if self.supports_nonlinear:
-                new_min_freq = conf["tdp.amd_energy.mode.manual.cpu_min_freq"].to(str)
+                new_min_freq = energy["mode.manual.cpu_min_freq"].to(str)
                 if new_min_freq != self.old_min_freq or queue:
                     self.old_min_freq = new_min_freq
                     try:
@@ -420,7 +420,7 @@ class GpuPlugin(HHDPlugin):
                         f"Scheduler from sched_ext '{self.old_sched}' closed with error code: {err}"
                     )
 
-                new_sched = conf.get("tdp.amd_energy.mode.manual.sched", "disabled")
+                new_sched = energy.get("mode.manual.sched", "disabled")
                 if new_sched != self.old_sched:
                     self.close_sched()
                     self.old_sched = new_sched
@@ -434,22 +434,22 @@ class GpuPlugin(HHDPlugin):
 
         if self.supports_freq:
             # Apply GPU settings
-            conf["hhd.steamos.gpu_status"] = "enabled"
-            conf["hhd.steamos.gpu_min"] = self.gpu_freq_min
-            conf["hhd.steamos.gpu_max"] = self.gpu_freq_max
-            new_gpu = conf["tdp.amd_energy.gpu_freq.mode"].to(str)
+            steamos["gpu_status"] = "enabled"
+            steamos["gpu_min"] = self.gpu_freq_min
+            steamos["gpu_max"] = self.gpu_freq_max
+            new_gpu = energy["gpu_freq.mode"].to(str)
 
             # Set gpu frequency and if we switch mode remember it
             if self.gpu_freq_next is not None:
                 new_min, new_max = self.gpu_freq_next
 
                 if new_min == None and new_max == None:
-                    if conf.get("hhd.steamos.gpu_set", False):
+                    if steamos.get("gpu_set", False):
                         new_gpu = "auto"
-                        conf["tdp.amd_energy.gpu_freq.mode"] = new_gpu
-                        conf["hhd.steamos.gpu_set"] = False
+                        energy["gpu_freq.mode"] = new_gpu
+                        steamos["gpu_set"] = False
                 else:
-                    conf["hhd.steamos.gpu_set"] = True
+                    steamos["gpu_set"] = True
                     if (
                         new_gpu == "auto"
                         or (new_gpu != "range" and new_min is not None)
@@ -459,29 +459,29 @@ class GpuPlugin(HHDPlugin):
                             new_gpu = "upper"
                         else:
                             new_gpu = "range"
-                        conf["tdp.amd_energy.gpu_freq.mode"] = new_gpu
+                        energy["gpu_freq.mode"] = new_gpu
                     match new_gpu:
                         case "manual":
-                            conf["tdp.amd_energy.gpu_freq.manual.frequency"] = new_max
+                            energy["gpu_freq.manual.frequency"] = new_max
                         case "upper":
-                            conf["tdp.amd_energy.gpu_freq.upper.frequency"] = new_max
+                            energy["gpu_freq.upper.frequency"] = new_max
                         case "range":
-                            conf["tdp.amd_energy.gpu_freq.range.min"] = new_min
-                            conf["tdp.amd_energy.gpu_freq.range.max"] = new_max
+                            energy["gpu_freq.range.min"] = new_min
+                            energy["gpu_freq.range.max"] = new_max
 
             match new_gpu:
                 case "manual":
-                    f = conf["tdp.amd_energy.gpu_freq.manual.frequency"].to(int)
+                    f = energy["gpu_freq.manual.frequency"].to(int)
                     new_freq = (f, f)
                 case "upper":
-                    f = conf["tdp.amd_energy.gpu_freq.upper.frequency"].to(int)
+                    f = energy["gpu_freq.upper.frequency"].to(int)
                     new_freq = (self.min_freq or f, f)
                 case "range":
-                    min_f = conf["tdp.amd_energy.gpu_freq.range.min"].to(int)
-                    max_f = conf["tdp.amd_energy.gpu_freq.range.max"].to(int)
+                    min_f = energy["gpu_freq.range.min"].to(int)
+                    max_f = energy["gpu_freq.range.max"].to(int)
                     if max_f < min_f:
                         max_f = min_f
-                        conf["tdp.amd_energy.gpu_freq.range.max"] = min_f
+                        energy["gpu_freq.range.max"] = min_f
                     new_freq = (min_f, max_f)
                 case _:
                     new_freq = None
@@ -493,7 +493,7 @@ class GpuPlugin(HHDPlugin):
                 # If the user changed frequency manually, forget
                 # steam set state so it does not reset the settings
                 if self.gpu_freq_next is None:
-                    conf["hhd.steamos.gpu_set"] = False
+                    steamos["gpu_set"] = False
 
             self.gpu_freq_next = None
 
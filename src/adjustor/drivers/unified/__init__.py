@@ -752,10 +752,11 @@ class UnifiedDriverPlugin(HHDPlugin):
             self.startup = True
             return
 
+        u = conf.view("tdp.unified")
         if self.startup and self.full_fan:
             full_fan = get_fwattr_value(self.full_fan)
             if full_fan is not None:
-                conf["tdp.unified.fan_full_speed"] = bool(full_fan)
+                u["fan_full_speed"] = bool(full_fan)
 
         # If not old config, exit, as values can not be set
         if not self.old_conf:
@@ -765,7 +766,7 @@ class UnifiedDriverPlugin(HHDPlugin):
         curr = time.perf_counter()
 
         if self.full_fan:
-            full_fan = conf["tdp.unified.fan_full_speed"].to(bool)
+            full_fan = u["fan_full_speed"].to(bool)
             if full_fan != self.old_conf["fan_full_speed"].to(bool):
                 set_fwattr(self.full_fan, int(full_fan))
 
@@ -783,17 +784,17 @@ class UnifiedDriverPlugin(HHDPlugin):
         assert self.profiles
         if new_tdp:
             mode = "custom"
-            conf["tdp.unified.tdp.mode"] = mode
+            u["tdp.mode"] = mode
         elif system_mode:
             mode = system_mode
             mode_from_system = True
             self.sys_tdp = False
-            conf["tdp.unified.tdp.mode"] = mode
+            u["tdp.mode"] = mode
         elif new_mode:
             mode = new_mode
-            conf["tdp.unified.tdp.mode"] = mode
+            u["tdp.mode"] = mode
         else:
-            mode = conf["tdp.unified.tdp.mode"].to(str)
+            mode = u["tdp.mode"].to(str)
         self.mode = mode
 
         tdp_reset = False
@@ -807,9 +808,9 @@ class UnifiedDriverPlugin(HHDPlugin):
 
         # Show steam message
         if self.sys_tdp:
-            conf["tdp.unified.sys_tdp"] = _("Steam is controlling TDP")
+            u["sys_tdp"] = _("Steam is controlling TDP")
         else:
-            conf["tdp.unified.sys_tdp"] = ""
+            u["sys_tdp"] = ""
 
         #
         # TDP Management
@@ -833,17 +834,17 @@ class UnifiedDriverPlugin(HHDPlugin):
             # Check user changed values
             if new_tdp:
                 steady = new_tdp
-                conf["tdp.unified.tdp.custom.tdp"] = steady
+                u["tdp.custom.tdp"] = steady
             else:
-                steady = conf["tdp.unified.tdp.custom.tdp"].to(int)
+                steady = u["tdp.custom.tdp"].to(int)
 
             # Bounds check
             if steady < self.tdp.pl1[0]:
                 steady = self.tdp.pl1[0]
-                conf["tdp.unified.tdp.custom.tdp"] = steady
+                u["tdp.custom.tdp"] = steady
             elif steady > self.tdp.pl1[2]:
                 steady = self.tdp.pl1[2]
-                conf["tdp.unified.tdp.custom.tdp"] = steady
+                u["tdp.custom.tdp"] = steady
 
             # Update steam text
             steady_updated = steady and steady != self.old_conf["tdp.custom.tdp"].to(
@@ -853,7 +854,7 @@ class UnifiedDriverPlugin(HHDPlugin):
                 self.sys_tdp = False
 
             steady_updated |= tdp_reset
-            boost = conf["tdp.unified.tdp.custom.boost"].to(bool)
+            boost = u["tdp.custom.boost"].to(bool)
             boost_updated = boost != self.old_conf["tdp.custom.boost"].to(bool)
 
             # If yes, queue an update
@@ -910,18 +911,18 @@ class UnifiedDriverPlugin(HHDPlugin):
         #
 
         if self.fan and isinstance(self.fan, ManagedFan):
-            mode = conf["tdp.unified.fan.mode"].to(str)
+            mode = u["fan.mode"].to(str)
             if mode != "disabled":
                 with self.fan_lock:
-                    if conf[f"tdp.unified.fan.{mode}.reset"].to(bool):
-                        conf[f"tdp.unified.fan.{mode}.reset"] = False
+                    if u[f"fan.{mode}.reset"].to(bool):
+                        u[f"fan.{mode}.reset"] = False
                         curve = self.fan.edge if "edge" in mode else self.fan.tctl
                         assert curve, f"Curve is missing for mode '{mode}'. This should not be possible."
                         for k, v in curve:
-                            if f"tdp.unified.fan.{mode}.st{k}" in conf:
-                                conf[f"tdp.unified.fan.{mode}.st{k}"] = v
+                            if f"fan.{mode}.st{k}" in u:
+                                u[f"fan.{mode}.st{k}"] = v
 
-                    for k, v in conf[f"tdp.unified.fan.{mode}"].to(dict).items():
+                    for k, v in u[f"fan.{mode}"].to(dict).items():
                         if not k.startswith("st"):
                             continue
                         self.fan_curve[int(k[2:])] = v / 100
@@ -932,7 +933,7 @@ class UnifiedDriverPlugin(HHDPlugin):
                             if s["in_setpoint"]
                             else f"{s['v_curr']*100:.1f}% → {s['v_target']*100:.1f}%"
                         )
-                        conf[f"tdp.unified.fan.{mode}.info"] = (
+                        u[f"fan.{mode}.info"] = (
                             f"{fan_speed} ({', '.join(map(str, s['v_rpm']))} RPM)\n"
                             + (
                                 f"Tctl: {s['t_junction']:.2f}C, "
@@ -972,14 +973,14 @@ class UnifiedDriverPlugin(HHDPlugin):
         #
 
         elif self.fan and isinstance(self.fan, HwmonFan):
-            fan_mode = conf["tdp.unified.fan.mode"].to(str)
+            fan_mode = u["fan.mode"].to(str)
             fan_enabled = fan_mode == "enabled"
 
             if fan_enabled:
-                if conf["tdp.unified.fan.enabled.reset"].to(bool):
-                    conf["tdp.unified.fan.enabled.reset"] = False
+                if u["fan.enabled.reset"].to(bool):
+                    u["fan.enabled.reset"] = False
                     for temp, speed in self.fan.curve:
-                        conf[f"tdp.unified.fan.enabled.st{temp}"] = speed
+                        u[f"fan.enabled.st{temp}"] = speed
 
                 if self.startup or tdp_reset or tdp_set:
                     self.queue_fan = curr + APPLY_DELAY
@@ -988,9 +989,9 @@ class UnifiedDriverPlugin(HHDPlugin):
                     self.queue_fan = curr + APPLY_DELAY
 
                 for temp, _default_speed in self.fan.curve:
-                    if conf[f"tdp.unified.fan.enabled.st{temp}"].to(
-                        int
-                    ) != self.old_conf[f"fan.enabled.st{temp}"].to(int):
+                    if u[f"fan.enabled.st{temp}"].to(int) != self.old_conf[
+                        f"fan.enabled.st{temp}"
+                    ].to(int):
                         self.queue_fan = curr + APPLY_DELAY
 
                 if self.queue_fan and self.queue_fan < curr:
@@ -998,7 +999,7 @@ class UnifiedDriverPlugin(HHDPlugin):
                         set_hwmon_fan(
                             self.fan,
                             [
-                                conf[f"tdp.unified.fan.enabled.st{temp}"].to(int)
+                                u[f"fan.enabled.st{temp}"].to(int)
                                 for temp, _default_speed in self.fan.curve
                             ],
                         )
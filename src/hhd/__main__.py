@@ -25,6 +25,7 @@ from .plugins import (
     HHDSettings,
     load_relative_yaml,
 )
+from .plugins.conf import keys_overlap
 from .plugins.settings import (
     Validator,
     get_default_state,
@@ -360,6 +361,8 @@ def main():
         profiles = {}
         templates = {}
         conf = Config({})
+        # Config as of the last update loop, None to update all plugins
+        last_conf: Config | None = None
         profile_dir = join(CONFIG_DIR, "profiles")
         os.makedirs(profile_dir, exist_ok=True)
 
@@ -386,6 +389,7 @@ def main():
                 if not initial_run:
                     sleep(INIT_DELAY)
                 initial_run = False
+                last_conf = None
                 set_log_plugin("main")
                 logger.info(f"Reloading configuration.")
 
@@ -421,6 +425,8 @@ def main():
                     if not new_conf:
                         if conf.conf:
                             logger.warning(f"Using previous configuration.")
+                            # Settings may have changed, validate all of it
+                            conf.mark_dirty()
                         else:
                             logger.info(f"Using default configuration.")
                             conf = get_default_state(settings)
@@ -463,7 +469,9 @@ def main():
                     name = fn.replace(".yml", "")
                     s = load_profile_yaml(join(profile_dir, fn))
                     if s:
-                        validate_config(s, settings, validator, use_defaults=False)
+                        validate_config(
+                            s, settings, validator, use_defaults=False, shash=shash
+                        )
                         if name.startswith("_"):
                             templates[name] = s
                         else:
@@ -628,6 +636,7 @@ def main():
                                 settings,
                                 validator,
                                 use_defaults=False,
+                                shash=shash,
                             )
                         else:
                             with lock:
@@ -696,9 +705,10 @@ def main():
                 # Add new defaults
                 conf = Config([parse_defaults(settings), conf.conf])
                 conf.updated = True
+                last_conf = None
 
-            # Validate config
-            validate_config(conf, settings, validator)
+            # Validate config, only the keys written since the last loop
+            validate_config(conf, settings, validator, shash=shash)
 
             #
             # Plugin event loop
@@ -711,8 +721,15 @@ def main():
             # Run prepare loop
             run_plugin_cmd(lambda p: p.prepare(conf), reverse=True)
 
-            # Run update loop
-            run_plugin_cmd(lambda p: p.update(conf))
+            # Run update loop, skipping plugins whose keys did not change
+            changed = last_conf.diff(conf) if last_conf is not None else None
+            last_conf = conf.copy()
+
+            def update(p: HHDPlugin):
+                if changed is None or p.periodic or keys_overlap(changed, p.subscribe):
+                    p.update(conf)
+
+            run_plugin_cmd(update)
 
             set_log_plugin("ukwn")
 
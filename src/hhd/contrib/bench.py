@@ -0,0 +1,618 @@
+"""Benchmarks for the controller hot paths.
+
+Each case drives a decoder, producer, multiplexer, or consumer with synthetic
+reports that mimic a device family and reports the time per operation, the
+CPU utilisation it would add at the target report rate, and the memory each
+operation allocates, as traced by `tracemalloc`:
+ - B/op and blocks/op: allocations that are still alive after the operation
+   (e.g., caches, buffers or leaks), from diffing snapshots taken around a
+   batch of operations.
+ - peak B/op: the transient high-water mark within an operation, which
+   includes the short-lived objects that are freed before it returns.
+
+Virtual devices write to /dev/null and physical ones read from pipes, so the
+syscalls are included but no hardware or root access is needed."""
+
+import argparse
+import gc
+import json
+import os
+import random
+import struct
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, NamedTuple, Sequence
+from unittest.mock import patch
+
+DEFAULT_HZ = 1000
+DEFAULT_THRESHOLD = 1.25
+# Frames cycled through by each case, so caches do not see a single report
+RING_SIZE = 256
+
+
+class Bench(NamedTuple):
+    op: Callable[[], Any]
+    # Operations per controller frame (e.g., decoding all axes of a report)
+    per_frame: float = 1
+    close: Callable[[], Any] | None = None
+
+
+class Result(NamedTuple):
+    name: str
+    ns_op: float
+    bytes_op: float
+    blocks_op: float
+    peak_op: float
+    cpu: float
+
+
+CASES: dict[str, Callable[[], Bench]] = {}
+
+
+def case(name: str):
+    def wrap(fn: Callable[[], Bench]):
+        CASES[name] = fn
+        return fn
+
+    return wrap
+
+
+def ring(fn: Callable[[random.Random], Any], size: int = RING_SIZE):
+    """Returns a function cycling through `size` precomputed values."""
+    rng = random.Random(0)
+    vals = [fn(rng) for _ in range(size)]
+    idx = [0]
+
+    def get():
+        idx[0] = (idx[0] + 1) % size
+        return vals[idx[0]]
+
+    return get
+
+
+class NullUhid:
+    def __init__(self, **_) -> None:
+        self.fd = os.open(os.devnull, os.O_WRONLY)
+
+    def open(self):
+        return self.fd
+
+    def send_input_report(self, rep):
+        os.write(self.fd, rep)
+
+    def read_events(self):
+        return []
+
+    def send_destroy(self):
+        pass
+
+    def close(self):
+        os.close(self.fd)
+
+
+class NullUInput:
+    def __init__(self, **_) -> None:
+        self.fd = os.open(os.devnull, os.O_WRONLY)
+
+    def close(self):
+        os.close(self.fd)
+
+
+#
+# Synthetic input
+#
+
+
+def legion_go_report(rng: random.Random) -> bytes:
+    rep = bytearray(64)
+    rep[0] = 0x04
+    rep[2] = 0x74
+    # Sticks, triggers
+    for i in range(14, 18):
+        rep[i] = rng.randrange(256)
+    rep[22] = rng.randrange(256)
+    rep[23] = rng.randrange(256)
+    # Buttons, mostly idle
+    if rng.random() < 0.1:
+        rep[19] = 1 << rng.randrange(8)
+    # Both IMUs
+    rep[34] = rng.randrange(256)
+    rep[47] = rng.randrange(256)
+    for i in range(35, 47):
+        rep[i] = rng.randrange(256)
+    for i in range(48, 60):
+        rep[i] = rng.randrange(256)
+    return bytes(rep)
+
+
+def legion_go_s_report(rng: random.Random) -> bytes:
+    rep = bytearray(64)
+    if rng.random() < 0.1:
+        rep[1] = 1 << rng.randrange(8)
+    for i in range(14, 26):
+        rep[i] = rng.randrange(256)
+    return bytes(rep)
+
+
+def gamepad_frame(rng: random.Random) -> list[tuple[str, str, Any]]:
+    """A frame as the multiplexer sees it: sticks, triggers, IMU and rare
+    button presses, about 20 events."""
+    out: list[tuple[str, str, Any]] = [
+        ("axis", c, rng.uniform(-1, 1)) for c in ("ls_x", "ls_y", "rs_x", "rs_y")
+    ]
+    out += [("axis", c, rng.random()) for c in ("lt", "rt")]
+    for _ in range(2):
+        out += [("axis", f"gyro_{a}", rng.uniform(-3, 3)) for a in "xyz"]
+        out += [("axis", f"accel_{a}", rng.uniform(-10, 10)) for a in "xyz"]
+        out.append(("axis", "imu_ts", rng.randrange(1 << 32)))
+    if rng.random() < 0.1:
+        out.append(("button", rng.choice(["a", "b", "x", "y"]), rng.random() < 0.5))
+    return out
+
+
+def events(frame: Sequence[tuple[str, str, Any]]) -> list:
+    return [{"type": t, "code": c, "value": v} for t, c, v in frame]
+
+
+#
+# Cases
+#
+
+
+@case("codec.decode_axis[legion_go]")
+def _():
+    from hhd.controller.lib.common import decode_axis
+    from hhd.device.legion_go.tablet.const import LGO_RAW_INTERFACE_AXIS_MAP
+
+    maps = list(LGO_RAW_INTERFACE_AXIS_MAP[0x74].values())
+    rep = ring(legion_go_report)
+
+    def op():
+        r = rep()
+        for m in maps:
+            decode_axis(r, m)
+
+    return Bench(op)
+
+
+@case("codec.get_button[legion_go]")
+def _():
+    from hhd.controller.lib.common import get_button
+    from hhd.device.legion_go.tablet.const import LGO_RAW_INTERFACE_BTN_MAP
+
+    maps = list(LGO_RAW_INTERFACE_BTN_MAP[0x74].values())
+    rep = ring(legion_go_report)
+
+    def op():
+        r = rep()
+        for m in maps:
+            get_button(r, m)
+
+    return Bench(op)
+
+
+@case("codec.encode_axis[dualsense]")
+def _():
+    from hhd.controller.lib.common import encode_axis
+    from hhd.controller.virtual.dualsense.const import DS5_BT_AXIS_MAP
+
+    maps = list(DS5_BT_AXIS_MAP.values())
+    buf = bytearray(128)
+    val = ring(lambda rng: rng.uniform(-1, 1))
+
+    def op():
+        for m in maps:
+            try:
+                encode_axis(buf, m, val())
+            except OverflowError:
+                pass
+
+    return Bench(op)
+
+
+def _hidraw_dev(btn_map, axis_map, config_map, report):
+    """Returns a hidraw producer reading from a pipe, a function that writes
+    the next report to it and one that closes both."""
+    from hhd.controller.lib.hid import Device
+    from hhd.controller.physical.hidraw import GenericGamepadHidraw
+
+    r, w = os.pipe()
+    d = GenericGamepadHidraw(
+        btn_map=btn_map, axis_map=axis_map, config_map=config_map, report_size=64
+    )
+    # The pipe stands in for the hidraw node
+    d.dev = Device(path=f"/proc/self/fd/{r}".encode())
+    d.fd = d.dev.fd
+    d.setup_decode()
+    rep = ring(report)
+
+    def close():
+        d.close(True)
+        os.close(r)
+        os.close(w)
+
+    return d, lambda: os.write(w, rep()), close
+
+
+def _hidraw(btn_map, axis_map, config_map, report):
+    d, write, close = _hidraw_dev(btn_map, axis_map, config_map, report)
+    fds = [d.fd]
+
+    def op():
+        write()
+        d.produce(fds)
+
+    return Bench(op, close=close)
+
+
+def _legion_go_dev():
+    from hhd.device.legion_go.tablet.const import (
+        LGO_RAW_INTERFACE_AXIS_MAP,
+        LGO_RAW_INTERFACE_BTN_MAP,
+        LGO_RAW_INTERFACE_CONFIG_MAP,
+    )
+
+    return _hidraw_dev(
+        LGO_RAW_INTERFACE_BTN_MAP,
+        LGO_RAW_INTERFACE_AXIS_MAP,
+        LGO_RAW_INTERFACE_CONFIG_MAP,
+        legion_go_report,
+    )
+
+
+@case("hidraw.produce[legion_go]")
+def _():
+    d, write, close = _legion_go_dev()
+    fds = [d.fd]
+
+    def op():
+        write()
+        d.produce(fds)
+
+    return Bench(op, close=close)
+
+
+@case("hidraw.produce[legion_go_s]")
+def _():
+    from hhd.device.legion_go.slim.const import (
+        GOS_INTERFACE_AXIS_MAP,
+        GOS_INTERFACE_BTN_MAP,
+    )
+
+    return _hidraw(
+        {None: GOS_INTERFACE_BTN_MAP},
+        {None: GOS_INTERFACE_AXIS_MAP},
+        {},
+        legion_go_s_report,
+    )
+
+
+@case("evdev.decode[xbox]")
+def _():
+    from hhd.controller.lib.record import RawInputEvent
+    from hhd.controller.physical.evdev import (
+        B,
+        XBOX_AXIS_MAP,
+        XBOX_BUTTON_MAP,
+        GenericGamepadEvdev,
+    )
+
+    d = GenericGamepadEvdev([], [], btn_map=XBOX_BUTTON_MAP, axis_map=XBOX_AXIS_MAP)
+    axes = list(XBOX_AXIS_MAP)
+    d.replay_open({"ranges": [(a, (-32768, 32767)) for a in axes]})
+    btns = [b for b in XBOX_BUTTON_MAP if b != B("KEY_LEFTMETA")]
+
+    def frame(rng: random.Random):
+        evs = [
+            RawInputEvent(B("EV_ABS"), a, rng.randrange(-32768, 32767))
+            for a in rng.sample(axes, 4)
+        ]
+        if rng.random() < 0.1:
+            evs.append(RawInputEvent(B("EV_KEY"), rng.choice(btns), 1))
+        evs.append(RawInputEvent(0, 0, 0))
+        return evs
+
+    evs = ring(frame)
+    return Bench(lambda: d.decode(evs(), 0))
+
+
+def _iio_dev():
+    """Returns an IIO reader for a BMI323 reading from a pipe, a function that
+    writes the next scan to it and one that closes both."""
+    from hhd.controller.physical.imu import DeviceInfo, IioReader, ScanElement
+
+    def se(axis, bits):
+        return ScanElement(axis, "little", True, bits, bits, 0, 0.001, 0, None)
+
+    dev = DeviceInfo(
+        "",
+        [se(f"accel_{a}", 16) for a in "xyz"]
+        + [se(f"gyro_{a}", 16) for a in "xyz"]
+        + [se("imu_ts", 64)],
+        "",
+    )
+    d = IioReader([], [], None, None, {})
+    d.setup_decode(dev)
+    r, w = os.pipe()
+    d.fd = r
+    scan = ring(
+        lambda rng: struct.pack(
+            "<6h4xq", *(rng.randrange(-(1 << 15), 1 << 15) for _ in range(6)), 0
+        )
+    )
+
+    def close():
+        d.dev = None
+        os.close(r)
+        os.close(w)
+
+    return d, lambda: os.write(w, scan()), close
+
+
+@case("iio.produce[bmi323]")
+def _():
+    d, write, close = _iio_dev()
+    fds = [d.fd]
+
+    def op():
+        write()
+        d.produce(fds)
+
+    return Bench(op, close=close)
+
+
+def _mux(**kwargs):
+    from hhd.controller import Multiplexer
+
+    return Multiplexer(
+        trigger="analog_to_discrete",
+        dpad="analog_to_discrete",
+        share_to_qam=True,
+        startselect_chord="select",
+        **kwargs,
+    )
+
+
+@case("runtime.frame[legion_go]")
+def _():
+    from hhd.controller.runtime import ControllerRuntime
+
+    ctrl, write_ctrl, close_ctrl = _legion_go_dev()
+    imu, write_imu, close_imu = _iio_dev()
+    rt = ControllerRuntime(_mux())
+    # The producers are already open
+    for d in (ctrl, imu):
+        rt.devs.append(d)
+        rt.register([d.fd], d)
+    fds = [ctrl.fd, imu.fd]
+
+    def op():
+        write_ctrl()
+        write_imu()
+        rt.process(rt.produce(fds))
+
+    def close():
+        rt.devs = []
+        rt.close(True)
+        close_ctrl()
+        close_imu()
+
+    return Bench(op, close=close)
+
+
+@case("multiplexer.process[plain]")
+def _():
+    mux = _mux()
+    frame = ring(gamepad_frame)
+    return Bench(lambda: mux.process(events(frame())))
+
+
+@case("multiplexer.process[qam]")
+def _():
+    mux = _mux(qam_button="mode", qam_multi_tap=True)
+
+    def frame(rng: random.Random):
+        out = gamepad_frame(rng)
+        # Taps and holds of the QAM button
+        if rng.random() < 0.05:
+            out.append(("button", "mode", rng.random() < 0.5))
+        return out
+
+    frames = ring(frame)
+    return Bench(lambda: mux.process(events(frames())))
+
+
+@case("multiplexer.process[intercept]")
+def _():
+    from hhd.controller import ControllerEmitter
+
+    emit = ControllerEmitter()
+    emit.register_intercept(lambda cid, evs: None)
+    mux = _mux(emit=emit)
+    frame = ring(gamepad_frame)
+
+    def op():
+        # Keep the grab from timing out
+        emit.grab(True)
+        mux.process(events(frame()))
+
+    return Bench(op)
+
+
+def _consumer(dev, module, name, fake):
+    with patch.object(module, name, fake):
+        dev.open()
+    dev.available = True
+    frames = ring(lambda rng: events(gamepad_frame(rng)))
+
+    return Bench(
+        lambda: dev.consume(frames()), close=lambda: dev.close(True, in_cache=True)
+    )
+
+
+@case("dualsense.consume")
+def _():
+    from hhd.controller.virtual import dualsense
+
+    return _consumer(
+        dualsense.Dualsense(edge_mode=True, use_bluetooth=True, cache=False),
+        dualsense,
+        "UhidDevice",
+        NullUhid,
+    )
+
+
+@case("sd.consume")
+def _():
+    from hhd.controller.virtual import sd
+
+    return _consumer(
+        sd.SteamdeckController(pid=0x12FF, name="Steam Controller (HHD)"),
+        sd,
+        "UhidDevice",
+        NullUhid,
+    )
+
+
+@case("uinput.consume")
+def _():
+    from hhd.controller.virtual import uinput
+
+    return _consumer(uinput.UInputDevice(), uinput, "UInputMonkey", NullUInput)
+
+
+#
+# Runner
+#
+
+
+def measure(name: str, iterations: int, hz: float) -> Result:
+    b = CASES[name]()
+    try:
+        for _ in range(max(iterations // 10, 1)):
+            b.op()
+
+        gc.collect()
+        start = time.perf_counter_ns()
+        for _ in range(iterations):
+            b.op()
+        ns_op = (time.perf_counter_ns() - start) / iterations
+
+        # Allocations are measured separately, tracing is slow
+        n = max(min(iterations // 10, 500), 1)
+        tracemalloc.start()
+        try:
+            gc.collect()
+            before = tracemalloc.take_snapshot()
+            for _ in range(n):
+                b.op()
+            gc.collect()
+            after = tracemalloc.take_snapshot()
+
+            peak = 0
+            for _ in range(n):
+                tracemalloc.reset_peak()
+                curr, _ = tracemalloc.get_traced_memory()
+                b.op()
+                peak += tracemalloc.get_traced_memory()[1] - curr
+        finally:
+            tracemalloc.stop()
+    finally:
+        if b.close:
+            b.close()
+
+    # Ignore the snapshots and this module
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__, all_frames=True)]
+    stats = after.filter_traces(filters).compare_to(
+        before.filter_traces(filters), "traceback"
+    )
+    size = sum(s.size_diff for s in stats if s.size_diff > 0)
+    blocks = sum(s.count_diff for s in stats if s.count_diff > 0)
+
+    cpu = ns_op * b.per_frame * hz / 1e9 * 100
+    return Result(name, ns_op, size / n, blocks / n, peak / n, cpu)
+
+
+def compare(
+    results: Sequence[Result], baseline: dict[str, float], threshold: float
+) -> list[str]:
+    """Returns the cases slower than `threshold` times the baseline ns/op."""
+    out = []
+    for r in results:
+        base = baseline.get(r.name)
+        if base and r.ns_op > base * threshold:
+            out.append(r.name)
+    return out
+
+
+def bench(args: Sequence[str]):
+    parser = argparse.ArgumentParser(
+        prog="hhd.contrib bench",
+        description="Benchmarks the controller hot paths.",
+    )
+    parser.add_argument("cases", nargs="*", help="Substrings of cases to run.")
+    parser.add_argument("-n", "--iterations", type=int, default=20000)
+    parser.add_argument(
+        "--hz", type=float, default=DEFAULT_HZ, help="Report rate for the CPU %%."
+    )
+    parser.add_argument("--save", help="Writes the results to a JSON file.")
+    parser.add_argument(
+        "--baseline",
+        help="JSON file from --save. Exits with 1 if a case regressed.",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Slowdown over the baseline considered a regression.",
+    )
+    parser.add_argument("--list", action="store_true", help="Lists the cases.")
+    opts = parser.parse_args(args)
+
+    names = [n for n in CASES if not opts.cases or any(c in n for c in opts.cases)]
+    if opts.list:
+        print("\n".join(names))
+        return 0
+
+    baseline = {}
+    if opts.baseline:
+        with open(opts.baseline) as f:
+            baseline = {k: v["ns_op"] for k, v in json.load(f)["results"].items()}
+
+    print(
+        f"{'case':40s} {'ns/op':>10s} {'B/op':>8s} {'blocks/op':>10s}"
+        + f" {'peak B/op':>10s} {f'CPU@{opts.hz:g}Hz':>12s}"
+    )
+    results = []
+    for name in names:
+        r = measure(name, opts.iterations, opts.hz)
+        results.append(r)
+        change = ""
+        if r.name in baseline:
+            change = f" ({r.ns_op / baseline[r.name] - 1:+.0%})"
+        print(
+            f"{r.name:40s} {r.ns_op:10.0f} {r.bytes_op:8.0f} {r.blocks_op:10.1f}"
+            + f" {r.peak_op:10.0f} {r.cpu:11.2f}%{change}"
+        )
+
+    if opts.save:
+        with open(opts.save, "w") as f:
+            json.dump(
+                {
+                    "python": sys.version,
+                    "hz": opts.hz,
+                    "results": {r.name: r._asdict() for r in results},
+                },
+                f,
+                indent=2,
+            )
+
+    if baseline:
+        slow = compare(results, baseline, opts.threshold)
+        if slow:
+            print(f"\nRegressed by more than {opts.threshold - 1:.0%}:")
+            for n in slow:
+                print(f" - {n}")
+            return 1
+    return 0
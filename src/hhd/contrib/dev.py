@@ -280,3 +280,64 @@ def hidraw(dev: str | None, *cmds: str):
         prev = curr
         print(f"{i:6d}: {curr:8.4f}s ({hz})", d.read().hex())
         sleep(0.0005)
+
+
+def record(kind: str, dev: str | None, fn: str | None = None):
+    """Records the raw reads of an evdev or hidraw device to a log that can
+    be replayed with `hhd.controller.lib.record.ReplayProducer`."""
+    import os
+    import select
+    import time
+
+    from hhd.controller.lib.record import Recorder, pack_input_events
+
+    if not dev:
+        print(f"Usage: {kind} record <device path or #> [output file]")
+        return
+
+    prefix = "/dev/input/event" if kind == "evdev" else "/dev/hidraw"
+    try:
+        sel = f"{prefix}{int(dev)}"
+    except Exception:
+        sel = dev
+    if not fn:
+        fn = f"{kind}-{os.path.basename(sel)}-{int(time.time())}.hhdrec"
+
+    if kind == "evdev":
+        from evdev import InputDevice, ecodes
+
+        d = InputDevice(sel)
+        absinfo = d.capabilities().get(ecodes.EV_ABS, [])
+        meta = {
+            "name": d.name,
+            "vendor": d.info.vendor,
+            "product": d.info.product,
+            "ranges": [(a, (i.min, i.max)) for a, i in absinfo],  # type: ignore
+        }
+        fd = d.fd
+        read = lambda: pack_input_events(list(d.read()))
+    else:
+        from hhd.controller.lib.hid import Device, enumerate_unique
+
+        infos = [i for i in enumerate_unique() if i["path"] == sel.encode()]
+        if not infos:
+            print(f"Device '{sel}' not found.")
+            return
+        meta = {
+            k: v.decode() if isinstance(v, bytes) else v for k, v in infos[0].items()
+        }
+        d = Device(path=sel.encode())
+        fd = d.fd
+        read = d.read
+
+    print(f"Recording '{sel}' to '{fn}', press Ctrl+C to stop.")
+    rec = Recorder(fn, kind, meta)
+    try:
+        while True:
+            select.select([fd], [], [])
+            rec.write(read())
+            print(f"\r{rec.count:8d} reads", end="", flush=True)
+    finally:
+        print()
+        rec.close()
+        d.close()
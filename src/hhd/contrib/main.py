@@ -10,13 +10,22 @@ def main():
         "command",
         nargs="+",
         default=[],
-        help="Supported commands: `evdev`, `hidraw`, `gamescope`",
+        help="Supported commands: `evdev`, `hidraw`, `gamescope`, `bench`. "
+        + "Use `evdev record <dev> [file]` or `hidraw record <dev> [file]` "
+        + "to record raw input for replaying.",
     )
-    args = parser.parse_args()
+    # Options after `bench` are parsed by the benchmark
+    args, extra = parser.parse_known_args()
 
     cmds = args.command
+    if extra and cmds[0] != "bench":
+        parser.error(f"unrecognized arguments: {' '.join(extra)}")
     try:
         match cmds[0]:
+            case "evdev" | "hidraw" if len(cmds) > 1 and cmds[1] == "record":
+                from .dev import record
+
+                record(cmds[0], *cmds[2:4])
             case "evdev":
                 from .dev import evdev
 
@@ -28,6 +37,12 @@ def main():
                     hidraw(*cmds[1:])
                 else:
                     hidraw(None)
+            case "bench":
+                import sys
+
+                from .bench import bench
+
+                sys.exit(bench(cmds[1:] + extra))
             case "gamescope":
                 from .gs import gamescope_debug
 
@@ -15,6 +15,7 @@ from .base import (
     RgbCapabilities,
 )
 from .const import Axis, Button, Configuration
+from .runtime import ControllerRuntime, LiveConfig
 
 __all__ = [
     "Axis",
@@ -34,4 +35,6 @@ __all__ = [
     "DEBUG_MODE",
     "RgbMode",
     "RgbCapabilities",
+    "ControllerRuntime",
+    "LiveConfig",
 ]
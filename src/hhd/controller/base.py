@@ -1,3 +1,4 @@
+import heapq
 import logging
 import os
 import random
@@ -529,12 +530,32 @@ class Producer:
         """Called with the file descriptors that are ready to read."""
         return []
 
+    def suspend(self):
+        """Optional method, called when no consumer is available and the
+        producer was marked as suspendable. Its file descriptors stop being
+        polled, so devices that sample on their own (e.g., IIO buffers) should
+        stop doing so here."""
+        pass
+
+    def resume(self) -> Sequence[int] | None:
+        """Optional method, called when a consumer becomes available again.
+        Input queued while suspended is stale and should be discarded here.
+        Returns the new file descriptors, or None to keep the previous ones."""
+        return None
+
+    def next_deadline(self) -> float | None:
+        """Optional method, returns the earliest time (`time.perf_counter()`)
+        at which `produce` has timed work to do (e.g., delayed releases), or
+        None. The controller loop wakes up and calls `produce` in time for it."""
+        return None
+
 
 class Consumer:
     available: bool
-    """Hint that states if the consumer can receive events. If it is false,
-    consumer will not be called. If all consumers are false, producers will
-    be closed to save CPU utilisation."""
+    """Hint that states if the consumer can receive events (e.g., a client
+    has the virtual device open). Consumers that do not set it are not taken
+    into account. If all consumers are false, producers are suspended to
+    save CPU utilisation."""
 
     def initialize(self):
         """Optional method for initialization."""
@@ -543,9 +564,43 @@ class Consumer:
     def consume(self, events: Sequence[Event]):
         pass
 
+    def next_deadline(self) -> float | None:
+        """Optional method, returns the earliest time (`time.perf_counter()`)
+        at which a consumer attached with `always` has queued writes to flush,
+        or None."""
+        return None
+
 
 TouchpadAction = Literal["disabled", "left_click", "right_click"]
 
+RECONFIGURABLE_OPTIONS = frozenset(
+    [
+        "swap_guide",
+        "trigger",
+        "dpad",
+        "share_to_qam",
+        "trigger_discrete_lvl",
+        "touchpad_short",
+        "touchpad_right",
+        "touchpad_hold",
+        "r3_to_share",
+        "select_reboots",
+        "share_reboots",
+        "nintendo_mode",
+        "qam_button",
+        "qam_multi_tap",
+        "qam_no_release",
+        "qam_hhd",
+        "qam_hold",
+        "keyboard_is",
+        "keyboard_no_release",
+        "startselect_chord",
+        # From the output params
+        "noob_mode",
+        "nintendo_qam",
+    ]
+)
+
 
 class Multiplexer:
     QAM_HOLD_TIME = 0.4
@@ -560,6 +615,7 @@ class Multiplexer:
     REBOOT_VIBRATION_NUM = 3
     STEAM_CHECK_INTERVAL = 3
     STARTSELECT_TRIGGER_THRESHOLD = 0.6
+    TOUCHPAD_HOLD_TIME = 0.8
 
     def __init__(
         self,
@@ -619,13 +675,8 @@ class Multiplexer:
         self.touchpad_short = touchpad_short
         self.touchpad_hold = touchpad_hold
         self.touchpad_right = touchpad_right
-        self.reboot_button = None
-        if select_reboots:
-            self.reboot_button = "select"
-            self.reboot_time = self.REBOOT_HOLD_SELECT
-        if share_reboots:
-            self.reboot_button = "share"
-            self.reboot_time = self.REBOOT_HOLD_TURBO
+        self.select_reboots = select_reboots
+        self.share_reboots = share_reboots
         self.r3_to_share = r3_to_share
         self.nintendo_mode = nintendo_mode
         self.emit = emit
@@ -639,17 +690,21 @@ class Multiplexer:
         self.startselect_pressed = None
 
         self.state = {}
+        # Buttons held on the outputs, released before remapping
+        self.held: set[str] = set()
         self.touchpad_x = 0
         self.touchpad_y = 0
         self.touchpad_down = None
-        self.queue: list[tuple[Event | Literal["reboot"], float]] = []
+        # Min-heap of (time, idx, event), idx keeps insertion order for ties
+        self.queue: list[tuple[float, int, Event | Literal["reboot"]]] = []
+        self.queue_idx = 0
         self.reboot_pressed = None
         self.select_is_held = False
         self.reboot_is_held = False
         self.qam_kbd = False
-        self.qam_button = qam_button
-        if share_to_qam:
-            self.qam_button = "share"
+        self.qam_button_opt = qam_button
+        self.share_to_qam = share_to_qam
+        self._set_derived()
         self.has_qam = params.get("has_qam", False)
 
         self.noob_mode = params.get("noob_mode", False)
@@ -690,6 +745,34 @@ class Multiplexer:
         self.supports_qam = params.get("supports_qam", True)
         self.refresh()
 
+    def _set_derived(self):
+        self.reboot_button = None
+        if self.select_reboots:
+            self.reboot_button = "select"
+            self.reboot_time = self.REBOOT_HOLD_SELECT
+        if self.share_reboots:
+            self.reboot_button = "share"
+            self.reboot_time = self.REBOOT_HOLD_TURBO
+        self.qam_button = "share" if self.share_to_qam else self.qam_button_opt
+
+    def reconfigure(self, **options):
+        """Applies constructor options in place, between frames, without
+        resetting the button state. Options that change the capabilities
+        of the controller (e.g., `params`) require a new multiplexer.
+
+        Held buttons are released first, as their release would be remapped."""
+        for ev in self.release():
+            self.schedule(ev, 0)
+        for k, v in options.items():
+            if k not in RECONFIGURABLE_OPTIONS:
+                raise TypeError(f"Option '{k}' can not be changed at runtime.")
+            if k == "qam_button":
+                k = "qam_button_opt"
+            setattr(self, k, v)
+        self._set_derived()
+        if not self.reboot_button:
+            self.reboot_pressed = None
+
     def refresh(self):
         self.unique = str(time.perf_counter_ns())
         if self.emit:
@@ -702,7 +785,60 @@ class Multiplexer:
                 },
             )
 
+    def schedule(self, ev: Event | Literal["reboot"], t: float):
+        """Queues an event to be sent by `process` after time `t`
+        (`time.perf_counter()`)."""
+        heapq.heappush(self.queue, (t, self.queue_idx, ev))
+        self.queue_idx += 1
+
+    def next_deadline(self) -> float | None:
+        """Returns the earliest time (`time.perf_counter()`) at which `process`
+        has timed work to do, such as queued events or QAM presses, or None.
+        Used by the controller loop to wake up in time for it."""
+        deadline = None
+        if self.queue:
+            deadline = self.queue[0][0]
+        if self.qam_pressed:
+            t = self.qam_pressed + self.QAM_HOLD_TIME
+            deadline = t if deadline is None else min(deadline, t)
+        if self.qam_released:
+            t = self.qam_released
+            if self.qam_multi_tap:
+                t += self.QAM_MULTI_PRESS_DELAY
+            deadline = t if deadline is None else min(deadline, t)
+        if self.reboot_pressed:
+            t = self.reboot_pressed + self.reboot_time
+            deadline = t if deadline is None else min(deadline, t)
+        if (
+            self.touchpad_hold != "disabled"
+            and self.touchpad_down
+            and self.touchpad_down[3]
+        ):
+            t = self.touchpad_down[0] + self.TOUCHPAD_HOLD_TIME
+            deadline = t if deadline is None else min(deadline, t)
+        return deadline
+
+    def release(self) -> list[Event]:
+        """Returns releases for the buttons held on the outputs and forgets
+        them, e.g., to send before changing how buttons are mapped."""
+        out: list[Event] = [
+            {"type": "button", "code": code, "value": False} for code in self.held
+        ]
+        self.held = set()
+        return out
+
     def process(self, events: Sequence[Event]) -> Sequence[Event]:
+        out = self._process(events)
+        held = self.held
+        for ev in out:
+            if ev["type"] == "button":
+                if ev["value"]:
+                    held.add(ev["code"])
+                else:
+                    held.discard(ev["code"])
+        return out
+
+    def _process(self, events: Sequence[Event]) -> Sequence[Event]:
         out: list[Event] = []
         status_events = set()
         touched = False
@@ -712,8 +848,8 @@ class Multiplexer:
         curr = time.perf_counter()
 
         # Send old events
-        while len(self.queue) and self.queue[0][1] < curr:
-            ev = self.queue.pop(0)[0]
+        while self.queue and self.queue[0][0] < curr:
+            ev = heapq.heappop(self.queue)[2]
             if ev == "reboot":
                 if self.reboot_is_held:
                     try:
@@ -743,65 +879,56 @@ class Multiplexer:
         if self.reboot_pressed and self.reboot_pressed + self.reboot_time < curr:
             self.reboot_pressed = None
             for i in range(self.REBOOT_VIBRATION_NUM):
-                self.queue.append(
-                    (
-                        {
-                            "type": "rumble",
-                            "code": "main",
-                            "strong_magnitude": self.REBOOT_VIBRATION_STRENGTH,
-                            "weak_magnitude": self.REBOOT_VIBRATION_STRENGTH,
-                            "from_reboot": True,
-                        },  # type: ignore
-                        curr
-                        + i * (self.REBOOT_VIBRATION_ON + self.REBOOT_VIBRATION_OFF),
-                    )
+                self.schedule(
+                    {
+                        "type": "rumble",
+                        "code": "main",
+                        "strong_magnitude": self.REBOOT_VIBRATION_STRENGTH,
+                        "weak_magnitude": self.REBOOT_VIBRATION_STRENGTH,
+                        "from_reboot": True,
+                    },  # type: ignore
+                    curr + i * (self.REBOOT_VIBRATION_ON + self.REBOOT_VIBRATION_OFF),
                 )
-                self.queue.append(
-                    (
-                        {
-                            "type": "rumble",
-                            "code": "main",
-                            "strong_magnitude": 0,
-                            "weak_magnitude": 0,
-                            "from_reboot": True,
-                        },  # type: ignore
-                        curr
-                        + i * (self.REBOOT_VIBRATION_ON + self.REBOOT_VIBRATION_OFF)
-                        + self.REBOOT_VIBRATION_ON,
-                    )
+                self.schedule(
+                    {
+                        "type": "rumble",
+                        "code": "main",
+                        "strong_magnitude": 0,
+                        "weak_magnitude": 0,
+                        "from_reboot": True,
+                    },  # type: ignore
+                    curr
+                    + i * (self.REBOOT_VIBRATION_ON + self.REBOOT_VIBRATION_OFF)
+                    + self.REBOOT_VIBRATION_ON,
                 )
-            self.queue.append(("reboot", curr))
+            self.schedule("reboot", curr)
 
         if (
             self.touchpad_hold != "disabled"
             and self.touchpad_down
             and self.touchpad_down[3]
-            and curr - self.touchpad_down[0] > 0.8
+            and curr - self.touchpad_down[0] > self.TOUCHPAD_HOLD_TIME
         ):
             action = (
                 "touchpad_left"
                 if self.touchpad_hold == "left_click"
                 else "touchpad_right"
             )
-            self.queue.append(
-                (
-                    {
-                        "type": "button",
-                        "code": action,
-                        "value": True,
-                    },
-                    curr,
-                )
+            self.schedule(
+                {
+                    "type": "button",
+                    "code": action,
+                    "value": True,
+                },
+                curr,
             )
-            self.queue.append(
-                (
-                    {
-                        "type": "button",
-                        "code": action,
-                        "value": False,
-                    },
-                    curr + self.QAM_DELAY,
-                )
+            self.schedule(
+                {
+                    "type": "button",
+                    "code": action,
+                    "value": False,
+                },
+                curr + self.QAM_DELAY,
             )
             self.touchpad_down = None
         elif self.touchpad_down and (
@@ -890,15 +1017,13 @@ class Multiplexer:
                         )
                         self.startselect_pressed = "pressed"
                     if self.startselect_pressed == "pressed":
-                        self.queue.append(
-                            (
-                                {
-                                    "type": "axis",
-                                    "code": ev["code"],
-                                    "value": ev["value"],
-                                },
-                                curr + self.QAM_DELAY,
-                            )
+                        self.schedule(
+                            {
+                                "type": "axis",
+                                "code": ev["code"],
+                                "value": ev["value"],
+                            },
+                            curr + self.QAM_DELAY,
                         )
                         ev["code"] = ""  # type: ignore
 
@@ -1059,15 +1184,13 @@ class Multiplexer:
                         and ev["code"] == "start"
                     ):
                         if self.startselect_pressed == "pressed":
-                            self.queue.append(
-                                (
-                                    {
-                                        "type": "button",
-                                        "code": "mode",
-                                        "value": False,
-                                    },
-                                    curr + self.QAM_DELAY,
-                                )
+                            self.schedule(
+                                {
+                                    "type": "button",
+                                    "code": "mode",
+                                    "value": False,
+                                },
+                                curr + self.QAM_DELAY,
                             )
                             self.startselect_pressed = None
 
@@ -1082,15 +1205,13 @@ class Multiplexer:
                                     "value": True,
                                 }
                             )
-                            self.queue.append(
-                                (
-                                    {
-                                        "type": "button",
-                                        "code": ev["code"],
-                                        "value": False,
-                                    },
-                                    curr + self.QAM_DELAY,
-                                )
+                            self.schedule(
+                                {
+                                    "type": "button",
+                                    "code": ev["code"],
+                                    "value": False,
+                                },
+                                curr + self.QAM_DELAY,
                             )
                         ev["code"] = ""  # type: ignore
 
@@ -1177,39 +1298,33 @@ class Multiplexer:
                                             "value": True,
                                         },
                                     )
-                                    self.queue.append(
-                                        (
-                                            {
-                                                "type": "button",
-                                                "code": (
-                                                    "b" if self.nintendo_qam else "a"
-                                                ),
-                                                "value": True,
-                                            },
-                                            curr + self.QAM_DELAY,
-                                        ),
+                                    self.schedule(
+                                        {
+                                            "type": "button",
+                                            "code": (
+                                                "b" if self.nintendo_qam else "a"
+                                            ),
+                                            "value": True,
+                                        },
+                                        curr + self.QAM_DELAY,
                                     )
-                                    self.queue.append(
-                                        (
-                                            {
-                                                "type": "button",
-                                                "code": (
-                                                    "b" if self.nintendo_qam else "a"
-                                                ),
-                                                "value": False,
-                                            },
-                                            curr + 2 * self.QAM_DELAY,
-                                        ),
+                                    self.schedule(
+                                        {
+                                            "type": "button",
+                                            "code": (
+                                                "b" if self.nintendo_qam else "a"
+                                            ),
+                                            "value": False,
+                                        },
+                                        curr + 2 * self.QAM_DELAY,
                                     )
-                                    self.queue.append(
-                                        (
-                                            {
-                                                "type": "button",
-                                                "code": "mode",
-                                                "value": False,
-                                            },
-                                            curr + 2 * self.QAM_DELAY,
-                                        ),
+                                    self.schedule(
+                                        {
+                                            "type": "button",
+                                            "code": "mode",
+                                            "value": False,
+                                        },
+                                        curr + 2 * self.QAM_DELAY,
                                     )
 
                     if ev["code"] == "keyboard":
@@ -1236,35 +1351,29 @@ class Multiplexer:
                                     "value": True,
                                 },
                             )
-                            self.queue.append(
-                                (
-                                    {
-                                        "type": "button",
-                                        "code": "y" if self.nintendo_qam else "x",
-                                        "value": True,
-                                    },
-                                    curr + self.QAM_DELAY,
-                                )
+                            self.schedule(
+                                {
+                                    "type": "button",
+                                    "code": "y" if self.nintendo_qam else "x",
+                                    "value": True,
+                                },
+                                curr + self.QAM_DELAY,
                             )
-                            self.queue.append(
-                                (
-                                    {
-                                        "type": "button",
-                                        "code": "y" if self.nintendo_qam else "x",
-                                        "value": False,
-                                    },
-                                    curr + 2 * self.QAM_DELAY,
-                                ),
+                            self.schedule(
+                                {
+                                    "type": "button",
+                                    "code": "y" if self.nintendo_qam else "x",
+                                    "value": False,
+                                },
+                                curr + 2 * self.QAM_DELAY,
                             )
-                            self.queue.append(
-                                (
-                                    {
-                                        "type": "button",
-                                        "code": "mode",
-                                        "value": False,
-                                    },
-                                    curr + 2 * self.QAM_DELAY,
-                                ),
+                            self.schedule(
+                                {
+                                    "type": "button",
+                                    "code": "mode",
+                                    "value": False,
+                                },
+                                curr + 2 * self.QAM_DELAY,
                             )
 
                     if self.noob_mode and ev["code"] == "extra_r1" and ev["value"]:
@@ -1296,25 +1405,21 @@ class Multiplexer:
                                 if self.touchpad_short == "left_click"
                                 else "touchpad_right"
                             )
-                            self.queue.append(
-                                (
-                                    {
-                                        "type": "button",
-                                        "code": action,
-                                        "value": True,
-                                    },
-                                    curr,
-                                )
+                            self.schedule(
+                                {
+                                    "type": "button",
+                                    "code": action,
+                                    "value": True,
+                                },
+                                curr,
                             )
-                            self.queue.append(
-                                (
-                                    {
-                                        "type": "button",
-                                        "code": action,
-                                        "value": False,
-                                    },
-                                    curr + self.QAM_DELAY,
-                                )
+                            self.schedule(
+                                {
+                                    "type": "button",
+                                    "code": action,
+                                    "value": False,
+                                },
+                                curr + self.QAM_DELAY,
                             )
 
                         if ev["value"]:
@@ -1373,15 +1478,13 @@ class Multiplexer:
                         )
                         self.startselect_pressed = "pressed"
                     if self.startselect_pressed == "pressed":
-                        self.queue.append(
-                            (
-                                {
-                                    "type": "button",
-                                    "code": ev["code"],
-                                    "value": ev["value"],
-                                },
-                                curr + self.QAM_DELAY,
-                            )
+                        self.schedule(
+                            {
+                                "type": "button",
+                                "code": ev["code"],
+                                "value": ev["value"],
+                            },
+                            curr + self.QAM_DELAY,
                         )
                         ev["code"] = ""  # type: ignore
                 case "led":
@@ -1577,15 +1680,13 @@ class Multiplexer:
                             "value": True,
                         },
                     )
-                    self.queue.append(
-                        (
-                            {
-                                "type": "button",
-                                "code": "share",
-                                "value": False,
-                            },
-                            curr + self.QAM_DELAY,
-                        )
+                    self.schedule(
+                        {
+                            "type": "button",
+                            "code": "share",
+                            "value": False,
+                        },
+                        curr + self.QAM_DELAY,
                     )
                 else:
                     # Have a fallback if gamescope is not working
@@ -1596,35 +1697,29 @@ class Multiplexer:
                             "value": True,
                         },
                     )
-                    self.queue.append(
-                        (
-                            {
-                                "type": "button",
-                                "code": "b" if self.nintendo_qam else "a",
-                                "value": True,
-                            },
-                            curr + self.QAM_DELAY,
-                        )
+                    self.schedule(
+                        {
+                            "type": "button",
+                            "code": "b" if self.nintendo_qam else "a",
+                            "value": True,
+                        },
+                        curr + self.QAM_DELAY,
                     )
-                    self.queue.append(
-                        (
-                            {
-                                "type": "button",
-                                "code": "b" if self.nintendo_qam else "a",
-                                "value": False,
-                            },
-                            curr + 2 * self.QAM_DELAY,
-                        ),
+                    self.schedule(
+                        {
+                            "type": "button",
+                            "code": "b" if self.nintendo_qam else "a",
+                            "value": False,
+                        },
+                        curr + 2 * self.QAM_DELAY,
                     )
-                    self.queue.append(
-                        (
-                            {
-                                "type": "button",
-                                "code": "mode",
-                                "value": False,
-                            },
-                            curr + 2 * self.QAM_DELAY,
-                        ),
+                    self.schedule(
+                        {
+                            "type": "button",
+                            "code": "mode",
+                            "value": False,
+                        },
+                        curr + 2 * self.QAM_DELAY,
                     )
         elif send_steam_expand:
             out.append(
@@ -1634,15 +1729,13 @@ class Multiplexer:
                     "value": True,
                 },
             )
-            self.queue.append(
-                (
-                    {
-                        "type": "button",
-                        "code": "mode",
-                        "value": False,
-                    },
-                    curr + self.QAM_DELAY,
-                )
+            self.schedule(
+                {
+                    "type": "button",
+                    "code": "mode",
+                    "value": False,
+                },
+                curr + self.QAM_DELAY,
             )
         return out
 
@@ -0,0 +1,148 @@
+import logging
+import math
+import os
+import time
+from typing import Sequence
+
+from .base import Event
+
+logger = logging.getLogger(__name__)
+
+GOVERNOR_DISABLE = os.environ.get("HHD_GOVERNOR_DISABLE", "0") == "1"
+
+IDLE_TIMEOUT = 10
+IDLE_FREQ_MIN = 4
+IDLE_FREQ_MAX = 60
+RATE_WINDOW = 2
+# Frames end this fraction of a sample early, so the next one starts a frame
+ALIGN_SLACK = 0.25
+# Below it (in rad/s), the device is considered resting
+GYRO_IDLE_THRESHOLD = 0.15
+
+_SIDES = ("", "left_", "right_")
+TS_CODES = frozenset([f"{s}imu_ts" for s in _SIDES] + ["accel_ts", "gyro_ts"])
+GYRO_CODES = frozenset(f"{s}gyro_{a}" for s in _SIDES for a in "xyz")
+ACCEL_CODES = frozenset(f"{s}accel_{a}" for s in _SIDES for a in "xyz")
+
+
+class RateGovernor:
+    """Adapts the frame pacing of `ControllerRuntime` to its inputs.
+
+    While active, frames are aligned to the measured IMU cadence. If the IMU
+    is faster than the maximum report rate, each frame spans a whole number
+    of samples and ends just before the next one is due, so samples do not
+    slip between frames. Once no button, stick, or touchpad has moved and the
+    device has rested for `idle_timeout` (e.g., while a movie plays), the
+    loop drops to the idle rates. It ramps back up on the first input."""
+
+    def __init__(
+        self,
+        report_freq_min: float,
+        report_freq_max: float,
+        idle_freq_min: float = IDLE_FREQ_MIN,
+        idle_freq_max: float = IDLE_FREQ_MAX,
+        idle_timeout: float = IDLE_TIMEOUT,
+        enabled: bool = not GOVERNOR_DISABLE,
+    ) -> None:
+        self.base_min = 1 / report_freq_max
+        self.base_max = 1 / report_freq_min
+        self.idle_min = max(1 / idle_freq_max, self.base_min)
+        self.idle_max = max(1 / idle_freq_min, self.base_max)
+        self.idle_timeout = idle_timeout
+        self.enabled = enabled
+
+        self.delay_min = self.base_min
+        self.delay_max = self.base_max
+        self.idle = False
+        self.cadence: float | None = None
+        self.rates: dict[str, float] = {}
+
+        self.last_input = self.window_start = time.perf_counter()
+        self.wakes: dict[str, int] = {}
+        self.samples: dict[str, int] = {}
+
+    def woke(self, name: str):
+        """Counts a wakeup of a producer, call when its fds were ready."""
+        self.wakes[name] = self.wakes.get(name, 0) + 1
+
+    def busy(self, now: float | None = None):
+        """Counts timed work of the producers (e.g., a held key that has not
+        emitted an event yet) as input, so the rate is not lowered."""
+        if not self.enabled:
+            return
+        self.last_input = time.perf_counter() if now is None else now
+        if self.idle:
+            self.set_idle(False)
+
+    def update(self, evs: Sequence[Event], now: float | None = None):
+        if not self.enabled:
+            return
+        if now is None:
+            now = time.perf_counter()
+
+        active = False
+        for ev in evs:
+            if ev["type"] == "axis":
+                code = ev["code"]
+                if code in TS_CODES:
+                    self.samples[code] = self.samples.get(code, 0) + 1
+                    continue
+                if code in ACCEL_CODES:
+                    continue
+                if code in GYRO_CODES and abs(ev["value"]) < GYRO_IDLE_THRESHOLD:
+                    continue
+            elif ev["type"] != "button":
+                continue
+            active = True
+
+        if active:
+            self.last_input = now
+            if self.idle:
+                self.set_idle(False)
+        elif not self.idle and now - self.last_input > self.idle_timeout:
+            self.set_idle(True)
+
+        if now - self.window_start >= RATE_WINDOW:
+            self.measure(now)
+
+    def measure(self, now: float):
+        elapsed = now - self.window_start
+        self.window_start = now
+        if elapsed <= 0:
+            return
+
+        self.rates = {k: v / elapsed for k, v in self.wakes.items()}
+        rates = [v / elapsed for v in self.samples.values()]
+        self.cadence = max(rates) if rates and max(rates) >= 1 else None
+        self.wakes = {}
+        self.samples = {}
+        self.apply()
+
+    def set_idle(self, idle: bool):
+        self.idle = idle
+        if idle:
+            logger.debug("No input, lowering the report rate.")
+        else:
+            logger.debug("Input resumed, restoring the report rate.")
+        self.apply()
+
+    def aligned_delay(self) -> float:
+        if not self.cadence:
+            return self.base_min
+        period = 1 / self.cadence
+        if period >= self.base_min:
+            # Every sample starts its own frame
+            return self.base_min
+        n = math.ceil(self.base_min / period - 1e-6)
+        return n * period - ALIGN_SLACK * period
+
+    def apply(self):
+        if self.idle:
+            self.delay_min = self.idle_min
+            self.delay_max = self.idle_max
+        else:
+            self.delay_min = self.aligned_delay()
+            self.delay_max = self.base_max
+
+
+__all__ = ["RateGovernor"]
@@ -0,0 +1,131 @@
+import os
+import time
+from threading import Lock
+
+LATENCY_ENABLE = os.environ.get("HHD_LATENCY", "0") == "1"
+
+# Each power of two is split into 2**SUB_BITS buckets (~6% precision)
+SUB_BITS = 4
+SUB_COUNT = 1 << SUB_BITS
+# Values above ~18 minutes are clamped to the last bucket
+MAX_BITS = 40
+BUCKET_NUM = (MAX_BITS - SUB_BITS + 1) * SUB_COUNT
+
+STAGES = ("decode", "process", "write", "total")
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def _bucket(v: int) -> int:
+    if v < SUB_COUNT:
+        return max(v, 0)
+    e = v.bit_length() - SUB_BITS - 1
+    idx = (e + 1) * SUB_COUNT + (v >> e) - SUB_COUNT
+    return min(idx, BUCKET_NUM - 1)
+
+
+def _bucket_value(idx: int) -> int:
+    """Returns the midpoint of the values that fall in the bucket."""
+    if idx < SUB_COUNT:
+        return idx
+    e = idx // SUB_COUNT - 1
+    m = idx % SUB_COUNT + SUB_COUNT
+    return (m << e) + ((1 << e) >> 1)
+
+
+class Histogram:
+    """Log-linear histogram of nanosecond values, in the style of
+    HdrHistogram. Recording is a few integer operations and does not allocate,
+    so it can be used from the controller loop."""
+
+    def __init__(self) -> None:
+        self.counts = [0] * BUCKET_NUM
+        self.reset()
+
+    def reset(self):
+        for i in range(BUCKET_NUM):
+            self.counts[i] = 0
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def record(self, ns: int):
+        self.counts[_bucket(ns)] += 1
+        if not self.count or ns < self.min:
+            self.min = ns
+        if ns > self.max:
+            self.max = ns
+        self.count += 1
+        self.total += ns
+
+    def percentile(self, p: float) -> int:
+        if not self.count:
+            return 0
+        target = max(1, round(self.count * p / 100))
+        if target >= self.count:
+            return self.max
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return min(max(_bucket_value(i), self.min), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        """Returns the statistics of the histogram in microseconds."""
+        out = {
+            "count": self.count,
+            "min_us": self.min / 1e3,
+            "mean_us": self.total / self.count / 1e3 if self.count else 0,
+            "max_us": self.max / 1e3,
+        }
+        for p in PERCENTILES:
+            out[f"p{p:g}_us".replace(".", "_")] = self.percentile(p) / 1e3
+        return out
+
+
+class LatencyTracer:
+    """Per stage latency histograms for the controller loops.
+
+    Each frame with input is timed from the moment `epoll_wait` returns
+    (i.e., the kernel has a report ready) until the producers have read and
+    decoded it, the multiplexer has processed it and the consumers have
+    written it to the virtual devices. While disabled, the runtime only
+    checks `enabled` once per frame."""
+
+    def __init__(self, enabled: bool = LATENCY_ENABLE) -> None:
+        self.enabled = enabled
+        self.lock = Lock()
+        self.since = time.time()
+        self.stages = {s: Histogram() for s in STAGES}
+
+    def record(self, woke: int, decoded: int, processed: int, written: int):
+        # Frames of different controller loops may race here, rarely losing
+        # a sample, which does not matter for a histogram.
+        st = self.stages
+        st["decode"].record(decoded - woke)
+        st["process"].record(processed - decoded)
+        st["write"].record(written - processed)
+        st["total"].record(written - woke)
+
+    def enable(self, enabled: bool = True):
+        self.enabled = enabled
+
+    def reset(self):
+        with self.lock:
+            self.since = time.time()
+            for h in self.stages.values():
+                h.reset()
+
+    def summary(self) -> dict:
+        with self.lock:
+            return {
+                "enabled": self.enabled,
+                "since": self.since,
+                "stages": {k: h.summary() for k, h in self.stages.items()},
+            }
+
+
+TRACER = LatencyTracer()
+
+__all__ = ["Histogram", "LatencyTracer", "TRACER"]
@@ -0,0 +1,357 @@
+import struct
+from typing import Any, Callable, Mapping, NamedTuple, Sequence
+
+from .common import AM, BM, CM, NumType, decode_axis, decode_config, get_button
+
+# Struct format, byte size, midpoint, and the divisor used when no scale is
+# set. Matches the behavior of `decode_axis`.
+NUM_FORMATS: dict[NumType, tuple[str, int, int, int]] = {
+    "i32": ("i", 4, 0, (1 << 31) - 1),
+    "u32": ("I", 4, 0, (1 << 32) - 1),
+    "m32": ("I", 4, 1 << 31, (1 << 31) - 1),
+    "i16": ("h", 2, 0, (1 << 15) - 1),
+    "u16": ("H", 2, 0, (1 << 16) - 1),
+    "m16": ("H", 2, 1 << 15, (1 << 15) - 1),
+    "i8": ("b", 1, 0, (1 << 7) - 1),
+    "u8": ("B", 1, 0, (1 << 8) - 1),
+    "m8": ("B", 1, 1 << 7, 1 << 7),
+}
+
+
+class NumField(NamedTuple):
+    """A numeric field of the report, after it has been placed in a struct."""
+
+    idx: int
+    ofs: int
+    size: int
+    fmt: str
+    order: str
+    mid: int
+    div: int
+    scale: float | None
+    offset: float
+    flipped: bool
+    bounds: tuple[int, int] | None
+
+
+def _num_field(idx: int, loc: int, type: NumType, order: str, **kwargs):
+    if type not in NUM_FORMATS:
+        assert False, f"Invalid formatting {type}."
+    fmt, size, mid, div = NUM_FORMATS[type]
+    return NumField(idx, loc >> 3, size, fmt, order, mid, div, **kwargs)
+
+
+def _pack_structs(fields: Sequence[NumField]):
+    """Places fields into as few structs as possible. Fields in the same struct
+    must share a byte order (single byte fields fit in any) and not overlap,
+    which is the case for all current devices, so this results in one struct
+    per report."""
+    groups: list[tuple[str | None, list[NumField]]] = []
+    for f in sorted(fields, key=lambda f: f.ofs):
+        for i, (order, group) in enumerate(groups):
+            last = group[-1]
+            if last.ofs + last.size > f.ofs:
+                continue
+            if f.size > 1 and order is not None and order != f.order:
+                continue
+            if f.size > 1 and order is None:
+                groups[i] = (f.order, group)
+            group.append(f)
+            break
+        else:
+            groups.append((f.order if f.size > 1 else None, [f]))
+
+    out = []
+    for order, group in groups:
+        fmt = ">" if order == "big" else "<"
+        pos = 0
+        for f in group:
+            if f.ofs > pos:
+                fmt += f"{f.ofs - pos}x"
+            fmt += f.fmt
+            pos = f.ofs + f.size
+        out.append((struct.Struct(fmt), tuple(group)))
+    return tuple(out)
+
+
+def _convert(f: NumField, o: int):
+    o -= f.mid
+    if f.scale:
+        v = f.scale * o + f.offset
+    else:
+        v = o / f.div + f.offset
+    if f.flipped:
+        v = -v
+    if f.bounds:
+        v = min(max(v, f.bounds[0]), f.bounds[1])
+    return v
+
+
+class ReportDecoder:
+    """Decoding plan for a single report ID, compiled from the `BM`/`AM`/`CM`
+    maps of a device.
+
+    Buttons become a table of byte index and bit mask and all numeric fields
+    are read with a single `struct.unpack_from` per byte order. `decode`
+    returns the values in map order and matches `get_button`, `decode_axis`, and
+    `decode_config` exactly. Reports shorter than the plan use those functions
+    instead.
+
+    `decode_changed` XORs the report with the previous one and uses a byte to
+    field index to only decode the fields whose bytes changed. Most reports
+    only change the IMU bytes and a stick or two."""
+
+    __slots__ = (
+        "btn_codes",
+        "axis_codes",
+        "config_codes",
+        "btn_map",
+        "axis_map",
+        "config_map",
+        "buttons",
+        "structs",
+        "size",
+        "units",
+        "byte_index",
+        "mask",
+        "last",
+    )
+
+    def __init__(
+        self,
+        btn_map: Mapping[Any, BM] = {},
+        axis_map: Mapping[Any, AM] = {},
+        config_map: Mapping[Any, CM] = {},
+    ) -> None:
+        self.btn_map = btn_map
+        self.axis_map = axis_map
+        self.config_map = config_map
+        self.btn_codes = tuple(btn_map)
+        self.axis_codes = tuple(axis_map)
+        self.config_codes = tuple(config_map)
+
+        nbtn = len(self.btn_codes)
+        naxis = len(self.axis_codes)
+
+        # Buttons and bit configs share the same table
+        buttons = []
+        for i, m in enumerate(btn_map.values()):
+            buttons.append((i, m.loc >> 3, 1 << (7 - (m.loc & 7)), m.flipped))
+
+        fields = []
+        for i, m in enumerate(axis_map.values()):
+            fields.append(
+                _num_field(
+                    nbtn + i,
+                    m.loc,
+                    m.type,
+                    m.order,
+                    scale=m.scale,
+                    offset=m.offset,
+                    flipped=m.flipped,
+                    bounds=None,
+                )
+            )
+        for i, m in enumerate(config_map.values()):
+            idx = nbtn + naxis + i
+            if m.type == "bit":
+                buttons.append((idx, m.loc >> 3, 1 << (7 - (m.loc & 7)), m.flipped))
+            else:
+                fields.append(
+                    _num_field(
+                        idx,
+                        m.loc,
+                        m.type,
+                        m.order,
+                        scale=m.scale,
+                        offset=m.offset,
+                        flipped=False,
+                        bounds=m.bounds,
+                    )
+                )
+
+        self.buttons = tuple(buttons)
+        self.structs = _pack_structs(fields)
+        self.size = max(
+            [b[1] + 1 for b in buttons] + [f.ofs + f.size for f in fields] + [0]
+        )
+
+        # Index of the bytes each field spans, for decode_changed
+        units: dict[int, Any] = {}
+        byte_index: dict[int, list[int]] = {}
+        for b in buttons:
+            units[b[0]] = b
+            byte_index.setdefault(b[1], []).append(b[0])
+        for f in fields:
+            fmt = (">" if f.order == "big" else "<") + f.fmt
+            units[f.idx] = (struct.Struct(fmt), f)
+            for i in range(f.ofs, f.ofs + f.size):
+                byte_index.setdefault(i, []).append(f.idx)
+        self.units = units
+        self.byte_index = {k: tuple(v) for k, v in byte_index.items()}
+        self.mask = sum(0xFF << (i << 3) for i in byte_index)
+        self.last = None
+
+    def decode(self, rep: bytes | bytearray | memoryview) -> list:
+        """Returns the values of all buttons, axis, and configs, in that order."""
+        if len(rep) < self.size:
+            return self.decode_slow(rep)
+
+        out: list = [None] * (
+            len(self.btn_codes) + len(self.axis_codes) + len(self.config_codes)
+        )
+        for idx, byte, mask, flipped in self.buttons:
+            out[idx] = bool(rep[byte] & mask) != flipped
+
+        for st, fields in self.structs:
+            for f, o in zip(fields, st.unpack_from(rep)):
+                out[f.idx] = _convert(f, o)
+        return out
+
+    def decode_changed(
+        self, rep: bytes | bytearray | memoryview
+    ) -> list[tuple[int, Any]]:
+        """Returns `(idx, value)` pairs, in map order, for the fields whose bytes
+        changed since the previous call. `idx` follows the order of `decode`.
+        All fields are returned for the first report or if its size changes."""
+        last = self.last
+        if last is None or len(last) != len(rep) or len(rep) < self.size:
+            # Copy, as rep may be a view into a reused read buffer
+            self.last = bytearray(rep)
+            return list(enumerate(self.decode(rep)))
+
+        diff = (
+            int.from_bytes(rep, "little") ^ int.from_bytes(last, "little")
+        ) & self.mask
+        if not diff:
+            return []
+
+        idxs = set()
+        byte_index = self.byte_index
+        while diff:
+            # Find lowest changed byte and clear it
+            byte = ((diff & -diff).bit_length() - 1) >> 3
+            diff &= ~(0xFF << (byte << 3))
+            idxs.update(byte_index[byte])
+
+        out = []
+        units = self.units
+        for idx in sorted(idxs):
+            u = units[idx]
+            if len(u) == 4:
+                _, byte, mask, flipped = u
+                # Skip buttons that share a byte with the changed ones
+                if (rep[byte] ^ last[byte]) & mask:
+                    out.append((idx, bool(rep[byte] & mask) != flipped))
+            else:
+                st, f = u
+                out.append((idx, _convert(f, st.unpack_from(rep, f.ofs)[0])))
+        last[:] = rep
+        return out
+
+    def decode_slow(self, rep: bytes | bytearray | memoryview) -> list:
+        return (
+            [get_button(rep, m) for m in self.btn_map.values()]  # type: ignore
+            + [decode_axis(rep, m) for m in self.axis_map.values()]  # type: ignore
+            + [decode_config(rep, m) for m in self.config_map.values()]  # type: ignore
+        )
+
+
+def compile_decoders(
+    btn_map: Mapping[Any, Mapping[Any, BM]],
+    axis_map: Mapping[Any, Mapping[Any, AM]],
+    config_map: Mapping[Any, Mapping[Any, CM]],
+) -> dict[Any, ReportDecoder]:
+    """Compiles a `ReportDecoder` for each report ID in the maps."""
+    out = {}
+    for rep_id in {*btn_map, *axis_map, *config_map}:
+        out[rep_id] = ReportDecoder(
+            btn_map.get(rep_id, {}),
+            axis_map.get(rep_id, {}),
+            config_map.get(rep_id, {}),
+        )
+    return out
+
+
+def compile_axis_encoder(buf: bytearray, m: AM) -> Callable[[float], None]:
+    """Returns a function that writes a value to `buf` exactly like
+    `encode_axis`, with the type, scale, and flip resolved ahead of time.
+    Raises `OverflowError` and leaves `buf` unchanged if the value overflows."""
+    if m.type not in NUM_FORMATS:
+        assert False, f"Invalid formatting {m.type}."
+    fmt, size, mid, _ = NUM_FORMATS[m.type]
+    pack_into = struct.Struct((">" if m.order == "big" else "<") + fmt).pack_into
+    ofs = m.loc >> 3
+    bits = 8 * size
+    # Checked before packing, since `pack_into` zeroes the field on error
+    if fmt.islower():
+        lo, hi = -(1 << (bits - 1)), (1 << (bits - 1)) - 1
+    else:
+        lo, hi = 0, (1 << bits) - 1
+    # Negating the scale is exact, so this matches negating the value
+    sign = -1 if m.flipped else 1
+
+    if m.scale:
+        scale = sign * m.scale
+        offset = m.offset
+        if m.bounds:
+            blo, bhi = m.bounds
+
+            def enc(val: float):
+                v = min(max(int(scale * val + offset), blo), bhi)
+                if v < lo or v > hi:
+                    raise OverflowError(f"Value {v} does not fit in '{m.type}'.")
+                pack_into(buf, ofs, v)
+
+        else:
+
+            def enc(val: float):
+                v = int(scale * val + offset)
+                if v < lo or v > hi:
+                    raise OverflowError(f"Value {v} does not fit in '{m.type}'.")
+                pack_into(buf, ofs, v)
+
+    elif mid:
+        half = sign * ((1 << (bits - 1)) - 1)
+        center = abs(half)
+
+        def enc(val: float):
+            v = int(round(half * val + center))
+            if v < lo or v > hi:
+                raise OverflowError(f"Value {v} does not fit in '{m.type}'.")
+            pack_into(buf, ofs, v)
+
+    else:
+        full = sign * ((1 << (bits if m.type[0] == "u" else bits - 1)) - 1)
+
+        def enc(val: float):
+            v = int(full * val)
+            if v < lo or v > hi:
+                raise OverflowError(f"Value {v} does not fit in '{m.type}'.")
+            pack_into(buf, ofs, v)
+
+    return enc
+
+
+def compile_button_encoder(buf: bytearray, m: BM) -> Callable[[Any], None]:
+    """Returns a function that sets a button of `buf` like `set_button`."""
+    byte = m.loc >> 3
+    mask = 1 << (7 - (m.loc & 7))
+    clear = 0xFF ^ mask
+    flipped = m.flipped
+
+    def enc(val: Any):
+        if bool(val) != flipped:
+            buf[byte] |= mask
+        else:
+            buf[byte] &= clear
+
+    return enc
+
+
+__all__ = [
+    "ReportDecoder",
+    "compile_axis_encoder",
+    "compile_button_encoder",
+    "compile_decoders",
+]
@@ -1,169 +1,181 @@
 # SPDX-License-Identifier: MIT and GPL-3.0-only
-# Forked from https://github.com/apmorton/pyhidapi/blob/master/hid/__init__.py
+# Native hidraw backend, with the same API as the hidapi bindings in `hidapi.py`.
+# Devices are enumerated from sysfs and accessed through the hidraw fd directly,
+# following the behavior of the hidraw backend of hidapi.
+import fcntl
 import os
-import ctypes
-import atexit
-
-__all__ = ["HIDException", "DeviceInfo", "Device", "enumerate"]
-
-
-# hidapi = None
-library_paths = (
-    "libhidapi-hidraw.so",
-    "libhidapi-hidraw.so.0",
-    # Only hidraw supported due to the fd requirement
-    # "libhidapi-libusb.so",
-    # "libhidapi-libusb.so.0",
-    # "libhidapi-iohidmanager.so",
-    # "libhidapi-iohidmanager.so.0",
-    # "libhidapi.dylib",
-    # "hidapi.dll",
-    # "libhidapi-0.dll",
+import select
+
+from .ioctl import (
+    HIDIOCGFEATURE,
+    HIDIOCGINPUT,
+    HIDIOCGRDESC,
+    HIDIOCGRDESCSIZE,
+    HIDIOCSFEATURE,
+    HIDIOCSOUTPUT,
 )
 
-for lib in library_paths:
-    try:
-        hidapi = ctypes.cdll.LoadLibrary(lib)
-        break
-    except OSError:
-        pass
-else:
-    error = "Unable to load any of the following libraries:{}".format(
-        " ".join(library_paths)
-    )
-    raise ImportError(error)
-
-
-hidapi.hid_init()
-atexit.register(hidapi.hid_exit)
-
+__all__ = ["HIDException", "Device", "enumerate"]
 
+HIDRAW_DIR = "/sys/class/hidraw"
 MAX_REPORT_SIZE = 4096
+HID_MAX_DESCRIPTOR_SIZE = 4096
+
+BUS_USB = 0x03
+BUS_BLUETOOTH = 0x05
+BUS_I2C = 0x18
+BUS_SPI = 0x1C
 
 
 class HIDException(Exception):
     pass
 
 
-class DeviceInfo(ctypes.Structure):
-    def as_dict(self):
-        ret = {}
-        for name, type in self._fields_:
-            if name == "next":
-                continue
-            ret[name] = getattr(self, name, None)
+def _read_attr(fn: str, default: str | None = None):
+    try:
+        with open(fn, "r") as f:
+            return f.read().strip()
+    except Exception:
+        return default
 
-        return ret
 
+def _read_uevent(fn: str):
+    out = {}
+    try:
+        with open(fn, "r") as f:
+            for line in f:
+                k, _, v = line.strip().partition("=")
+                out[k] = v
+    except Exception:
+        pass
+    return out
+
+
+def get_usages(desc: bytes) -> list[tuple[int, int]]:
+    """Returns the usage page and usage of each top-level collection in a
+    report descriptor. If there are none, the first usage is returned."""
+    out = []
+    page = 0
+    usage = None
+    depth = 0
+    first = None
+    pos = 0
+    while pos < len(desc):
+        key = desc[pos]
+        if key == 0xFE:
+            # Long item, skip it
+            if pos + 2 >= len(desc):
+                break
+            pos += 3 + desc[pos + 1]
+            continue
+
+        size = (0, 1, 2, 4)[key & 0x03]
+        if pos + 1 + size > len(desc):
+            # Malformed descriptor
+            break
+        data = int.from_bytes(desc[pos + 1 : pos + 1 + size], "little")
+        pos += 1 + size
+
+        match key & 0xFC:
+            case 0x04:  # Usage Page (Global)
+                page = data
+            case 0x08:  # Usage (Local)
+                if size == 4:
+                    # Extended usage, includes the page
+                    page = data >> 16
+                    usage = data & 0xFFFF
+                else:
+                    usage = data
+                if first is None:
+                    first = (page, usage)
+            case 0xA0:  # Collection (Main)
+                if not depth and usage is not None:
+                    out.append((page, usage))
+                depth += 1
+                usage = None
+            case 0xC0:  # End Collection (Main)
+                depth = max(depth - 1, 0)
+                usage = None
+            case 0x80 | 0x90 | 0xB0:  # Input, Output, Feature (Main)
+                usage = None
+
+    if not out and first is not None:
+        out.append(first)
+    return out
+
+
+def _get_info(name: str):
+    sysfs = os.path.join(HIDRAW_DIR, name, "device")
+    uevent = _read_uevent(os.path.join(sysfs, "uevent"))
+    try:
+        bus, vid, pid = (int(v, 16) for v in uevent["HID_ID"].split(":"))
+    except Exception:
+        return None
+
+    info = {
+        "path": os.path.join("/dev", name).encode(),
+        "vendor_id": vid,
+        "product_id": pid,
+        "serial_number": uevent.get("HID_UNIQ", ""),
+        "release_number": 0,
+        "manufacturer_string": "",
+        "product_string": uevent.get("HID_NAME", ""),
+        "usage_page": 0,
+        "usage": 0,
+        "interface_number": -1,
+    }
+
+    if bus == BUS_USB:
+        # The HID device is a child of the USB interface, which is a child
+        # of the USB device that holds the strings.
+        intf = os.path.dirname(os.path.realpath(sysfs))
+        usb = os.path.dirname(intf)
+        if os.path.isfile(os.path.join(usb, "idVendor")):
+            info["manufacturer_string"] = _read_attr(
+                os.path.join(usb, "manufacturer"), ""
+            )
+            info["product_string"] = _read_attr(os.path.join(usb, "product"), "")
+            info["release_number"] = int(
+                _read_attr(os.path.join(usb, "bcdDevice"), "0"), 16
+            )
+            num = _read_attr(os.path.join(intf, "bInterfaceNumber"))
+            if num is not None:
+                info["interface_number"] = int(num, 16)
+    elif bus not in (BUS_BLUETOOTH, BUS_I2C, BUS_SPI):
+        return None
 
-DeviceInfo._fields_ = [
-    ("path", ctypes.c_char_p),
-    ("vendor_id", ctypes.c_ushort),
-    ("product_id", ctypes.c_ushort),
-    ("serial_number", ctypes.c_wchar_p),
-    ("release_number", ctypes.c_ushort),
-    ("manufacturer_string", ctypes.c_wchar_p),
-    ("product_string", ctypes.c_wchar_p),
-    ("usage_page", ctypes.c_ushort),
-    ("usage", ctypes.c_ushort),
-    ("interface_number", ctypes.c_int),
-    ("next", ctypes.POINTER(DeviceInfo)),
-]
-
-
-class LinuxHidDevice(ctypes.Structure):
-    _fields_ = [
-        ("device_handle", ctypes.c_int),
-        ("blocking", ctypes.c_int),
-        ("last_error_str", ctypes.c_wchar_p),
-        ("hid_device_info", ctypes.c_void_p),
-    ]
-
-
-hidapi.hid_init.argtypes = []
-hidapi.hid_init.restype = ctypes.c_int
-hidapi.hid_exit.argtypes = []
-hidapi.hid_exit.restype = ctypes.c_int
-hidapi.hid_enumerate.argtypes = [ctypes.c_ushort, ctypes.c_ushort]
-hidapi.hid_enumerate.restype = ctypes.POINTER(DeviceInfo)
-hidapi.hid_free_enumeration.argtypes = [ctypes.POINTER(DeviceInfo)]
-hidapi.hid_free_enumeration.restype = None
-hidapi.hid_open.argtypes = [ctypes.c_ushort, ctypes.c_ushort, ctypes.c_wchar_p]
-hidapi.hid_open.restype = ctypes.POINTER(LinuxHidDevice)
-hidapi.hid_open_path.argtypes = [ctypes.c_char_p]
-hidapi.hid_open_path.restype = ctypes.POINTER(LinuxHidDevice)
-hidapi.hid_write.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_size_t]
-hidapi.hid_write.restype = ctypes.c_int
-hidapi.hid_read_timeout.argtypes = [
-    ctypes.c_void_p,
-    ctypes.c_char_p,
-    ctypes.c_size_t,
-    ctypes.c_int,
-]
-hidapi.hid_read_timeout.restype = ctypes.c_int
-hidapi.hid_read.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_size_t]
-hidapi.hid_read.restype = ctypes.c_int
-hidapi.hid_get_input_report.argtypes = [
-    ctypes.c_void_p,
-    ctypes.c_char_p,
-    ctypes.c_size_t,
-]
-hidapi.hid_get_input_report.restype = ctypes.c_int
-hidapi.hid_set_nonblocking.argtypes = [ctypes.c_void_p, ctypes.c_int]
-hidapi.hid_set_nonblocking.restype = ctypes.c_int
-hidapi.hid_send_feature_report.argtypes = [
-    ctypes.c_void_p,
-    ctypes.c_char_p,
-    ctypes.c_int,
-]
-hidapi.hid_send_feature_report.restype = ctypes.c_int
-hidapi.hid_get_feature_report.argtypes = [
-    ctypes.c_void_p,
-    ctypes.c_char_p,
-    ctypes.c_size_t,
-]
-hidapi.hid_get_feature_report.restype = ctypes.c_int
-hidapi.hid_close.argtypes = [ctypes.c_void_p]
-hidapi.hid_close.restype = None
-hidapi.hid_get_manufacturer_string.argtypes = [
-    ctypes.c_void_p,
-    ctypes.c_wchar_p,
-    ctypes.c_size_t,
-]
-hidapi.hid_get_manufacturer_string.restype = ctypes.c_int
-hidapi.hid_get_product_string.argtypes = [
-    ctypes.c_void_p,
-    ctypes.c_wchar_p,
-    ctypes.c_size_t,
-]
-hidapi.hid_get_product_string.restype = ctypes.c_int
-hidapi.hid_get_serial_number_string.argtypes = [
-    ctypes.c_void_p,
-    ctypes.c_wchar_p,
-    ctypes.c_size_t,
-]
-hidapi.hid_get_serial_number_string.restype = ctypes.c_int
-hidapi.hid_get_indexed_string.argtypes = [
-    ctypes.c_void_p,
-    ctypes.c_int,
-    ctypes.c_wchar_p,
-    ctypes.c_size_t,
-]
-hidapi.hid_get_indexed_string.restype = ctypes.c_int
-hidapi.hid_error.argtypes = [ctypes.c_void_p]
-hidapi.hid_error.restype = ctypes.c_wchar_p
+    return info
 
 
 def enumerate(vid=0, pid=0):
+    """Returns the hidraw devices, with one entry per top-level collection."""
     ret = []
-    info = hidapi.hid_enumerate(vid, pid)
-    c = info
-
-    while c:
-        ret.append(c.contents.as_dict())
-        c = c.contents.next
+    try:
+        names = sorted(os.listdir(HIDRAW_DIR))
+    except FileNotFoundError:
+        return ret
 
-    hidapi.hid_free_enumeration(info)
+    for name in names:
+        info = _get_info(name)
+        if not info:
+            continue
+        if vid and info["vendor_id"] != vid:
+            continue
+        if pid and info["product_id"] != pid:
+            continue
+
+        try:
+            with open(
+                os.path.join(HIDRAW_DIR, name, "device", "report_descriptor"), "rb"
+            ) as f:
+                usages = get_usages(f.read())
+        except Exception:
+            usages = []
+
+        if not usages:
+            ret.append(info)
+        for page, usage in usages:
+            ret.append({**info, "usage_page": page, "usage": usage})
 
     return ret
 
@@ -186,29 +198,32 @@ def enumerate_unique(vid=0, pid=0, usage_page=0, usage=0):
 
 class Device(object):
     def __init__(self, vid=None, pid=None, serial=None, path=None):
-        if path:
-            self._dev = hidapi.hid_open_path(path)
-        elif serial:
-            serial = ctypes.create_unicode_buffer(serial)
-            self._dev = hidapi.hid_open(vid, pid, serial)
-        elif vid and pid:
-            self._dev = hidapi.hid_open(vid, pid, None)
-        else:
-            raise ValueError("specify vid/pid or path")
-
-        if not self._dev:
-            raise HIDException("unable to open device")
+        if not path:
+            if not (vid and pid):
+                raise ValueError("specify vid/pid or path")
+            for d in enumerate(vid, pid):
+                if not serial or d["serial_number"] == serial:
+                    path = d["path"]
+                    break
+            else:
+                raise HIDException("unable to open device")
+
+        try:
+            self._fd = os.open(path, os.O_RDWR | os.O_CLOEXEC)
+        except OSError as e:
+            raise HIDException(f"unable to open device: {e}") from e
+        self.path = path
 
         # Reuse buffer as creating it every time is expensive
         # This means this process is no longer parallelizable, but you
         # should not be parallelizing it anyway
-        self.buf = ctypes.create_string_buffer(MAX_REPORT_SIZE)
+        self.buf = bytearray(MAX_REPORT_SIZE)
 
     @property
     def fd(self):
-        if not self._dev:
+        if self._fd is None:
             return 0
-        return self._dev.contents.device_handle
+        return self._fd
 
     def __enter__(self):
         return self
@@ -216,65 +231,87 @@ class Device(object):
     def __exit__(self, exc_type, exc_value, exc_traceback):
         self.close()
 
-    def __hidcall(self, function, *args, **kwargs):
-        if not self._dev:
+    def __check(self):
+        if self._fd is None:
             raise HIDException("device closed")
+        return self._fd
 
-        ret = function(*args, **kwargs)
-
-        if ret == -1:
-            err = hidapi.hid_error(self._dev)
-            raise HIDException(err)
-        return ret
+    def __ioctl(self, req, buf):
+        try:
+            return fcntl.ioctl(self.__check(), req, buf)
+        except OSError as e:
+            raise HIDException(str(e)) from e
 
-    def __readstring(self, function, max_length=255):
-        buf = ctypes.create_unicode_buffer(max_length)
-        self.__hidcall(function, self._dev, buf, max_length)
-        return buf.value
+    def __info(self):
+        name = os.path.basename(os.fsdecode(self.path))
+        return _get_info(name) or {}
 
     def write(self, data):
-        return self.__hidcall(hidapi.hid_write, self._dev, data, len(data))
+        try:
+            return os.write(self.__check(), data)
+        except OSError as e:
+            raise HIDException(str(e)) from e
 
     def read(self, size: int = MAX_REPORT_SIZE, timeout=None):
-        if timeout is None:
-            size = self.__hidcall(hidapi.hid_read, self._dev, self.buf, size)
-        else:
-            size = self.__hidcall(
-                hidapi.hid_read_timeout, self._dev, self.buf, size, timeout
-            )
-
-        return self.buf.raw[:size]
+        fd = self.__check()
+        if timeout is None and self.nonblocking:
+            timeout = 0
+        if timeout is not None and timeout >= 0:
+            if not select.select([fd], [], [], timeout / 1000)[0]:
+                return b""
+
+        try:
+            return os.read(fd, size)
+        except BlockingIOError:
+            return b""
+        except OSError as e:
+            raise HIDException(str(e)) from e
+
+    def readinto(self, buf) -> int:
+        """Reads a report from the hidraw fd directly into `buf`, skipping the
+        copy to a new `bytes` object. Returns the size of the report, or 0 if
+        there is none and the device is non-blocking."""
+        try:
+            return os.readv(self.__check(), (buf,))
+        except BlockingIOError:
+            return 0
+        except OSError as e:
+            raise HIDException(str(e)) from e
 
     def get_input_report(self, report_id, size: int = MAX_REPORT_SIZE):
         # Pass the id of the report to be read.
-        self.buf[0] = bytearray((report_id,))
+        self.buf[0] = report_id
 
-        size = self.__hidcall(hidapi.hid_get_input_report, self._dev, self.buf, size)
-        return self.buf.raw[:size]
+        size = self.__ioctl(HIDIOCGINPUT(size), self.buf)
+        return bytes(self.buf[:size])
 
     def send_output_report(self, data):
         """SET_REPORT Output via HIDIOCSOUTPUT ioctl (control transfer)."""
-        import fcntl
-        HIDIOCSOUTPUT = 0xC0184806
-        buf = ctypes.create_string_buffer(data, 4096)
-        return fcntl.ioctl(self.fd, HIDIOCSOUTPUT, buf)
+        return self.__ioctl(HIDIOCSOUTPUT(len(data)), bytearray(data))
 
     def send_feature_report(self, data):
-        return self.__hidcall(
-            hidapi.hid_send_feature_report, self._dev, data, len(data)
-        )
+        return self.__ioctl(HIDIOCSFEATURE(len(data)), bytearray(data))
 
     def get_feature_report(self, report_id, size: int = MAX_REPORT_SIZE):
         # Pass the id of the report to be read.
-        self.buf[0] = bytearray((report_id,))
+        self.buf[0] = report_id
 
-        size = self.__hidcall(hidapi.hid_get_feature_report, self._dev, self.buf, size)
-        return self.buf.raw[:size]
+        size = self.__ioctl(HIDIOCGFEATURE(size), self.buf)
+        return bytes(self.buf[:size])
+
+    def get_report_descriptor(self):
+        size = bytearray(4)
+        self.__ioctl(HIDIOCGRDESCSIZE, size)
+        # struct hidraw_report_descriptor { __u32 size; __u8 value[4096]; }
+        buf = bytearray(4 + HID_MAX_DESCRIPTOR_SIZE)
+        buf[:4] = size
+        self.__ioctl(HIDIOCGRDESC, buf)
+        return bytes(buf[4 : 4 + int.from_bytes(size, "little")])
 
     def close(self):
-        if self._dev:
-            hidapi.hid_close(self._dev)
-            self._dev = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
 
     @property
     def nonblocking(self):
@@ -282,22 +319,25 @@ class Device(object):
 
     @nonblocking.setter
     def nonblocking(self, value):
-        self.__hidcall(hidapi.hid_set_nonblocking, self._dev, value)
+        self.__check()
         setattr(self, "_nonblocking", value)
 
     @property
     def manufacturer(self):
-        return self.__readstring(hidapi.hid_get_manufacturer_string)
+        return self.__info().get("manufacturer_string", None)
 
     @property
     def product(self):
-        return self.__readstring(hidapi.hid_get_product_string)
+        return self.__info().get("product_string", None)
 
     @property
     def serial(self):
-        return self.__readstring(hidapi.hid_get_serial_number_string)
+        return self.__info().get("serial_number", None)
 
     def get_indexed_string(self, index, max_length=255):
-        buf = ctypes.create_unicode_buffer(max_length)
-        self.__hidcall(hidapi.hid_get_indexed_string, self._dev, index, buf, max_length)
-        return buf.value
+        raise HIDException("get_indexed_string: not supported by hidraw")
+
+
+if os.environ.get("HHD_HIDAPI", "0") == "1":
+    # Fall back to libhidapi, if requested
+    from .hidapi import Device, HIDException, enumerate  # type: ignore
@@ -246,6 +246,11 @@ JSIOCREVOKEALL = _IOW("j", 0x94, 4)
 # Hidraw Descriptors
 HIDIOCGRDESCSIZE = _IOR("H", 0x01, 4)
 HIDIOCGRDESC = _IOR("H", 0x02, 4096 + 4)
+# Report ioctls, the size is the length of the report
+HIDIOCSFEATURE = lambda l: _IOC("rw", "H", 0x06, l)
+HIDIOCGFEATURE = lambda l: _IOC("rw", "H", 0x07, l)
+HIDIOCGINPUT = lambda l: _IOC("rw", "H", 0x0A, l)
+HIDIOCSOUTPUT = lambda l: _IOC("rw", "H", 0x0B, l)
 
 __all__ = (
     "_IOC",
@@ -258,4 +263,10 @@ __all__ = (
     "EVIOCREVOKEALL",
     "JSIOCREVOKEALL",
     "UI_SET_UNIQ_STR",
+    "HIDIOCGRDESCSIZE",
+    "HIDIOCGRDESC",
+    "HIDIOCSFEATURE",
+    "HIDIOCGFEATURE",
+    "HIDIOCGINPUT",
+    "HIDIOCSOUTPUT",
 )
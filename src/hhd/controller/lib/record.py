@@ -0,0 +1,194 @@
+import json
+import logging
+import os
+import struct
+import time
+from typing import Any, BinaryIO, Iterator, NamedTuple, Protocol, Sequence
+
+from ..base import Event, Producer
+
+logger = logging.getLogger(__name__)
+
+RECORD_DIR = os.environ.get("HHD_RECORD_DIR", None)
+
+MAGIC = b"HHDREC\x01\n"
+# Length of the JSON metadata
+META = struct.Struct("<I")
+# Read timestamp (perf_counter_ns) and length of each raw read
+RECORD = struct.Struct("<QI")
+# Type, code, and value of an evdev event
+INPUT_EVENT = struct.Struct("<HHi")
+
+
+class RawInputEvent(NamedTuple):
+    type: int
+    code: int
+    value: int
+
+
+class Replayable(Protocol):
+    RECORD_KIND: str
+
+    def replay_open(self, meta: dict) -> None:
+        """Sets up decoding without the device, from the recorded metadata."""
+        ...
+
+    def replay(self, data: bytes, ts: int) -> Sequence[Event]:
+        """Decodes a recorded read."""
+        ...
+
+
+class Recorder:
+    """Writes the raw reads of a producer to a compact binary log.
+
+    The log starts with a magic, followed by JSON metadata that holds what
+    the decoders need from the device (e.g., axis ranges or the IIO scan
+    layout). Each read follows as a nanosecond timestamp, its length and the
+    bytes, as they were returned by the kernel."""
+
+    def __init__(self, fn: str, kind: str, meta: dict) -> None:
+        self.fn = fn
+        self.f: BinaryIO | None = open(fn, "wb")
+        head = json.dumps({"kind": kind, "meta": meta}).encode()
+        self.f.write(MAGIC + META.pack(len(head)) + head)
+        self.count = 0
+
+    def write(self, data: bytes | memoryview, ts: int | None = None):
+        if not self.f:
+            return
+        if ts is None:
+            ts = time.perf_counter_ns()
+        self.f.write(RECORD.pack(ts, len(data)))
+        self.f.write(data)
+        self.count += 1
+
+    def close(self):
+        if self.f:
+            self.f.close()
+            self.f = None
+            logger.info(f"Recorded {self.count} reads to '{self.fn}'.")
+
+
+def open_recorder(kind: str, name: str, meta: dict) -> Recorder | None:
+    """Returns a recorder if capture is enabled with `HHD_RECORD_DIR`."""
+    if not RECORD_DIR:
+        return None
+    try:
+        os.makedirs(RECORD_DIR, exist_ok=True)
+        name = "".join(c if c.isalnum() or c in "-_" else "_" for c in name)
+        fn = os.path.join(RECORD_DIR, f"{kind}-{name}-{time.time_ns()}.hhdrec")
+        logger.info(f"Recording raw input of '{name}' to '{fn}'.")
+        return Recorder(fn, kind, meta)
+    except Exception as e:
+        logger.error(f"Could not start recording '{name}':\n{e}")
+        return None
+
+
+def read_log(fn: str) -> tuple[str, dict, list[tuple[int, bytes]]]:
+    """Returns the kind, the metadata, and the reads of a log."""
+    with open(fn, "rb") as f:
+        data = f.read()
+
+    if not data.startswith(MAGIC):
+        raise ValueError(f"File '{fn}' is not an hhd input recording.")
+    ofs = len(MAGIC)
+    (size,) = META.unpack_from(data, ofs)
+    ofs += META.size
+    head = json.loads(data[ofs : ofs + size])
+    ofs += size
+
+    records = []
+    while ofs + RECORD.size <= len(data):
+        ts, size = RECORD.unpack_from(data, ofs)
+        ofs += RECORD.size
+        if ofs + size > len(data):
+            logger.warning(f"Log '{fn}' is truncated, ignoring the last read.")
+            break
+        records.append((ts, data[ofs : ofs + size]))
+        ofs += size
+    return head["kind"], head["meta"], records
+
+
+def pack_input_events(evs: Sequence[Any]) -> bytes:
+    return b"".join(INPUT_EVENT.pack(e.type, e.code, e.value) for e in evs)
+
+
+def unpack_input_events(data: bytes) -> Iterator[RawInputEvent]:
+    for e in INPUT_EVENT.iter_unpack(data):
+        yield RawInputEvent(*e)
+
+
+class ReplayProducer(Producer):
+    """Feeds a recorded log through the decoders of `producer`, which is
+    configured as for the device but not opened.
+
+    It has no file descriptors, so it should be registered with
+    `ControllerRuntime.always_produce`. With `realtime`, the reads are
+    emitted with their original timing. Otherwise, `batch` reads are emitted
+    per call, as fast as the loop runs (e.g., for benchmarks)."""
+
+    def __init__(
+        self,
+        fn: str,
+        producer: Replayable,
+        realtime: bool = True,
+        loop: bool = False,
+        batch: int = 1,
+    ) -> None:
+        self.fn = fn
+        self.producer = producer
+        self.realtime = realtime
+        self.loop = loop
+        self.batch = batch
+        self.records: list[tuple[int, bytes]] = []
+        self.idx = 0
+        self.offset: int | None = None
+
+    def open(self) -> Sequence[int]:
+        kind, meta, self.records = read_log(self.fn)
+        if kind != self.producer.RECORD_KIND:
+            raise ValueError(
+                f"Log '{self.fn}' is from a '{kind}' device, "
+                + f"it can not be replayed with a '{self.producer.RECORD_KIND}' one."
+            )
+        self.producer.replay_open(meta)
+        self.idx = 0
+        self.offset = None
+        return []
+
+    @property
+    def done(self):
+        return not self.loop and self.idx >= len(self.records)
+
+    def produce(self, fds: Sequence[int]) -> Sequence[Event]:
+        if not self.records:
+            return []
+        if self.idx >= len(self.records):
+            if not self.loop:
+                return []
+            self.idx = 0
+            self.offset = None
+
+        out: list[Event] = []
+        if self.realtime:
+            now = time.perf_counter_ns()
+            if self.offset is None:
+                self.offset = now - self.records[self.idx][0]
+            while self.idx < len(self.records):
+                ts, data = self.records[self.idx]
+                if ts + self.offset > now:
+                    break
+                out.extend(self.producer.replay(data, ts + self.offset))
+                self.idx += 1
+        else:
+            for ts, data in self.records[self.idx : self.idx + self.batch]:
+                out.extend(self.producer.replay(data, ts))
+            self.idx += self.batch
+        return out
+
+    def close(self, exit: bool) -> bool:
+        self.records = []
+        return True
+
+
+__all__ = ["Recorder", "ReplayProducer", "open_recorder", "read_log"]
@@ -0,0 +1,376 @@
+import errno
+import logging
+import os
+import re
+import socket
+from threading import Event, Lock, Thread
+from typing import NamedTuple, Sequence
+
+from .common import matches_patterns
+
+logger = logging.getLogger(__name__)
+
+NETLINK_KOBJECT_UEVENT = 15
+# Kernel uevents, udev rebroadcasts them on group 2 after processing
+UEVENT_GROUP_KERNEL = 1
+UEVENT_BUFFER_SIZE = 16384
+SOCKET_TIMEOUT = 1
+
+SYSFS_DIR = "/sys"
+SUBSYSTEM_DIRS = {
+    "input": "class/input",
+    "hidraw": "class/hidraw",
+    "iio": "bus/iio/devices",
+    "usb": "bus/usb/devices",
+}
+
+# Without a netlink socket, subscribers fall back to polling
+POLL_DELAY = 0.1
+
+
+class DeviceEntry(NamedTuple):
+    subsystem: str
+    devpath: str
+    devname: str | None
+    vid: int | None
+    pid: int | None
+    name: str | None
+
+
+def _read_attr(fn: str):
+    try:
+        with open(fn, "r") as f:
+            return f.read().strip()
+    except Exception:
+        return None
+
+
+def _read_uevent(fn: str):
+    out = {}
+    try:
+        with open(fn, "r") as f:
+            for line in f:
+                k, _, v = line.strip().partition("=")
+                out[k] = v
+    except Exception:
+        pass
+    return out
+
+
+def read_entry(subsystem: str, devpath: str) -> DeviceEntry | None:
+    """Reads the IDs and name of a device from sysfs."""
+    syspath = SYSFS_DIR + devpath
+    ue = _read_uevent(os.path.join(syspath, "uevent"))
+    if not ue:
+        return None
+
+    vid = pid = None
+    name = None
+    try:
+        match subsystem:
+            case "input":
+                # The IDs live in the inputN device, eventN and jsN are children
+                if "PRODUCT" not in ue:
+                    ue = {
+                        **_read_uevent(os.path.join(syspath, "device", "uevent")),
+                        **ue,
+                    }
+                if "PRODUCT" in ue:
+                    _, vid, pid, _ = (int(v, 16) for v in ue["PRODUCT"].split("/"))
+                name = ue.get("NAME", None)
+                if name:
+                    name = name.strip('"')
+            case "hidraw":
+                hid = _read_uevent(os.path.join(syspath, "device", "uevent"))
+                if "HID_ID" in hid:
+                    _, vid, pid = (int(v, 16) for v in hid["HID_ID"].split(":"))
+                name = hid.get("HID_NAME", None)
+            case "usb":
+                if "PRODUCT" in ue:
+                    vid, pid, _ = (int(v, 16) for v in ue["PRODUCT"].split("/"))
+                name = _read_attr(os.path.join(syspath, "product"))
+            case "iio":
+                name = _read_attr(os.path.join(syspath, "name"))
+    except Exception as e:
+        logger.warning(f"Could not parse uevent of device '{devpath}':\n{e}")
+
+    return DeviceEntry(subsystem, devpath, ue.get("DEVNAME", None), vid, pid, name)
+
+
+def parse_uevent(data: bytes) -> dict[str, str] | None:
+    """Parses a kernel uevent message (`ACTION@DEVPATH\\0KEY=VALUE\\0...`)."""
+    header, _, body = data.partition(b"\0")
+    if b"@" not in header:
+        # Not a kernel message (e.g., libudev)
+        return None
+
+    out = {}
+    for line in body.split(b"\0"):
+        k, sep, v = line.partition(b"=")
+        if sep:
+            out[k.decode(errors="replace")] = v.decode(errors="replace")
+    if "ACTION" not in out or "DEVPATH" not in out:
+        return None
+    return out
+
+
+class Subscription:
+    """Wakes up a waiting plugin when a matching device is added or changed.
+    Devices match when their subsystem, vendor ID, product ID, and name all
+    match the given patterns (empty matches everything)."""
+
+    def __init__(
+        self,
+        registry: "DeviceRegistry",
+        subsystems: Sequence[str],
+        vid: Sequence[int],
+        pid: Sequence[int],
+        name: Sequence[str | re.Pattern],
+    ) -> None:
+        self.registry = registry
+        self.subsystems = subsystems
+        self.vid = vid
+        self.pid = pid
+        self.name = name
+        self.event = Event()
+        self.should_exit: Event | None = None
+
+    def matches(self, dev: DeviceEntry):
+        if self.subsystems and dev.subsystem not in self.subsystems:
+            return False
+        if self.vid and (dev.vid is None or not matches_patterns(dev.vid, self.vid)):
+            return False
+        if self.pid and (dev.pid is None or not matches_patterns(dev.pid, self.pid)):
+            return False
+        if self.name and (
+            dev.name is None or not matches_patterns(dev.name, self.name)
+        ):
+            return False
+        return True
+
+    def clear(self):
+        """Call before checking for devices, so that devices that appear
+        during the check wake up the next `wait`."""
+        self.event.clear()
+
+    def wait(self, timeout: float, should_exit: Event | None = None) -> bool:
+        """Sleeps until a matching device appears, the timeout expires, or
+        `should_exit` is set. Returns True if a device appeared.
+
+        The uevent thread checks `should_exit` whenever it wakes up, so it is
+        noticed within `SOCKET_TIMEOUT`."""
+        if not self.registry.live:
+            timeout = min(timeout, POLL_DELAY)
+        if should_exit and should_exit.is_set():
+            return False
+
+        self.should_exit = should_exit
+        try:
+            found = self.event.wait(timeout)
+        finally:
+            self.should_exit = None
+        self.event.clear()
+        return found and not (should_exit and should_exit.is_set())
+
+    def find(self) -> list[DeviceEntry]:
+        """Returns the current devices that match."""
+        return [d for d in self.registry.devices() if self.matches(d)]
+
+    def close(self):
+        self.registry.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+class DeviceRegistry:
+    """Index of the input, hidraw, iio, and usb devices of the system, kept
+    up to date by a thread that listens to kernel uevents.
+
+    Device plugins subscribe with VID/PID/name patterns instead of polling
+    `enumerate_evs` and `enumerate_unique`, so that they wake up as soon as
+    their controller re-enumerates (e.g., after suspend or re-attaching).
+    The thread runs while there are subscribers."""
+
+    def __init__(self) -> None:
+        self.lock = Lock()
+        self.subs: list[Subscription] = []
+        self.index: dict[str, DeviceEntry] = {}
+        self.live = False
+        self.sock = None
+        self.stop: Event | None = None
+
+    def devices(self, subsystem: str | None = None) -> list[DeviceEntry]:
+        with self.lock:
+            if not self.live:
+                self._scan()
+            return [
+                d
+                for d in self.index.values()
+                if subsystem is None or d.subsystem == subsystem
+            ]
+
+    def subscribe(
+        self,
+        subsystems: Sequence[str] = (),
+        vid: Sequence[int] = (),
+        pid: Sequence[int] = (),
+        name: Sequence[str | re.Pattern] = (),
+    ) -> Subscription:
+        sub = Subscription(self, subsystems, vid, pid, name)
+        with self.lock:
+            self.subs.append(sub)
+            if not self.stop:
+                self._start()
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self.lock:
+            if sub in self.subs:
+                self.subs.remove(sub)
+            if self.subs or not self.stop:
+                return
+            # The thread exits on its next socket timeout
+            self.stop.set()
+            self.stop = None
+            self.sock = None
+            self.live = False
+
+    def _start(self):
+        try:
+            sock = socket.socket(
+                socket.AF_NETLINK,
+                socket.SOCK_RAW | socket.SOCK_CLOEXEC,
+                NETLINK_KOBJECT_UEVENT,
+            )
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+            sock.bind((0, UEVENT_GROUP_KERNEL))
+            sock.settimeout(SOCKET_TIMEOUT)
+        except Exception as e:
+            logger.warning(
+                f"Could not open uevent socket, devices will be polled. Error:\n{e}"
+            )
+            return
+
+        # Scan after binding, so that no device is missed
+        self._scan()
+        self.sock = sock
+        self.stop = Event()
+        self.live = True
+        Thread(target=self._loop, args=(sock, self.stop), daemon=True).start()
+
+    def _scan(self):
+        index = {}
+        for subsystem, rel in SUBSYSTEM_DIRS.items():
+            base = os.path.join(SYSFS_DIR, rel)
+            try:
+                names = os.listdir(base)
+            except FileNotFoundError:
+                continue
+            for n in names:
+                devpath = os.path.realpath(os.path.join(base, n))[len(SYSFS_DIR) :]
+                entry = read_entry(subsystem, devpath)
+                if entry:
+                    index[devpath] = entry
+        self.index = index
+
+    def rescan(self):
+        """Rescans the devices and wakes up the subscriptions that match any
+        of them, in case uevents were lost."""
+        with self.lock:
+            self._scan()
+            for sub in self.subs:
+                if any(sub.matches(d) for d in self.index.values()):
+                    sub.event.set()
+
+    def check_exit(self):
+        """Wakes up the subscriptions whose waiting plugin should exit."""
+        with self.lock:
+            for sub in self.subs:
+                if sub.should_exit and sub.should_exit.is_set():
+                    sub.event.set()
+
+    def _loop(self, sock: socket.socket, stop: Event):
+        try:
+            while not stop.is_set():
+                self.check_exit()
+                try:
+                    data = sock.recv(UEVENT_BUFFER_SIZE)
+                except socket.timeout:
+                    continue
+                except OSError as e:
+                    if e.errno != errno.ENOBUFS:
+                        raise
+                    # The kernel dropped uevents, they can not be recovered
+                    logger.warning("Uevent socket overflowed, rescanning devices.")
+                    self.rescan()
+                    continue
+
+                ev = parse_uevent(data)
+                if not ev or ev.get("SUBSYSTEM", None) not in SUBSYSTEM_DIRS:
+                    continue
+                self.process(ev)
+        except Exception as e:
+            logger.error(f"Uevent socket failed, devices will be polled:\n{e}")
+        finally:
+            with self.lock:
+                if self.sock is sock:
+                    # Allow the next subscription to restart the thread
+                    self.sock = None
+                    self.stop = None
+                    self.live = False
+            sock.close()
+
+    def process(self, ev: dict[str, str]):
+        """Updates the index with a parsed uevent and wakes up the matching
+        subscriptions."""
+        action = ev["ACTION"]
+        devpath = ev["DEVPATH"]
+        subsystem = ev.get("SUBSYSTEM", "")
+
+        with self.lock:
+            if action == "remove":
+                self.index.pop(devpath, None)
+                return
+
+            entry = read_entry(subsystem, devpath)
+            if not entry:
+                return
+            self.index[devpath] = entry
+            for sub in self.subs:
+                if sub.matches(entry):
+                    sub.event.set()
+
+
+_registry = None
+_registry_lock = Lock()
+
+
+def get_registry() -> DeviceRegistry:
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = DeviceRegistry()
+        return _registry
+
+
+def subscribe(
+    subsystems: Sequence[str] = (),
+    vid: Sequence[int] = (),
+    pid: Sequence[int] = (),
+    name: Sequence[str | re.Pattern] = (),
+) -> Subscription:
+    """Subscribes to matching devices of the shared registry."""
+    return get_registry().subscribe(subsystems, vid, pid, name)
+
+
+__all__ = [
+    "DeviceEntry",
+    "DeviceRegistry",
+    "Subscription",
+    "get_registry",
+    "subscribe",
+]
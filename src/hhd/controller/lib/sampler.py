@@ -0,0 +1,267 @@
+import ctypes
+import heapq
+import logging
+import math
+import os
+import select
+import time
+from threading import Lock, RLock, Thread
+from typing import Callable, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+CLOCK_MONOTONIC = 1
+TFD_TIMER_ABSTIME = 1
+TFD_NONBLOCK = os.O_NONBLOCK
+TFD_CLOEXEC = os.O_CLOEXEC
+
+
+class _timespec(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+
+class _itimerspec(ctypes.Structure):
+    _fields_ = [("it_interval", _timespec), ("it_value", _timespec)]
+
+
+class TimerFd:
+    """One-shot timer fd armed at absolute `CLOCK_MONOTONIC` deadlines, which
+    match `time.monotonic_ns()`. Uses the `os` bindings when available
+    (Python 3.13+) and libc otherwise."""
+
+    def __init__(self) -> None:
+        self.libc = None
+        if hasattr(os, "timerfd_create"):
+            self.fd = os.timerfd_create(  # type: ignore
+                time.CLOCK_MONOTONIC, flags=TFD_NONBLOCK | TFD_CLOEXEC
+            )
+            return
+
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.timerfd_create(CLOCK_MONOTONIC, TFD_NONBLOCK | TFD_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "timerfd_create failed")
+        self.libc = libc
+        self.fd = fd
+        self.spec = _itimerspec()
+
+    def arm(self, deadline: int):
+        """Fires once at `deadline`, in ns."""
+        # A zero value disarms the timer
+        deadline = max(deadline, 1)
+        if not self.libc:
+            os.timerfd_settime_ns(  # type: ignore
+                self.fd, flags=TFD_TIMER_ABSTIME, initial=deadline
+            )
+            return
+
+        self.spec.it_value.tv_sec, self.spec.it_value.tv_nsec = divmod(
+            deadline, 1_000_000_000
+        )
+        if self.libc.timerfd_settime(
+            self.fd, TFD_TIMER_ABSTIME, ctypes.byref(self.spec), None
+        ):
+            raise OSError(ctypes.get_errno(), "timerfd_settime failed")
+
+    def clear(self):
+        try:
+            os.read(self.fd, 8)
+        except BlockingIOError:
+            pass
+
+    def close(self):
+        os.close(self.fd)
+
+
+class JitterStats(NamedTuple):
+    """Deviation of the measured sample intervals from the period, in s."""
+
+    samples: int
+    period: float
+    mean: float
+    std: float
+    max: float
+
+
+class SamplerTask:
+    def __init__(self, sampler: "Sampler", fn: Callable[[], None], rate: float) -> None:
+        self.sampler = sampler
+        self.fn = fn
+        self.period = int(1_000_000_000 / rate)
+        self.deadline = 0
+        self.last = 0
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.err_sum = 0
+        self.err_sq = 0
+        self.err_max = 0
+
+    def record(self, now: int):
+        if self.last:
+            err = now - self.last - self.period
+            self.count += 1
+            self.err_sum += err
+            self.err_sq += err * err
+            self.err_max = max(self.err_max, abs(err))
+        self.last = now
+
+    def jitter(self, reset: bool = False) -> JitterStats:
+        """Returns the jitter of the sample intervals since the task started
+        or the last reset."""
+        n = self.count
+        mean = self.err_sum / n if n else 0
+        std = math.sqrt(max(self.err_sq / n - mean * mean, 0)) if n else 0
+        out = JitterStats(
+            n, self.period / 1e9, mean / 1e9, std / 1e9, self.err_max / 1e9
+        )
+        if reset:
+            self.reset()
+        return out
+
+    def close(self):
+        self.sampler.remove(self)
+
+    def resume(self):
+        """Schedules a closed task again."""
+        self.sampler.schedule(self)
+
+    def __lt__(self, other: "SamplerTask"):
+        return self.deadline < other.deadline
+
+
+class Sampler:
+    """Calls periodic sampling tasks (e.g., IIO software triggers) from a
+    single thread. Deadlines are absolute, so that sleep overshoot does not
+    accumulate into drift, and are waited for with a timer fd. If the thread
+    falls behind by more than a period, the missed samples are skipped.
+    The thread runs while there are tasks."""
+
+    def __init__(self) -> None:
+        self.lock = RLock()
+        self.tasks: list[SamplerTask] = []
+        self.thread = None
+        self.wake_r = self.wake_w = -1
+
+    def add(self, fn: Callable[[], None], rate: float) -> SamplerTask:
+        """Calls `fn` `rate` times per second, until the task is closed.
+        If `fn` raises, the task is removed."""
+        task = SamplerTask(self, fn, rate)
+        self.schedule(task)
+        return task
+
+    def schedule(self, task: SamplerTask):
+        """Starts calling a task, its first sample is due in one period."""
+        with self.lock:
+            if task in self.tasks:
+                return
+            task.deadline = time.monotonic_ns() + task.period
+            task.last = 0
+            heapq.heappush(self.tasks, task)
+            if not self.thread:
+                self.wake_r, self.wake_w = os.pipe2(os.O_NONBLOCK | os.O_CLOEXEC)
+                self.thread = Thread(
+                    target=self._loop, args=(self.wake_r,), daemon=True
+                )
+                self.thread.start()
+            else:
+                self._wake()
+
+    def remove(self, task: SamplerTask):
+        """Once this returns, the task will not be called again."""
+        with self.lock:
+            if task in self.tasks:
+                self.tasks.remove(task)
+                heapq.heapify(self.tasks)
+                self._wake()
+
+    def _wake(self):
+        try:
+            os.write(self.wake_w, b"\0")
+        except BlockingIOError:
+            # Already woken up
+            pass
+
+    def _loop(self, wake: int):
+        try:
+            timer = TimerFd()
+        except Exception as e:
+            logger.warning(f"Could not create timer fd, falling back to sleep:\n{e}")
+            timer = None
+
+        try:
+            while True:
+                with self.lock:
+                    if not self.tasks:
+                        self._stop()
+                        return
+                    deadline = self.tasks[0].deadline
+
+                if timer:
+                    timer.arm(deadline)
+                    r = select.select([timer.fd, wake], [], [])[0]
+                else:
+                    timeout = max(deadline - time.monotonic_ns(), 0) / 1e9
+                    r = select.select([wake], [], [], timeout)[0]
+                if wake in r:
+                    # Tasks changed, reschedule
+                    while True:
+                        try:
+                            if not os.read(wake, 64):
+                                break
+                        except BlockingIOError:
+                            break
+                    continue
+                if timer:
+                    timer.clear()
+
+                self._run()
+        except Exception as e:
+            logger.error(f"Sampler thread failed with error:\n{e}")
+            with self.lock:
+                self.tasks = []
+                self._stop()
+        finally:
+            os.close(wake)
+            if timer:
+                timer.close()
+
+    def _stop(self):
+        os.close(self.wake_w)
+        self.thread = None
+        self.wake_r = self.wake_w = -1
+
+    def _run(self):
+        with self.lock:
+            now = time.monotonic_ns()
+            while self.tasks and self.tasks[0].deadline <= now:
+                task = heapq.heappop(self.tasks)
+                try:
+                    task.fn()
+                except Exception as e:
+                    logger.warning(f"Sampler task failed with error:\n{e}")
+                    continue
+                task.record(now)
+
+                task.deadline += task.period
+                if task.deadline <= now:
+                    # Skip the samples that were missed
+                    missed = (now - task.deadline) // task.period + 1
+                    task.deadline += missed * task.period
+                heapq.heappush(self.tasks, task)
+
+
+_sampler = None
+_sampler_lock = Lock()
+
+
+def get_sampler() -> Sampler:
+    global _sampler
+    with _sampler_lock:
+        if _sampler is None:
+            _sampler = Sampler()
+        return _sampler
+
+
+__all__ = ["JitterStats", "Sampler", "SamplerTask", "TimerFd", "get_sampler"]
@@ -16,6 +16,8 @@ from hhd.controller import can_read
 
 # _HID_MAX_DESCRIPTOR_SIZE = 4096
 UHID_DATA_MAX = 4096
+# + 4 for desc, + 3 for output report
+UHID_READ_SIZE = UHID_DATA_MAX + 4 + 3
 
 
 BUS_PCI = 0x01
@@ -190,6 +192,13 @@ class EventOther(TypedDict):
     type: Literal["open", "close", "stop"]
 
 
+# Native byte order, no padding
+_EV_TYPE = struct.Struct("=L")
+_START_REQ = struct.Struct("=Q")
+_OUTPUT_REQ_TAIL = struct.Struct("=HB")
+_GET_REPORT_REQ = struct.Struct("=LBB")
+
+
 class UhidDevice:
     def __init__(
         self,
@@ -221,6 +230,9 @@ class UhidDevice:
 
         self.fd = 0
         self.poll = None
+        # Reused by reads, events copy the data they return
+        self.buf = bytearray(UHID_READ_SIZE)
+        self.view = memoryview(self.buf)
 
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}(vid={self.vid}, pid={self.pid}, name={self.name}, uniq={self.unique_name})"
@@ -236,7 +248,8 @@ class UhidDevice:
 
     def send_event(self, event: bytes):
         if not self.fd:
-            self.fd = os.open("/dev/uhid", os.O_RDWR)
+            # Writes to uhid do not block, reads return EAGAIN when empty
+            self.fd = os.open("/dev/uhid", os.O_RDWR | os.O_NONBLOCK)
         os.write(self.fd, event)
 
     def read_event(
@@ -245,15 +258,37 @@ class UhidDevice:
         if not self.fd or not can_read(self.fd):
             return None
 
-        # + 4 for desc, + 3 for output report
-        d = os.read(self.fd, UHID_DATA_MAX + 4 + 3)
+        try:
+            n = os.readv(self.fd, (self.buf,))
+        except BlockingIOError:
+            return None
+        return self._parse_event(n)
 
-        v = int.from_bytes(d[:4], byteorder=sys.byteorder)
+    def read_events(
+        self,
+    ) -> list[EventOther | EventStart | EventOutput | EventSetReport | EventGetReport]:
+        """Returns all queued events, reading until the kernel returns `EAGAIN`."""
+        out = []
+        if not self.fd:
+            return out
+
+        while True:
+            try:
+                n = os.readv(self.fd, (self.buf,))
+            except BlockingIOError:
+                break
+            if not n:
+                break
+            out.append(self._parse_event(n))
+        return out
+
+    def _parse_event(
+        self, n: int
+    ) -> EventOther | EventStart | EventOutput | EventSetReport | EventGetReport:
+        d = self.view
+        (v,) = _EV_TYPE.unpack_from(d)
         if v == UHID_START:
-            return {
-                "type": "start",
-                "dev_flags": int.from_bytes(d[4:12], byteorder=sys.byteorder),
-            }
+            return {"type": "start", "dev_flags": _START_REQ.unpack_from(d, 4)[0]}
         elif v == UHID_STOP:
             return {"type": "stop"}
         elif v == UHID_OPEN:
@@ -261,23 +296,21 @@ class UhidDevice:
         elif v == UHID_CLOSE:
             return {"type": "close"}
         elif v == UHID_OUTPUT:
-            l = int.from_bytes(d[-3:-1], byteorder=sys.byteorder)
-            return {"type": "output", "report": d[-1], "data": d[4 : 4 + l]}
+            l, report = _OUTPUT_REQ_TAIL.unpack_from(d, n - 3)
+            return {"type": "output", "report": report, "data": bytes(d[4 : 4 + l])}
         elif v == UHID_SET_REPORT:
+            id, rnum, rtype = _GET_REPORT_REQ.unpack_from(d, 4)
             return {
                 "type": "set_report",
-                "id": int.from_bytes(d[4:8], byteorder=sys.byteorder),
-                "rnum": d[8],
-                "rtype": d[9],
-                "data": d[10:],
+                "id": id,
+                "rnum": rnum,
+                "rtype": rtype,
+                # Starts with the size of the report
+                "data": bytes(d[10:n]),
             }
         elif v == UHID_GET_REPORT:
-            return {
-                "type": "get_report",
-                "id": int.from_bytes(d[4:8], byteorder=sys.byteorder),
-                "rnum": d[8],
-                "rtype": d[9],
-            }
+            id, rnum, rtype = _GET_REPORT_REQ.unpack_from(d, 4)
+            return {"type": "get_report", "id": id, "rnum": rnum, "rtype": rtype}
         assert False, f"Report type {v} unknown"
 
     def send_create(self) -> None:
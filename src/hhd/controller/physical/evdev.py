@@ -5,7 +5,8 @@ import re
 import stat
 import subprocess
 import time
-from typing import Collection, Mapping, Sequence, TypeVar, cast
+from types import MappingProxyType
+from typing import Any, Collection, Iterable, Mapping, Sequence, TypeVar, cast
 
 import evdev
 from evdev import ecodes, ff
@@ -15,6 +16,12 @@ from hhd.controller.base import Event
 from hhd.controller.const import AbsAxis, GamepadButton, KeyboardButton
 from hhd.controller.lib.common import hexify, matches_patterns
 from hhd.controller.lib.hide import hide_gamepad, unhide_gamepad
+from hhd.controller.lib.record import (
+    Recorder,
+    open_recorder,
+    pack_input_events,
+    unpack_input_events,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +32,9 @@ def B(b: str):
 
 A = TypeVar("A")
 
+# Delay before a meta press is emitted, in case it is part of a shortcut
+META_DELAY = 0.07
+
 
 def to_map(b: dict[A, Sequence[int]]) -> dict[int, A]:
     out = {}
@@ -153,9 +163,6 @@ def find_joystick(ev: str):
 def is_device(fn):
     """Check if ``fn`` is a readable and writable character device."""
 
-    if not os.path.exists(fn):
-        return False
-
     try:
         m = os.stat(fn)[stat.ST_MODE]
         if not stat.S_ISCHR(m):
@@ -168,54 +175,97 @@ def is_device(fn):
     return True
 
 
-def list_evs(filter_valid: bool = False, fn: str = "/proc/bus/input/devices"):
+PROC_INPUT_DEVICES = "/proc/bus/input/devices"
+EvInfo = Mapping[str, Any]
+
+
+def _parse_ev(d: str) -> tuple[EvInfo, tuple[str, ...]]:
+    out = {}
+    out["hash"] = hash(d)
+    handlers = []
+    for line in d.split("\n"):
+        if not line:
+            continue
+        match line[0]:
+            case "I":
+                for attr in line[3:].split(" "):
+                    name, val = attr.split("=")
+                    out[name.lower()] = int(val, 16)
+            case "N":
+                out["name"] = line[len('N: Name="') : -1]
+            case "B":
+                if "byte" not in out:
+                    out["byte"] = {}
+                head, raw = line[3:].split("=")
+                arr = bytearray()
+                for x in raw.split(" "):
+                    if not x:
+                        continue
+                    arr.extend(int(x, 16).to_bytes(8, "big"))
+                # Array is stacked using big endianness, so
+                # we reverse it to little endian
+                out["byte"][head.lower()] = bytes(reversed(arr))
+            case "P":
+                out["phys"] = line[len('P: Phys=') : ]
+            case "S":
+                if "Sysfs" in line:
+                    out["sysfs"] = line[len('S: Sysfs=') : ]
+            case "U":
+                if "Uniq" in line:
+                    out["uniq"] = line[len('U: Uniq=') :]
+            case "H":
+                if len(line) < len("H: Handlers=") + 1:
+                    continue
+                for handler in line[len("H: Handlers=") : -1].split(" "):
+                    if "event" in handler:
+                        handlers.append("/dev/input/" + handler)
+
+    if "byte" in out:
+        out["byte"] = MappingProxyType(out["byte"])
+    return MappingProxyType(out), tuple(handlers)
+
+
+# Per file: the last contents, the device table, and the parsed blocks
+_evs_cache: dict[
+    str, tuple[str, Mapping[str, EvInfo], dict[str, tuple[EvInfo, tuple[str, ...]]]]
+] = {}
+
+
+def _read_evs(fn: str) -> Mapping[str, EvInfo]:
     with open(fn, "r") as f:
         data = f.read()
 
+    cached = _evs_cache.get(fn, None)
+    if cached and cached[0] == data:
+        return cached[1]
+
+    # Only parse the devices that changed since the last read
+    old = cached[2] if cached else {}
+    blocks = {}
     devs = {}
     for d in data.split("\n\n"):
-        out = {}
-        out["hash"] = hash(d)
-        for line in d.split("\n"):
-            if not line:
-                continue
-            match line[0]:
-                case "I":
-                    for attr in line[3:].split(" "):
-                        name, val = attr.split("=")
-                        out[name.lower()] = int(val, 16)
-                case "N":
-                    out["name"] = line[len('N: Name="') : -1]
-                case "B":
-                    if "byte" not in out:
-                        out["byte"] = {}
-                    head, raw = line[3:].split("=")
-                    arr = bytearray()
-                    for x in raw.split(" "):
-                        if not x:
-                            continue
-                        arr.extend(int(x, 16).to_bytes(8, "big"))
-                    # Array is stacked using big endianness, so
-                    # we reverse it to little endian
-                    out["byte"][head.lower()] = bytes(reversed(arr))
-                case "P":
-                    out["phys"] = line[len('P: Phys=') : ]
-                case "S":
-                    if "Sysfs" in line:
-                        out["sysfs"] = line[len('S: Sysfs=') : ]
-                case "U":
-                    if "Uniq" in line:
-                        out["uniq"] = line[len('U: Uniq=') :]
-                case "H":
-                    if len(line) < len("H: Handlers=") + 1:
-                        continue
-                    for handler in line[len("H: Handlers=") : -1].split(" "):
-                        if "event" in handler:
-                            pth = "/dev/input/" + handler
-                            if not filter_valid or is_device(pth):
-                                devs[pth] = out
-
-    return devs
+        parsed = old.get(d, None) or _parse_ev(d)
+        blocks[d] = parsed
+        info, handlers = parsed
+        for pth in handlers:
+            devs[pth] = info
+
+    table = MappingProxyType(devs)
+    _evs_cache[fn] = (data, table, blocks)
+    return table
+
+
+def list_evs(
+    filter_valid: bool = False, fn: str = PROC_INPUT_DEVICES
+) -> Mapping[str, EvInfo]:
+    """Returns the input devices, by event node path. The table and its entries
+    are shared between callers and read-only. They are re-parsed only when the
+    contents of `fn` change. With `filter_valid`, only devices that can be
+    opened are returned."""
+    devs = _read_evs(fn)
+    if not filter_valid:
+        return devs
+    return {k: v for k, v in devs.items() if is_device(k)}
 
 
 def enumerate_evs(
@@ -231,6 +281,7 @@ def enumerate_evs(
 
 
 class GenericGamepadEvdev(Producer, Consumer):
+    RECORD_KIND = "evdev"
 
     def __init__(
         self,
@@ -271,6 +322,7 @@ class GenericGamepadEvdev(Producer, Consumer):
         self.start_pressed = None
         self.start_held = False
         self.requires_start = requires_start
+        self.recorder: Recorder | None = None
 
     def open(self) -> Sequence[int]:
         for d, info in list_evs(filter_valid=True).items():
@@ -329,6 +381,16 @@ class GenericGamepadEvdev(Producer, Consumer):
                 self.started = True
                 self.effect_id = -1
                 self.queue = []
+                self.recorder = open_recorder(
+                    self.RECORD_KIND,
+                    self.dev.name,
+                    {
+                        "name": self.dev.name,
+                        "vendor": self.dev.info.vendor,
+                        "product": self.dev.info.product,
+                        "ranges": list(self.ranges.items()),
+                    },
+                )
             except Exception as e:
                 # Prevent leftover rules in case of error
                 if self.hidden:
@@ -358,8 +420,24 @@ class GenericGamepadEvdev(Producer, Consumer):
             self.dev.close()
             self.dev = None
             self.fd = 0
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
         return True
 
+    def replay_open(self, meta: dict):
+        self.ranges = {a: tuple(r) for a, r in meta["ranges"]}
+        self.started = True
+        self.queue = []
+        self.start_pressed = None
+        self.start_held = False
+
+    def replay(self, data: bytes, ts: int) -> Sequence[Event]:
+        curr = time.time()
+        out = self._pending(curr)
+        out.extend(self.decode(unpack_input_events(data), curr))
+        return out
+
     def consume(self, events: Sequence[Event]):
         if not self.dev:
             return
@@ -398,15 +476,15 @@ class GenericGamepadEvdev(Producer, Consumer):
                         self.effect_id = self.dev.upload_effect(effect)
                         self.dev.write(getattr(ecodes, "EV_FF"), self.effect_id, 1)
 
-    def produce(self, fds: Sequence[int]) -> Sequence[Event]:
+    def _pending(self, curr: float) -> list[Event]:
+        """Returns the delayed events that are due."""
         out: list[Event] = []
-        curr = time.time()
         if self.queue:
             ev, t = self.queue[0]
             if curr >= t:
                 out.append(ev)
                 self.queue.pop(0)
-        if self.start_pressed and curr - self.start_pressed > 0.07:
+        if self.start_pressed and curr - self.start_pressed > META_DELAY:
             self.start_pressed = None
             out.append(
                 {
@@ -415,6 +493,22 @@ class GenericGamepadEvdev(Producer, Consumer):
                     "value": True,
                 }
             )
+        return out
+
+    def next_deadline(self) -> float | None:
+        ts = []
+        if self.queue:
+            ts.append(self.queue[0][1])
+        if self.start_pressed:
+            ts.append(self.start_pressed + META_DELAY)
+        if not ts:
+            return None
+        # Delayed events use the wall clock
+        return time.perf_counter() + min(ts) - time.time()
+
+    def produce(self, fds: Sequence[int]) -> Sequence[Event]:
+        curr = time.time()
+        out = self._pending(curr)
 
         if not self.dev or not self.fd in fds:
             return out
@@ -430,87 +524,108 @@ class GenericGamepadEvdev(Producer, Consumer):
             )
 
         while can_read(self.fd):
-            for e in self.dev.read():
-                if e.type == B("EV_KEY"):
-                    if e.code == B("KEY_LEFTMETA"):
-                        self.start_held = e.value != 0
-                    if e.code in self.btn_map and (
-                        not self.requires_start or self.start_held or not e.value
-                    ):
-                        # Only 1 is valid for press (look at sysrq)
-                        if e.code == B("KEY_LEFTMETA") and e.value:
-                            # start requires special handling
-                            # If it exists on the button map, it may
-                            # also be used for other shortcuts.
-                            # So we have to wait a bit to see if it is
-                            # a standalone press
-                            self.start_pressed = curr
-                        elif e.value == 0 or e.value == 1:
-                            out.append(
-                                {
-                                    "type": "button",
-                                    "code": self.btn_map[e.code],
-                                    "value": bool(e.value),
-                                }
-                            )
-                            self.start_pressed = None
-                elif e.type == B("EV_ABS"):
-                    if e.code in self.axis_map:
-                        ax = self.axis_map[e.code]
-                        if ax in self.postprocess and self.postprocess[ax].get(
-                            "zero_is_middle", False
-                        ):
-                            mmax = self.ranges[e.code][1] + 1
-                            val = (e.value - mmax // 2 + 1) / mmax * 2
-                        else:
-                            # Normalize
-                            val = e.value / abs(
-                                self.ranges[e.code][1 if e.value >= 0 else 0]
-                            )
-
-                        # Calibrate
-                        if ax in self.postprocess:
-                            calib = self.postprocess[ax]
-                            if val < 0 and "min" in calib:
-                                m = calib["min"]
-                                if m:
-                                    # avoid division by 0
-                                    val = -max(m, val) / m
-                            elif val > 0 and "max" in calib:
-                                m = calib["max"]
-                                val = min(m, val) / m
-
-                            if "deadzone" in calib:
-                                d = calib["deadzone"]
-                                if abs(val) < d:
-                                    val = 0
+            evs = list(self.dev.read())
+            if self.recorder:
+                self.recorder.write(pack_input_events(evs))
+            out.extend(self.decode(evs, curr))
+
+        return out
+
+    def resume(self):
+        # Drop the events queued while suspended, so that stale presses
+        # are not replayed to the client that just connected
+        self.queue = []
+        self.start_pressed = None
+        if self.dev:
+            while can_read(self.fd):
+                for _ in self.dev.read():
+                    pass
+        return None
 
+    def decode(self, evs: Iterable[Any], curr: float) -> list[Event]:
+        """Decodes a read of evdev events (with `type`, `code`, and `value`)."""
+        out: list[Event] = []
+        for e in evs:
+            if e.type == B("EV_KEY"):
+                if e.code == B("KEY_LEFTMETA"):
+                    self.start_held = e.value != 0
+                if e.code in self.btn_map and (
+                    not self.requires_start or self.start_held or not e.value
+                ):
+                    # Only 1 is valid for press (look at sysrq)
+                    if e.code == B("KEY_LEFTMETA") and e.value:
+                        # start requires special handling
+                        # If it exists on the button map, it may
+                        # also be used for other shortcuts.
+                        # So we have to wait a bit to see if it is
+                        # a standalone press
+                        self.start_pressed = curr
+                    elif e.value == 0 or e.value == 1:
                         out.append(
                             {
-                                "type": "axis",
-                                "code": ax,
-                                "value": val,
+                                "type": "button",
+                                "code": self.btn_map[e.code],
+                                "value": bool(e.value),
                             }
                         )
-                elif e.type == B("EV_MSC"):
-                    if e.code in self.msc_map:
-                        out.append(
+                        self.start_pressed = None
+            elif e.type == B("EV_ABS"):
+                if e.code in self.axis_map:
+                    ax = self.axis_map[e.code]
+                    if ax in self.postprocess and self.postprocess[ax].get(
+                        "zero_is_middle", False
+                    ):
+                        mmax = self.ranges[e.code][1] + 1
+                        val = (e.value - mmax // 2 + 1) / mmax * 2
+                    else:
+                        # Normalize
+                        val = e.value / abs(
+                            self.ranges[e.code][1 if e.value >= 0 else 0]
+                        )
+
+                    # Calibrate
+                    if ax in self.postprocess:
+                        calib = self.postprocess[ax]
+                        if val < 0 and "min" in calib:
+                            m = calib["min"]
+                            if m:
+                                # avoid division by 0
+                                val = -max(m, val) / m
+                        elif val > 0 and "max" in calib:
+                            m = calib["max"]
+                            val = min(m, val) / m
+
+                        if "deadzone" in calib:
+                            d = calib["deadzone"]
+                            if abs(val) < d:
+                                val = 0
+
+                    out.append(
+                        {
+                            "type": "axis",
+                            "code": ax,
+                            "value": val,
+                        }
+                    )
+            elif e.type == B("EV_MSC"):
+                if e.code in self.msc_map:
+                    out.append(
+                        {
+                            "type": "button",
+                            "code": self.btn_map[e.code],
+                            "value": True,
+                        }
+                    )
+                    self.queue.append(
+                        (
                             {
                                 "type": "button",
                                 "code": self.btn_map[e.code],
-                                "value": True,
-                            }
-                        )
-                        self.queue.append(
-                            (
-                                {
-                                    "type": "button",
-                                    "code": self.btn_map[e.code],
-                                    "value": False,
-                                },
-                                curr + self.msc_delay,
-                            )
+                                "value": False,
+                            },
+                            curr + self.msc_delay,
                         )
+                    )
 
         return out
 
@@ -12,17 +12,10 @@ from hhd.controller import (
     can_read,
 )
 from hhd.controller.base import Event
-from hhd.controller.lib.common import (
-    AM,
-    BM,
-    CM,
-    decode_axis,
-    decode_config,
-    get_button,
-    hexify,
-    matches_patterns,
-)
+from hhd.controller.lib.codec import ReportDecoder, compile_decoders
+from hhd.controller.lib.common import AM, BM, CM, hexify, matches_patterns
 from hhd.controller.lib.hid import MAX_REPORT_SIZE, Device, enumerate_unique
+from hhd.controller.lib.record import Recorder, open_recorder
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +26,8 @@ class EventCallback(Protocol):
 
 
 class GenericGamepadHidraw(Producer, Consumer):
+    RECORD_KIND = "hidraw"
+
     def __init__(
         self,
         vid: Sequence[int] = [],
@@ -74,6 +69,19 @@ class GenericGamepadHidraw(Producer, Consumer):
         self.fd = 0
 
         self.report = None
+        self.buf = None
+        self.decoders: dict[int | None, ReportDecoder] = {}
+        self.recorder: Recorder | None = None
+
+    def setup_decode(self):
+        self.report = None
+        # Reports are read in place and decoded from views of this buffer
+        self.buf = bytearray(self.report_size)
+        self.view = memoryview(self.buf)
+        self.prev_btn = {}
+        self.prev_axis = {}
+        self.prev_config = {}
+        self.decoders = compile_decoders(self.btn_map, self.axis_map, self.config_map)
 
     def open(self) -> Sequence[int]:
         for d in enumerate_unique():
@@ -106,10 +114,12 @@ class GenericGamepadHidraw(Producer, Consumer):
                 f"Found device {hexify(d['vendor_id'])}:{hexify(d['product_id'])}:\n"
                 + f"'{d['manufacturer_string']}': '{d['product_string']}' at {d['path']}"
             )
-            self.report = None
-            self.prev_btn = {}
-            self.prev_axis = {}
-            self.prev_config = {}
+            self.setup_decode()
+            self.recorder = open_recorder(
+                self.RECORD_KIND,
+                f"{d['vendor_id']:04x}_{d['product_id']:04x}_{d['usage_page']:04x}",
+                {k: v.decode() if isinstance(v, bytes) else v for k, v in d.items()},
+            )
             return [self.fd]
 
         err = f"Device with the following not found:\n"
@@ -134,25 +144,41 @@ class GenericGamepadHidraw(Producer, Consumer):
 
     def produce(self, fds: Sequence[int]) -> Sequence[Event]:
         # If we can not read return
-        if not self.fd or self.fd not in fds or not self.dev:
+        if not self.fd or self.fd not in fds or not self.dev or not self.buf:
             return []
-        rep = None
 
         if self.lossless:
-            # Keep all events
-            rep = self.dev.read(self.report_size)
-        else:
-            # Throw away stale events
-            while can_read(self.fd):
-                rep = self.dev.read(self.report_size)
+            # Keep all events, draining the queued reports in one go
+            out: list[Event] = []
+            while size := self.dev.readinto(self.buf):
+                out.extend(self.decode(self.view[:size]))
+                if not can_read(self.fd):
+                    break
+            return out
+
+        # Throw away stale events
+        size = 0
+        while can_read(self.fd):
+            size = self.dev.readinto(self.buf)
 
         # If we could not read (?) return
-        if not rep:
+        if not size:
             return []
+        return self.decode(self.view[:size])
 
-        # If the report is the same as the previous one, return
-        if self.report and self.report == rep:
-            return []
+    def resume(self):
+        # Drop the reports queued while suspended, so that stale presses
+        # are not replayed to the client that just connected
+        if self.dev and self.buf:
+            while can_read(self.fd):
+                self.dev.readinto(self.buf)
+        return None
+
+    def decode(self, rep: memoryview) -> list[Event]:
+        """Decodes a report into events. `rep` is a view into the read buffer,
+        so it is only valid until the next read."""
+        if self.recorder:
+            self.recorder.write(rep)
         self.report = rep
         rep_id = rep[2] if len(rep) > 2 else None
 
@@ -160,33 +186,33 @@ class GenericGamepadHidraw(Producer, Consumer):
         if None in self.btn_map or None in self.axis_map:
             rep_id = None
 
-        # Decode buttons
+        dec = self.decoders.get(rep_id, None)
+        if dec is None:
+            return []
+
+        # Only decode the fields whose bytes changed since the last report
+        # with the same ID. Identical reports produce no fields.
+        nbtn = len(dec.btn_codes)
+        naxis = nbtn + len(dec.axis_codes)
         out: list[Event] = []
-        if rep_id in self.btn_map:
-            for btn, map in self.btn_map[rep_id].items():
-                val = get_button(rep, map)
-                if btn in self.prev_btn and self.prev_btn[btn] == val:
-                    continue
-                self.prev_btn[btn] = val
-                out.append({"type": "button", "code": btn, "value": val})
-
-        # Decode Axis
-        if rep_id in self.axis_map:
-            for ax, map in self.axis_map[rep_id].items():
-                val = decode_axis(rep, map)
-                if ax in self.prev_axis and self.prev_axis[ax] == val:
-                    continue
-                self.prev_axis[ax] = val
-                out.append({"type": "axis", "code": ax, "value": val})
-
-        # Decode
-        if rep_id in self.config_map:
-            for cnf, map in self.config_map[rep_id].items():
-                val = decode_config(rep, map)
-                if cnf in self.prev_config and self.prev_config[cnf] == val:
-                    continue
-                self.prev_config[cnf] = val
-                out.append({"type": "configuration", "code": cnf, "value": val})
+        for idx, val in dec.decode_changed(rep):
+            if idx < nbtn:
+                code = dec.btn_codes[idx]
+                prev = self.prev_btn
+                etype = "button"
+            elif idx < naxis:
+                code = dec.axis_codes[idx - nbtn]
+                prev = self.prev_axis
+                etype = "axis"
+            else:
+                code = dec.config_codes[idx - naxis]
+                prev = self.prev_config
+                etype = "configuration"
+
+            if code in prev and prev[code] == val:
+                continue
+            prev[code] = val
+            out.append({"type": etype, "code": code, "value": val})  # type: ignore
         return out
 
     def consume(self, events: Sequence[Event]):
@@ -197,7 +223,19 @@ class GenericGamepadHidraw(Producer, Consumer):
         if self.dev:
             self.dev.close()
             self.dev = None
+        if self.recorder:
+            self.recorder.close()
+            self.recorder = None
+        self.report = None
+        self.buf = None
         return True
 
+    def replay_open(self, meta: dict):
+        self.info = meta
+        self.setup_decode()
+
+    def replay(self, data: bytes, ts: int) -> Sequence[Event]:
+        return self.decode(memoryview(data))
+
 
 __all__ = ["GenericGamepadHidraw", "BM", "AM"]
@@ -1,10 +1,13 @@
 import logging
 import os
 import select
-from threading import Event as TEvent, Thread
+import struct
+import time
 from typing import Any, Generator, Literal, NamedTuple, Sequence
 
 from hhd.controller import Axis, Event, Producer
+from hhd.controller.lib.record import Recorder, open_recorder
+from hhd.controller.lib.sampler import get_sampler
 
 logger = logging.getLogger(__name__)
 
@@ -248,7 +251,59 @@ def get_size(dev: DeviceInfo):
     return out >> 3
 
 
+# Scans read with a single `os.read` call
+IIO_BATCH = 64
+STORAGE_FORMATS = {8: "b", 16: "h", 32: "i", 64: "q"}
+
+
+def get_struct(dev: DeviceInfo) -> struct.Struct | None:
+    """Compiles the scan layout of the device into a struct, with a field for
+    each element that has an axis. Returns None if the layout can not be
+    expressed as a struct (e.g., mixed endianness)."""
+    orders = {s.endianness for s in dev.axis if s.axis and s.storage_bits > 8}
+    if len(orders) > 1:
+        return None
+    fmt = ">" if "big" in orders else "<"
+
+    ofs = 0
+    for s in dev.axis:
+        if ofs % s.storage_bits:
+            # Align bytes
+            pad = (ofs // s.storage_bits + 1) * s.storage_bits - ofs
+            fmt += f"{pad >> 3}x"
+            ofs += pad
+        if not s.axis:
+            fmt += f"{s.storage_bits >> 3}x"
+        elif s.storage_bits in STORAGE_FORMATS:
+            c = STORAGE_FORMATS[s.storage_bits]
+            fmt += c if s.signed else c.upper()
+        else:
+            return None
+        ofs += s.storage_bits
+    return struct.Struct(fmt)
+
+
+def _unpack_slow(dev: DeviceInfo, data: memoryview, size: int):
+    """Fallback of `Struct.iter_unpack` for layouts `get_struct` rejects."""
+    for start in range(0, len(data), size):
+        out = []
+        ofs = start << 3
+        for se in dev.axis:
+            # Align bytes
+            if ofs % se.storage_bits:
+                ofs = (ofs // se.storage_bits + 1) * se.storage_bits
+            if se.axis:
+                d = data[ofs >> 3 : (ofs >> 3) + (se.storage_bits >> 3)]
+                out.append(
+                    int.from_bytes(d, byteorder=se.endianness, signed=se.signed)
+                )
+            ofs += se.storage_bits
+        yield tuple(out)
+
+
 class IioReader(Producer):
+    RECORD_KIND = "iio"
+
     def __init__(
         self,
         types: Sequence[str],
@@ -258,6 +313,7 @@ class IioReader(Producer):
         mappings: dict[str, tuple[Axis, str | None, float, float | None]],
         update_trigger: bool = False,
         legion_fix: bool = False,
+        batch: int = IIO_BATCH,
     ) -> None:
         self.types = types
         self.attr = attr
@@ -268,6 +324,21 @@ class IioReader(Producer):
         self.fd = -1
         self.dev = None
         self.legion_fix = legion_fix
+        self.batch = batch
+        self.recorder: Recorder | None = None
+
+    def setup_decode(self, dev: DeviceInfo):
+        self.last = None
+        self.prev = {}
+        self.dev = dev
+        self.size = get_size(dev)
+        self.elements = tuple(se for se in dev.axis if se.axis)
+        self.struct = get_struct(dev)
+        if self.struct and self.struct.size != self.size:
+            self.struct = None
+        # Reuse the read buffer, it fits up to `batch` scans
+        self.buf = bytearray(self.size * max(self.batch, 1))
+        self.view = memoryview(self.buf)
 
     def open(self):
         sens_dir, type = find_sensor(self.types)
@@ -291,15 +362,19 @@ class IioReader(Producer):
             )
             return []
 
-        self.buf = None
-        self.prev = {}
-        self.dev = dev
+        self.setup_decode(dev)
         self.fd = os.open(dev.dev, os.O_RDONLY)
-        self.size = get_size(dev)
+        if not self.recorder:
+            # Keeps recording to the same log after suspending
+            self.recorder = open_recorder(
+                self.RECORD_KIND,
+                os.path.basename(dev.sysfs),
+                {"dev": dev.dev, "axis": [se._asdict() for se in dev.axis]},
+            )
 
         return [self.fd]
 
-    def close(self, exit: bool):
+    def close_dev(self):
         try:
             if self.dev:
                 close_dev(self.dev)
@@ -308,33 +383,62 @@ class IioReader(Producer):
             if self.fd != -1:
                 os.close(self.fd)
                 self.fd = -1
+
+    def close(self, exit: bool):
+        try:
+            self.close_dev()
+        finally:
+            if self.recorder:
+                self.recorder.close()
+                self.recorder = None
         return True
 
+    def suspend(self):
+        # Disabling the buffer stops the trigger from sampling
+        self.close_dev()
+
+    def resume(self):
+        return self.open()
+
     def produce(self, fds: Sequence[int]) -> Sequence[Event]:
         if self.fd not in fds or not self.dev:
             return []
 
-        data = os.read(self.fd, self.size)
-        if self.buf == data:
-            return []
-        self.buf = data
+        # The kernel returns as many whole scans as are queued, up to the size
+        # of the buffer. If more remain, the fd stays readable.
+        n = os.readv(self.fd, (self.buf,))
+        data = self.view[: n - n % self.size]
+        if self.recorder:
+            self.recorder.write(data)
+        return self.decode(data)
+
+    def replay_open(self, meta: dict):
+        self.setup_decode(
+            DeviceInfo(meta["dev"], [ScanElement(**se) for se in meta["axis"]], "")
+        )
 
-        # Empty the buffer preventing repeated calls
-        while select.select([self.fd], [], [], 0)[0]:
-            data = os.read(self.fd, self.size)
+    def replay(self, data: bytes, ts: int) -> Sequence[Event]:
+        return self.decode(memoryview(data))
+
+    def decode(self, data: memoryview) -> list[Event]:
+        """Decodes whole scans."""
+        if self.struct:
+            samples = self.struct.iter_unpack(data)
+        else:
+            samples = _unpack_slow(self.dev, data, self.size)
 
         out: list[Event] = []
-        ofs = 0
-        for se in self.dev.axis:
-            # Align bytes
-            if ofs % se.storage_bits:
-                ofs = (ofs // se.storage_bits + 1) * se.storage_bits
+        prev = self.prev
+        for raw in samples:
+            # Skip repeated scans
+            if raw == self.last:
+                continue
+            self.last = raw
 
-            # Grab value if required
-            if se.axis:
+            # Emit every sample. Only devices with a timestamp channel tag each
+            # one with its own time, otherwise the samples of a read share one
+            for se, d_raw in zip(self.elements, raw):
                 # TODO: Implement parsing iio fully, by adding shifting and cutoff
-                d = data[ofs >> 3 : (ofs >> 3) + (se.storage_bits >> 3)]
-                d_raw = int.from_bytes(d, byteorder=se.endianness, signed=se.signed)
                 # d = d >> se.shift
                 # d &= (1 << se.bits) - 1
                 d = d_raw * se.scale + se.offset
@@ -345,7 +449,7 @@ class IioReader(Producer):
                     else:
                         d = max(d, -se.max_val)
 
-                if se.axis not in self.prev or self.prev[se.axis] != d:
+                if se.axis not in prev or prev[se.axis] != d:
                     if not (
                         self.legion_fix and (d_raw == -124 or d_raw // 1000 == -125)
                     ):
@@ -363,12 +467,11 @@ class IioReader(Producer):
                         out.append(
                             {
                                 "type": "axis",
-                                "code": se.axis,
+                                "code": se.axis,  # type: ignore
                                 "value": d,
                             }
                         )
-                    self.prev[se.axis] = d
-            ofs += se.storage_bits
+                    prev[se.axis] = d
 
         # TODO: Clean this up
         # Hide duplicate events
@@ -570,10 +673,19 @@ class HrtimerTrigger(IioReader):
         except Exception as e:
             logger.error(f"Could not delete hrtimer trigger. Error:\n{e}")
 
+    def suspend(self):
+        # The timer only fires while the IMU buffers are enabled, so it
+        # stops with the suspended IMU
+        pass
 
-def _sysfs_trig_sampler(ev: TEvent, trigger: int, rate: int = 65):
-    import time
+    def resume(self):
+        return None
 
+
+def _sysfs_trig_sampler(trigger: int, rate: int = 65):
+    """Fires the sysfs trigger `rate` times per second from the shared sampler
+    thread. Returns the sampler task and the trigger fd, which should be closed
+    after the task."""
     trig = None
     for fn in os.listdir("/sys/bus/iio/devices/"):
         if not fn.startswith("trigger"):
@@ -588,23 +700,15 @@ def _sysfs_trig_sampler(ev: TEvent, trigger: int, rate: int = 65):
 
     if trig is None:
         logger.warning(f"Trigger `sysfstrig{trigger}` not found.")
-        return
+        return None
 
-    fd = -1
-    delay = 1 / rate
-    try:
-        fd = os.open(trig, os.O_WRONLY)
-        while not ev.is_set():
-            os.write(fd, b"1")
-            os.lseek(fd, 0, os.SEEK_SET)
-            time.sleep(delay)
-    except KeyboardInterrupt:
-        raise
-    except Exception as e:
-        logger.warning(f"Trig sampler failed with error:\n{e}")
-    finally:
-        if fd != -1:
-            os.close(fd)
+    fd = os.open(trig, os.O_WRONLY)
+
+    def sample():
+        os.write(fd, b"1")
+        os.lseek(fd, 0, os.SEEK_SET)
+
+    return get_sampler().add(sample, rate), fd
 
 
 class SoftwareTrigger(IioReader):
@@ -624,8 +728,8 @@ class SoftwareTrigger(IioReader):
         self.old_triggers = {}
         self.freq = freq
         self.opened = False
-        self.ev = None
-        self.thread = None
+        self.task = None
+        self.fd = -1
 
     def open(self):
         import time
@@ -677,25 +781,38 @@ class SoftwareTrigger(IioReader):
             with open(trig_fn, "w") as f:
                 f.write(f"sysfstrig{self.id}")
 
-        self.ev = TEvent()
-        self.thread = Thread(target=_sysfs_trig_sampler, args=(self.ev, id, self.freq))
-        self.thread.start()
+        try:
+            sampler = _sysfs_trig_sampler(id, self.freq)
+            if sampler:
+                self.task, self.fd = sampler
+        except Exception as e:
+            logger.warning(f"Trig sampler failed with error:\n{e}")
         self.opened = True
 
         return True
 
+    def suspend(self):
+        # Stop waking up the shared sampler thread
+        if self.task:
+            self.task.close()
+
+    def resume(self):
+        if self.task and self.opened:
+            self.task.resume()
+        return None
+
     def close(self):
         if not self.opened:
             return
 
         # Stop trigger
         self.opened = False
-        if self.ev:
-            self.ev.set()
-        if self.thread:
-            self.thread.join()
-        self.ev = None
-        self.thread = None
+        if self.task:
+            self.task.close()
+        if self.fd != -1:
+            os.close(self.fd)
+        self.task = None
+        self.fd = -1
 
         # Remove from current sensors
         for trig, (name, buff) in self.old_triggers.items():
@@ -0,0 +1,547 @@
+import logging
+import os
+import select
+import time
+from collections import deque
+from threading import Condition, Lock, Thread
+from typing import Any, Callable, NamedTuple, Sequence
+
+from .base import DEBUG_MODE, Consumer, Event, Multiplexer, Producer
+from .governor import RateGovernor
+from .latency import TRACER, LatencyTracer
+
+logger = logging.getLogger(__name__)
+
+REPORT_FREQ_MIN = 25
+REPORT_FREQ_MAX = 400
+
+ASYNC_TYPES = ("led", "rumble")
+ASYNC_QUEUE_SIZE = 16
+ASYNC_JOIN_TIMEOUT = 1
+# Avoids suspending while clients reopen the virtual devices
+SUSPEND_DELAY = 5
+
+
+def has_deadline(obj: Any) -> bool:
+    """Returns True if the producer or consumer reports timed work."""
+    fn = getattr(type(obj), "next_deadline", None)
+    return fn is not None and fn not in (Producer.next_deadline, Consumer.next_deadline)
+
+
+class AsyncStats(NamedTuple):
+    depth: int
+    max_depth: int
+    queued: int
+    coalesced: int
+    dropped: int
+    processed: int
+    errors: int
+
+
+class AsyncConsumer(Consumer):
+    """Runs a slow consumer (e.g., RGB writes over serial, sysfs or HID, or
+    rumble forwarding) on a worker thread, so its writes do not delay the next
+    report of the virtual controllers.
+
+    Only events of `types` are forwarded. Pending events are coalesced by type
+    and code, so the worker only writes the latest LED state or rumble level.
+    If more than `maxsize` keys are pending, the oldest one is dropped.
+    With a `period`, the consumer is also called without events when idle, for
+    consumers that flush queued writes over time."""
+
+    def __init__(
+        self,
+        consumer: Consumer,
+        types: Sequence[str] = ASYNC_TYPES,
+        maxsize: int = ASYNC_QUEUE_SIZE,
+        period: float | None = None,
+        name: str | None = None,
+    ) -> None:
+        self.consumer = consumer
+        self.types = frozenset(types)
+        self.maxsize = maxsize
+        self.period = period
+        self.name = name or type(consumer).__name__
+
+        self.cond = Condition()
+        self.pending: dict[tuple, Event] = {}
+        self.thread = None
+        self.running = False
+        self.max_depth = 0
+        self.queued = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.processed = 0
+        self.errors = 0
+
+    def start(self):
+        with self.cond:
+            if self.thread:
+                return
+            self.running = True
+            self.thread = Thread(
+                target=self._loop, name=f"hhd-{self.name}", daemon=True
+            )
+            self.thread.start()
+
+    def consume(self, events: Sequence[Event]):
+        evs = [ev for ev in events if ev["type"] in self.types]
+        if not evs:
+            return
+
+        with self.cond:
+            for ev in evs:
+                key = (ev["type"], ev.get("code", None))
+                prev = self.pending.pop(key, None)
+                if prev is not None:
+                    self.coalesced += 1
+                    if prev.get("initialize", False) and not ev.get(
+                        "initialize", False
+                    ):
+                        # Keep re-initialization requests of replaced states
+                        ev = {**ev, "initialize": True}  # type: ignore
+                elif len(self.pending) >= self.maxsize:
+                    del self.pending[next(iter(self.pending))]
+                    self.dropped += 1
+                self.pending[key] = ev
+                self.queued += 1
+            self.max_depth = max(self.max_depth, len(self.pending))
+            self.cond.notify()
+
+    def _loop(self):
+        while True:
+            with self.cond:
+                if self.running and not self.pending:
+                    self.cond.wait(self.period)
+                evs = list(self.pending.values())
+                self.pending.clear()
+                if not evs and (not self.running or self.period is None):
+                    if not self.running:
+                        return
+                    continue
+
+            try:
+                self.consumer.consume(evs)
+                self.processed += len(evs)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Async consumer '{self.name}' failed with error:\n{e}")
+
+    def stats(self) -> AsyncStats:
+        with self.cond:
+            return AsyncStats(
+                len(self.pending),
+                self.max_depth,
+                self.queued,
+                self.coalesced,
+                self.dropped,
+                self.processed,
+                self.errors,
+            )
+
+    def close(self):
+        """Writes the pending events and stops the worker. Waits for the
+        worker to finish, so the device can be closed afterwards."""
+        with self.cond:
+            thread = self.thread
+            self.running = False
+            self.thread = None
+            self.cond.notify()
+        if thread:
+            thread.join(ASYNC_JOIN_TIMEOUT)
+            if thread.is_alive():
+                logger.warning(f"Waiting for async consumer '{self.name}' to stop.")
+                thread.join()
+
+
+class LiveConfig:
+    """Hands configuration changes from a plugin to its running controller
+    loop, so they are applied between frames instead of restarting it.
+
+    The loop attaches a handler that receives the new configuration and the
+    dotted keys that changed. It returns False for changes that need new
+    devices, in which case the plugin restarts the loop as before."""
+
+    def __init__(self) -> None:
+        self.lock = Lock()
+        self.handler: Callable[[Any, set[str]], bool] | None = None
+
+    def attach(self, handler: Callable[[Any, set[str]], bool]):
+        with self.lock:
+            self.handler = handler
+
+    def detach(self):
+        with self.lock:
+            self.handler = None
+
+    def apply(self, conf: Any, changed: set[str]) -> bool:
+        with self.lock:
+            if not self.handler:
+                return False
+            try:
+                return self.handler(conf, changed)
+            except Exception as e:
+                logger.error(f"Could not reconfigure controller, restarting:\n{e}")
+                return False
+
+
+class ControllerRuntime:
+    """Shared event loop for the device controller loops.
+
+    File descriptors are registered with an epoll instance once, when their
+    producer is opened, so a wakeup only costs a single `epoll_wait`.
+    Each frame dispatches the ready fds to their producers, runs the multiplexer
+    and fans the result out to the consumers.
+
+    If unbounded, the total number of events per second is the sum of all
+    events generated by the producers (e.g., 100 + 100 + 500 + 30 for the
+    Legion Go). By setting a target refresh rate for the report and sleeping at
+    the end of each frame, fds that become ready close to each other are
+    combined to the same report, limiting resource use. The frame timeout
+    ensures consumers are called a minimum amount of times per second.
+    Both are adapted at runtime by a `RateGovernor`.
+
+    When no consumer has been available for a while (e.g., no client has the
+    virtual controller open), the producers marked with `allow_suspend` are
+    suspended until a client reopens one. The rest keep being polled.
+
+    Producers and consumers with timed work (e.g., delayed releases) report it
+    with `next_deadline()`, so the loop wakes up for it even at the idle rate."""
+
+    def __init__(
+        self,
+        multiplexer: Multiplexer | None = None,
+        report_freq_min: float = REPORT_FREQ_MIN,
+        report_freq_max: float = REPORT_FREQ_MAX,
+        debug: bool = DEBUG_MODE,
+        tracer: LatencyTracer = TRACER,
+    ) -> None:
+        self.multiplexer = multiplexer
+        self.delay_max = 1 / report_freq_min
+        self.delay_min = 1 / report_freq_max
+        self.debug = debug
+        self.governor = RateGovernor(report_freq_min, report_freq_max)
+        self.tracer = tracer
+        # Timestamps of the current frame, if it is traced
+        self.woke_ns = self.decoded_ns = self.processed_ns = 0
+
+        self.epoll = select.epoll()
+        self.devs: list[Producer] = []
+        self.always: set[int] = set()
+        self.fd_to_dev: dict[int, Producer | None] = {}
+        self.consumers: list[tuple[Consumer, bool]] = []
+        self.async_consumers: list[AsyncConsumer] = []
+        self.suspendable: list[Producer] = []
+        self.suspended: list[tuple[Producer, Sequence[int], bool]] = []
+        self.unavailable_since: float | None = None
+        # Producers and consumers that report deadlines, and if the runtime
+        # runs them
+        self.timed: list[tuple[Producer | Consumer, bool]] = []
+        # Producers with pending timed work, run on the next frame
+        self.due: set[int] = set()
+        self.start = time.perf_counter()
+
+        # Wakes up the loop to run posted tasks
+        self.pending: deque[Callable[[], None]] = deque()
+        self.wake = os.eventfd(0, os.EFD_NONBLOCK | os.EFD_CLOEXEC)
+        self.register([self.wake])
+
+    def register(self, fds: Sequence[int], dev: Producer | None = None):
+        """Adds fds to the poll set. If `dev` is None, the fds only wake up the
+        loop and the caller is responsible for reading them."""
+        for fd in fds:
+            if fd in self.fd_to_dev:
+                self.epoll.modify(fd, select.EPOLLIN)
+            else:
+                self.epoll.register(fd, select.EPOLLIN)
+            self.fd_to_dev[fd] = dev
+
+    def prepare(self, dev: Producer) -> Sequence[int]:
+        """Opens the producer and registers its fds."""
+        self.devs.append(dev)
+        if has_deadline(dev):
+            self.timed.append((dev, True))
+        fds = dev.open()
+        self.register(fds, dev)
+        return fds
+
+    def reopen(self, dev: Producer):
+        """Closes and reopens a prepared producer in place (e.g., to apply new
+        axis mappings). Suspended producers pick them up when resumed."""
+        if any(d is dev for d, _, _ in self.suspended):
+            return
+        for fd in [fd for fd, d in self.fd_to_dev.items() if d is dev]:
+            self.epoll.unregister(fd)
+            del self.fd_to_dev[fd]
+        dev.close(False)
+        self.register(dev.open(), dev)
+
+    def post(self, fn: Callable[[], None]):
+        """Runs `fn` from the loop thread, before the next frame. Thread safe."""
+        self.pending.append(fn)
+        os.eventfd_write(self.wake, 1)
+
+    def run_pending(self):
+        try:
+            os.eventfd_read(self.wake)
+        except BlockingIOError:
+            pass
+        while self.pending:
+            fn = self.pending.popleft()
+            try:
+                fn()
+            except Exception as e:
+                logger.error(f"Error while running task '{fn}':\n{e}")
+                if self.debug:
+                    raise e
+
+    def always_produce(self, *devs: Producer):
+        """Marks prepared producers to be called on every frame, even if none
+        of their fds are ready (e.g., for devices with queued writes)."""
+        for d in devs:
+            self.always.add(id(d))
+
+    def allow_suspend(self, *devs: Producer):
+        """Marks producers to be suspended while no consumer is available
+        (e.g., the gamepad, IMU and trigger devices). Producers with shortcut
+        buttons should not be marked, so the shortcuts keep working without a
+        client. Unprepared devices (e.g., software triggers) are only suspended
+        and resumed."""
+        for d in devs:
+            if not any(d is s for s in self.suspendable):
+                self.suspendable.append(d)
+
+    def attach(self, *consumers: Consumer, always: bool = False):
+        """Appends consumers to the fan-out. By default, consumers are only
+        called when there are events. With `always`, they are called on every
+        frame so they can run periodic tasks."""
+        for c in consumers:
+            self.consumers.append((c, always))
+            if always and has_deadline(c):
+                self.timed.append((c, False))
+
+    def watch(self, *objs: Producer | Consumer):
+        """Adds the deadlines of producers or consumers that the device loop
+        runs itself on every frame (e.g., a vendor device read outside the
+        runtime), so the loop wakes up for their timed work."""
+        for o in objs:
+            if has_deadline(o):
+                self.timed.append((o, False))
+
+    def attach_async(
+        self,
+        *consumers: Consumer,
+        types: Sequence[str] = ASYNC_TYPES,
+        always: bool = False,
+    ):
+        """Appends slow consumers (e.g., RGB and rumble) that run on their own
+        worker thread, see `AsyncConsumer`. With `always`, they are also called
+        at the minimum report rate so they can flush queued writes.
+
+        Consumers that share state with their producer side (e.g., a command
+        queue that `open()` resets) should be attached with `attach()`."""
+        for c in consumers:
+            a = AsyncConsumer(c, types, period=self.delay_max if always else None)
+            a.start()
+            self.async_consumers.append(a)
+            self.consumers.append((a, False))
+
+    def async_stats(self) -> dict[str, AsyncStats]:
+        return {a.name: a.stats() for a in self.async_consumers}
+
+    def stop_async(self):
+        """Stops the async consumers, call before closing the devices they
+        write to."""
+        for a in self.async_consumers:
+            a.close()
+            st = a.stats()
+            if st.dropped or st.errors:
+                logger.info(f"Async consumer '{a.name}' stats: {st}")
+        self.consumers = [
+            (c, always) for c, always in self.consumers if c not in self.async_consumers
+        ]
+        self.async_consumers = []
+
+    def next_deadline(self) -> float | None:
+        """Returns the time of the earliest timed event, if any. Pending timed
+        work of the producers and consumers keeps the rate up, and prepared
+        producers with it are run on the next frame."""
+        deadline = self.multiplexer.next_deadline() if self.multiplexer else None
+        self.due = set()
+        busy = False
+        for o, run in self.timed:
+            t = o.next_deadline()
+            if t is None:
+                continue
+            busy = True
+            if run:
+                self.due.add(id(o))
+            if deadline is None or t < deadline:
+                deadline = t
+        if busy:
+            self.governor.busy()
+        return deadline
+
+    def wait(self, timeout: float | None = None) -> Sequence[int]:
+        """Starts a frame and blocks until an fd is ready, the frame timeout
+        expires or a timed event is due. Returns the ready fds.
+        Posted tasks run before returning.
+
+        While suspended, there is no frame timeout and the loop sleeps until
+        an fd is ready or a timed event is due."""
+        self.start = time.perf_counter()
+        deadline = self.next_deadline()
+        if timeout is None:
+            if deadline is not None:
+                timeout = max(min(self.governor.delay_max, deadline - self.start), 0)
+            elif self.suspended:
+                timeout = -1
+            else:
+                timeout = self.governor.delay_max
+        fds = [fd for fd, _ in self.epoll.poll(timeout)]
+        self.woke_ns = time.perf_counter_ns() if self.tracer.enabled and fds else 0
+        if self.wake in fds:
+            self.run_pending()
+        return fds
+
+    def produce(self, fds: Sequence[int]) -> list[Event]:
+        evs: list[Event] = []
+        to_run = self.always | self.due
+        for fd in fds:
+            d = self.fd_to_dev.get(fd, None)
+            if d is not None:
+                to_run.add(id(d))
+                self.governor.woke(type(d).__name__)
+
+        if to_run:
+            for d in self.devs:
+                if id(d) in to_run:
+                    evs.extend(d.produce(fds))
+        if self.woke_ns:
+            self.decoded_ns = time.perf_counter_ns()
+        return evs
+
+    def process(self, evs: Sequence[Event]) -> Sequence[Event]:
+        self.governor.update(evs)
+        if self.multiplexer:
+            evs = self.multiplexer.process(evs)
+        if self.woke_ns:
+            self.processed_ns = time.perf_counter_ns()
+        if evs and self.debug:
+            logger.info(evs)
+        return evs
+
+    def consume(self, evs: Sequence[Event]):
+        for c, always in self.consumers:
+            if evs or always:
+                c.consume(evs)
+        if self.woke_ns and evs:
+            self.tracer.record(
+                self.woke_ns,
+                self.decoded_ns,
+                self.processed_ns,
+                time.perf_counter_ns(),
+            )
+            self.woke_ns = 0
+        self.check_available()
+
+    def release(self):
+        """Releases the buttons held on the consumers through their current
+        mappings. Call from the loop thread before changing them."""
+        if not self.multiplexer:
+            return
+        evs = self.multiplexer.release()
+        if evs:
+            for c, _ in self.consumers:
+                c.consume(evs)
+
+    def available(self) -> bool:
+        """Returns False if all consumers that report availability are
+        unavailable. Consumers without it (e.g., physical devices receiving
+        rumble) are not taken into account."""
+        flags = [c.available for c, _ in self.consumers if hasattr(c, "available")]
+        return not flags or any(flags)
+
+    def check_available(self):
+        if self.available():
+            self.unavailable_since = None
+            if self.suspended:
+                self.resume()
+        elif self.suspendable and not self.suspended:
+            curr = time.perf_counter()
+            if self.unavailable_since is None:
+                self.unavailable_since = curr
+            elif curr - self.unavailable_since > SUSPEND_DELAY:
+                self.suspend()
+
+    def suspend(self):
+        """Stops polling and suspends the producers marked with
+        `allow_suspend`."""
+        for d in self.suspendable:
+            fds = [fd for fd, dev in self.fd_to_dev.items() if dev is d]
+            for fd in fds:
+                self.epoll.unregister(fd)
+                del self.fd_to_dev[fd]
+            always = id(d) in self.always
+            self.always.discard(id(d))
+            self.timed = [(o, run) for o, run in self.timed if o is not d]
+            try:
+                d.suspend()
+            except Exception as e:
+                logger.error(f"Error while suspending device '{d}':\n{e}")
+            self.suspended.append((d, fds, always))
+
+        if self.suspended:
+            logger.info("No consumer is available, suspending the controller.")
+
+    def resume(self):
+        logger.info("A consumer became available, resuming the controller.")
+        suspended = self.suspended
+        self.suspended = []
+        for d, fds, always in suspended:
+            try:
+                new = d.resume()
+            except Exception as e:
+                logger.error(f"Error while resuming device '{d}':\n{e}")
+                continue
+            self.register(fds if new is None else new, d)
+            if has_deadline(d) and any(d is dev for dev in self.devs):
+                self.timed.append((d, True))
+            if always:
+                self.always.add(id(d))
+
+    def pace(self):
+        """Sleeps for the remainder of the frame."""
+        delay = self.governor.delay_min
+        elapsed = time.perf_counter() - self.start
+        if elapsed < delay:
+            time.sleep(delay - elapsed)
+
+    def step(self) -> Sequence[Event]:
+        evs = self.process(self.produce(self.wait()))
+        self.consume(evs)
+        self.pace()
+        return evs
+
+    def close(self, exit: bool):
+        self.stop_async()
+        try:
+            for d in reversed(self.devs):
+                try:
+                    d.close(exit)
+                except Exception as e:
+                    logger.error(
+                        f"Error while closing device '{d}' with exception:\n{e}"
+                    )
+                    if self.debug:
+                        raise e
+        finally:
+            self.devs = []
+            self.always = set()
+            self.suspendable = []
+            self.suspended = []
+            self.timed = []
+            self.due = set()
+            self.fd_to_dev = {}
+            self.epoll.close()
+            os.close(self.wake)
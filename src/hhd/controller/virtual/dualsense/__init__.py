@@ -1,4 +1,5 @@
 import logging
+import struct
 import time
 from collections import defaultdict
 from typing import Sequence, cast, Literal
@@ -10,7 +11,7 @@ from hhd.controller import (
     TouchpadCorrectionType,
     correct_touchpad,
 )
-from hhd.controller.lib.common import encode_axis, set_button
+from hhd.controller.lib.codec import compile_axis_encoder, compile_button_encoder
 from hhd.controller.lib.uhid import BUS_BLUETOOTH, BUS_USB, UhidDevice
 from hhd.controller.lib.ccache import ControllerCache
 
@@ -51,6 +52,8 @@ REPORT_MAX_DELAY = 1 / DS5_EDGE_MIN_REPORT_FREQ
 REPORT_MIN_DELAY = 1 / DS5_EDGE_MAX_REPORT_FREQ
 DS5_EDGE_MIN_TIMESTAMP_INTERVAL = 1500
 MAX_IMU_SYNC_DELAY = 2
+# The timestamp is the low 32 bits of the tick count
+_pack_ts = struct.Struct("<I").pack_into
 
 logger = logging.getLogger(__name__)
 
@@ -123,6 +126,8 @@ class Dualsense(Producer, Consumer):
                     f"Using cached controller node for Dualsense {'left motions device' if self.left_motion else 'controller'}."
                 )
                 self.dev = cached.dev
+                # Clients keep the cached node open, so no open event follows
+                self.available = cached.available
                 if self.dev and self.dev.fd:
                     self.fd = self.dev.fd
             else:
@@ -163,11 +168,40 @@ class Dualsense(Producer, Consumer):
         self.last_imu = curr
         self.imu_failed = False
         self.start = time.perf_counter()
+        self.encoders = self._compile_encoders()
 
         logger.info(f"Starting '{name.decode()}'.")
         assert self.fd
         return [self.fd]
 
+    def reconfigure(self, other: "Dualsense") -> bool:
+        """Applies the settings of `other`, an unopened device built from the
+        new configuration. Returns False if it needs a different device."""
+        if (
+            self.edge_mode != other.edge_mode
+            or self.use_bluetooth != other.use_bluetooth
+            or self.controller_id != other.controller_id
+            or self.left_motion != other.left_motion
+            or self.enable_rgb != other.enable_rgb
+        ):
+            return False
+
+        self.touchpad_method = other.touchpad_method
+        self.fake_timestamps = other.fake_timestamps
+        self.enable_touchpad = other.enable_touchpad
+        self.sync_gyro = other.sync_gyro
+        self.flip_z = other.flip_z
+        self.paddles_to_clicks = other.paddles_to_clicks
+        if self.dev:
+            self.touch_correction = correct_touchpad(
+                DS5_EDGE_TOUCH_WIDTH,
+                DS5_EDGE_TOUCH_HEIGHT,
+                getattr(self, "aspect_ratio", 1),
+                self.touchpad_method,
+            )
+            self.encoders = self._compile_encoders()
+        return True
+
     def close(self, exit: bool, in_cache: bool = False) -> bool:
         if not in_cache and self.cache and time.perf_counter() - self.start:
             logger.warning(
@@ -192,7 +226,7 @@ class Dualsense(Producer, Consumer):
         # Process queued events
         out: Sequence[Event] = []
         assert self.dev
-        while ev := self.dev.read_event():
+        for ev in self.dev.read_events():
             match ev["type"]:
                 case "open":
                     self.available = True
@@ -360,6 +394,161 @@ class Dualsense(Producer, Consumer):
                     logger.debug(f"Received unhandled report:\n{ev}")
         return out
 
+    def _compile_encoders(self):
+        """Resolves what each event does to the report ahead of time, so that
+        `consume` only has to look up the event type and code. The closures
+        write to `self.report` in place."""
+        rep = self.report
+        ofs = self.ofs
+        state = self.state
+        assert rep
+
+        def checked(code, enc):
+            def f(val):
+                try:
+                    enc(val)
+                except Exception:
+                    logger.warning(f"Encoding '{code}' with {val} overflowed.")
+
+            return f
+
+        def set_ts(val):
+            self.last_imu = time.perf_counter()
+            self.last_imu_ts = val
+            _pack_ts(rep, ofs + 27, int(val / DS5_EDGE_DELTA_TIME_NS) & 0xFFFFFFFF)
+            # Send the report
+            return True
+
+        #
+        # Axis
+        #
+        axis = {}
+        for code, m in self.axis_map.items():
+            if self.flip_z and code == "gyro_z":
+                m = m._replace(flipped=not m.flipped)
+            axis[code] = compile_axis_encoder(rep, m)
+        for code in ("gyro_ts", "accel_ts", "imu_ts"):
+            axis[code] = set_ts
+
+        if self.left_motion:
+            # Only keep imu events for left motion
+            axis = {
+                f"left_{code}": (
+                    fn if fn is set_ts else checked(f"left_{code}", fn)
+                )
+                for code, fn in axis.items()
+                if code.startswith(("gyro_", "accel_", "imu_"))
+            }
+            return {"axis": axis}
+
+        axis = {
+            code: fn if fn is set_ts else checked(code, fn)
+            for code, fn in axis.items()
+        }
+
+        # DPAD is weird
+        def hat_x(val):
+            state["hat_x"] = val
+            patch_dpad_val(rep, ofs, val, state["hat_y"])
+
+        def hat_y(val):
+            state["hat_y"] = val
+            patch_dpad_val(rep, ofs, state["hat_x"], val)
+
+        axis["hat_x"] = hat_x
+        axis["hat_y"] = hat_y
+
+        def touchpad_x(val):
+            tc = self.touch_correction
+            x = int(min(max(val, tc.x_clamp[0]), tc.x_clamp[1]) * tc.x_mult + tc.x_ofs)
+            rep[ofs + 33] = x & 0xFF
+            rep[ofs + 34] = (rep[ofs + 34] & 0xF0) | (x >> 8)
+
+        def touchpad_y(val):
+            tc = self.touch_correction
+            y = int(min(max(val, tc.y_clamp[0]), tc.y_clamp[1]) * tc.y_mult + tc.y_ofs)
+            rep[ofs + 34] = (rep[ofs + 34] & 0x0F) | ((y & 0x0F) << 4)
+            rep[ofs + 35] = y >> 4
+
+        if self.enable_touchpad:
+            axis["touchpad_x"] = touchpad_x
+            axis["touchpad_y"] = touchpad_y
+
+        #
+        # Buttons
+        #
+        btn = {code: compile_button_encoder(rep, m) for code, m in self.btn_map.items()}
+        set_touch = btn["touchpad_touch"]
+        set_touch2 = btn["touchpad_touch2"]
+        set_left = btn["touchpad_left"]
+
+        def touchpad_touch(val):
+            set_touch(val)
+            self.touchpad_touch = val
+
+        # Fix touchpad click requiring touch
+        def touchpad_left(val):
+            set_left(val)
+            set_touch(val or self.touchpad_touch)
+
+        # Also add right click
+        def touchpad_right(val):
+            set_touch(val or self.touchpad_touch)
+            set_touch2(val)
+
+        btn["touchpad_touch"] = touchpad_touch
+        btn["touchpad_left"] = touchpad_left
+        btn["touchpad_right"] = touchpad_right
+        if not self.enable_touchpad:
+            btn = {k: v for k, v in btn.items() if not k.startswith("touchpad")}
+
+        # Place finger on correct place and click
+        def paddle_left(val):
+            rep[ofs + 33] = 0x80
+            rep[ofs + 34] = 0x01
+            rep[ofs + 35] = 0x20
+            touchpad_left(val)
+
+        def paddle_right(val):
+            rep[ofs + 33] = 0x00
+            rep[ofs + 34] = 0x06
+            rep[ofs + 35] = 0x20
+            touchpad_left(val)
+
+        match self.paddles_to_clicks:
+            case "top":
+                btn["extra_l1"] = paddle_left
+                btn["extra_r1"] = paddle_right
+            case "bottom":
+                btn["extra_l2"] = paddle_left
+                btn["extra_r2"] = paddle_right
+
+        #
+        # Configuration
+        #
+        def touchpad_aspect_ratio(val):
+            self.aspect_ratio = cast(float, val)
+            self.touch_correction = correct_touchpad(
+                DS5_EDGE_TOUCH_WIDTH,
+                DS5_EDGE_TOUCH_HEIGHT,
+                self.aspect_ratio,
+                self.touchpad_method,
+            )
+
+        def is_attached(val):
+            rep[ofs + 52] = (rep[ofs + 52] & 0x0F) | (0x10 if val else 0x00)
+
+        def battery(val):
+            rep[ofs + 52] = (rep[ofs + 52] & 0xF0) | (max(val // 10, 0))
+
+        config = {
+            "touchpad_aspect_ratio": touchpad_aspect_ratio,
+            "is_attached": is_attached,
+            "battery": battery,
+        }
+
+        return {"axis": axis, "button": btn, "configuration": config}
+
     def consume(self, events: Sequence[Event]):
         assert self.dev and self.report
         # To fix gyro to mouse in latest steam
@@ -367,158 +556,21 @@ class Dualsense(Producer, Consumer):
         send = not self.sync_gyro
         curr = time.perf_counter()
 
-        new_rep = bytearray(self.report)
+        new_rep = self.report
+        encoders = self.encoders
         for ev in events:
-            code = ev["code"]
-            match ev["type"]:
-                case "axis":
-                    if not self.enable_touchpad and code.startswith("touchpad"):
-                        continue
-                    if self.left_motion:
-                        # Only left keep imu events for left motion
-                        if (
-                            "left_gyro_" in code
-                            or "left_accel_" in code
-                            or "left_imu_" in code
-                        ):
-                            code = code.replace("left_", "")
-                        else:
-                            continue
-                    if code in self.axis_map:
-                        if self.flip_z and code == "gyro_z":
-                            ev["value"] = -ev["value"]
-                        try:
-                            encode_axis(new_rep, self.axis_map[code], ev["value"])
-                        except Exception:
-                            logger.warning(
-                                f"Encoding '{ev['code']}' with {ev['value']} overflowed."
-                            )
-                    # DPAD is weird
-                    match code:
-                        case "hat_x":
-                            self.state["hat_x"] = ev["value"]
-                            patch_dpad_val(
-                                new_rep,
-                                self.ofs,
-                                self.state["hat_x"],
-                                self.state["hat_y"],
-                            )
-                        case "hat_y":
-                            self.state["hat_y"] = ev["value"]
-                            patch_dpad_val(
-                                new_rep,
-                                self.ofs,
-                                self.state["hat_x"],
-                                self.state["hat_y"],
-                            )
-                        case "touchpad_x":
-                            tc = self.touch_correction
-                            x = int(
-                                min(max(ev["value"], tc.x_clamp[0]), tc.x_clamp[1])
-                                * tc.x_mult
-                                + tc.x_ofs
-                            )
-                            new_rep[self.ofs + 33] = x & 0xFF
-                            new_rep[self.ofs + 34] = (new_rep[self.ofs + 34] & 0xF0) | (
-                                x >> 8
-                            )
-                        case "touchpad_y":
-                            tc = self.touch_correction
-                            y = int(
-                                min(max(ev["value"], tc.y_clamp[0]), tc.y_clamp[1])
-                                * tc.y_mult
-                                + tc.y_ofs
-                            )
-                            new_rep[self.ofs + 34] = (new_rep[self.ofs + 34] & 0x0F) | (
-                                (y & 0x0F) << 4
-                            )
-                            new_rep[self.ofs + 35] = y >> 4
-                        case "gyro_ts" | "accel_ts" | "imu_ts":
-                            send = True
-                            self.last_imu = time.perf_counter()
-                            self.last_imu_ts = ev["value"]
-                            new_rep[self.ofs + 27 : self.ofs + 31] = int(
-                                ev["value"] / DS5_EDGE_DELTA_TIME_NS
-                            ).to_bytes(8, byteorder="little", signed=False)[:4]
-                case "button":
-                    if self.left_motion:
-                        # skip buttons for left motion
-                        continue
-                    if not self.enable_touchpad and code.startswith("touchpad"):
-                        continue
-                    if (self.paddles_to_clicks == "top" and code == "extra_l1") or (
-                        self.paddles_to_clicks == "bottom" and code == "extra_l2"
-                    ):
-                        # Place finger on correct place and click
-                        new_rep[self.ofs + 33] = 0x80
-                        new_rep[self.ofs + 34] = 0x01
-                        new_rep[self.ofs + 35] = 0x20
-                        # Replace code with click
-                        ev = {**ev, "code": "touchpad_left"}
-                        code = "touchpad_left"
-                    if (self.paddles_to_clicks == "top" and code == "extra_r1") or (
-                        self.paddles_to_clicks == "bottom" and code == "extra_r2"
-                    ):
-                        # Place finger on correct place and click
-                        new_rep[self.ofs + 33] = 0x00
-                        new_rep[self.ofs + 34] = 0x06
-                        new_rep[self.ofs + 35] = 0x20
-                        # Replace code with click
-                        ev = {**ev, "code": "touchpad_left"}
-                        code = "touchpad_left"
-
-                    if code in self.btn_map:
-                        set_button(new_rep, self.btn_map[code], ev["value"])
-
-                    # Fix touchpad click requiring touch
-                    if code == "touchpad_touch":
-                        self.touchpad_touch = ev["value"]
-                    if code == "touchpad_left":
-                        set_button(
-                            new_rep,
-                            self.btn_map["touchpad_touch"],
-                            ev["value"] or self.touchpad_touch,
-                        )
-                    # Also add right click
-                    if code == "touchpad_right":
-                        set_button(
-                            new_rep,
-                            self.btn_map["touchpad_touch"],
-                            ev["value"] or self.touchpad_touch,
-                        )
-                        set_button(
-                            new_rep,
-                            self.btn_map["touchpad_touch2"],
-                            ev["value"],
-                        )
-
-                case "configuration":
-                    if self.left_motion:
-                        continue
-                    match code:
-                        case "touchpad_aspect_ratio":
-                            self.aspect_ratio = cast(float, ev["value"])
-                            self.touch_correction = correct_touchpad(
-                                DS5_EDGE_TOUCH_WIDTH,
-                                DS5_EDGE_TOUCH_HEIGHT,
-                                self.aspect_ratio,
-                                self.touchpad_method,
-                            )
-                        case "is_attached":
-                            new_rep[self.ofs + 52] = (new_rep[self.ofs + 52] & 0x0F) | (
-                                0x10 if ev["value"] else 0x00
-                            )
-                        case "battery":
-                            new_rep[self.ofs + 52] = (new_rep[self.ofs + 52] & 0xF0) | (
-                                max(ev["value"] // 10, 0)
-                            )
+            enc = encoders.get(ev["type"], None)
+            if enc is None:
+                continue
+            fn = enc.get(ev["code"], None)
+            if fn is not None and fn(ev["value"]):  # type: ignore
+                send = True
 
         # Cache
         # Caching can cause issues since receivers expect reports
         # at least a couple of times per second
         # if new_rep == self.report and not self.fake_timestamps:
         #     return
-        self.report = new_rep
 
         # If the IMU breaks, smoothly re-enable the controller
         failover = self.last_imu + MAX_IMU_SYNC_DELAY < curr
@@ -529,9 +581,11 @@ class Dualsense(Producer, Consumer):
             )
 
         if self.fake_timestamps or failover:
-            new_rep[self.ofs + 27 : self.ofs + 31] = int(
-                time.perf_counter_ns() / DS5_EDGE_DELTA_TIME_NS
-            ).to_bytes(8, byteorder="little", signed=False)[:4]
+            _pack_ts(
+                new_rep,
+                self.ofs + 27,
+                int(time.perf_counter_ns() / DS5_EDGE_DELTA_TIME_NS) & 0xFFFFFFFF,
+            )
 
         #
         # Send report
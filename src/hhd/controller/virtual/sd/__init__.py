@@ -118,6 +118,15 @@ class SteamdeckController(Producer, Consumer):
         assert self.fd
         return [self.fd]
 
+    def reconfigure(self, other: "SteamdeckController") -> bool:
+        """Applies the settings of `other`, an unopened device built from the
+        new configuration. Returns False if it needs a different device."""
+        if self.pid != other.pid or self.name != other.name:
+            return False
+        self.sync_gyro = other.sync_gyro
+        self.enable_touchpad = other.enable_touchpad
+        return True
+
     def close(self, exit: bool, in_cache: bool = False) -> bool:
         if not in_cache and time.perf_counter() - self.start:
             logger.warning(f"Caching Steam Controller to avoid reconnection.")
@@ -137,14 +146,12 @@ class SteamdeckController(Producer, Consumer):
         # Process queued events
         out: Sequence[Event] = []
         assert self.dev
-        while ev := self.dev.read_event():
+        for ev in self.dev.read_events():
             match ev["type"]:
                 case "open":
-                    # logger.info(f"SD OPENED")
-                    pass
+                    self.available = True
                 case "close":
-                    # logger.info(f"SD CLOSED")
-                    pass
+                    self.available = False
                 case "start":
                     pass
                 case "get_report":
@@ -1,4 +1,6 @@
 import logging
+import os
+import struct
 import time
 from typing import Sequence
 
@@ -22,6 +24,55 @@ _cache_volume = ControllerCache()
 
 MAX_IMU_SYNC_DELAY = 2
 
+# Resolve the codes once, `B` looks them up by name
+EV_SYN = B("EV_SYN")
+EV_KEY = B("EV_KEY")
+EV_ABS = B("EV_ABS")
+EV_MSC = B("EV_MSC")
+EV_FF = B("EV_FF")
+EV_UINPUT = B("EV_UINPUT")
+SYN_REPORT = B("SYN_REPORT")
+MSC_TIMESTAMP = B("MSC_TIMESTAMP")
+ABS_MT_POSITION_X = B("ABS_MT_POSITION_X")
+ABS_MT_POSITION_Y = B("ABS_MT_POSITION_Y")
+ABS_MT_TRACKING_ID = B("ABS_MT_TRACKING_ID")
+BTN_TOOL_FINGER = B("BTN_TOOL_FINGER")
+UI_FF_UPLOAD = B("UI_FF_UPLOAD")
+UI_FF_ERASE = B("UI_FF_ERASE")
+FF_RUMBLE = B("FF_RUMBLE")
+
+# struct input_event { struct timeval time; __u16 type; __u16 code; __s32 value; }
+# uinput ignores the time and stamps events itself
+INPUT_EVENT = struct.Struct("@llHHi")
+FRAME_EVENTS = 64
+
+
+class InputFrame:
+    """Packs the input events of a frame into a reused buffer, so that they
+    are written to uinput with a single `os.write` instead of one per event."""
+
+    def __init__(self, size: int = FRAME_EVENTS) -> None:
+        self.buf = bytearray(size * INPUT_EVENT.size)
+        self.ofs = 0
+
+    def write(self, type: int, code: int, value: int):
+        if self.ofs == len(self.buf):
+            self.buf.extend(bytes(len(self.buf)))
+        INPUT_EVENT.pack_into(self.buf, self.ofs, 0, 0, type, code, value)
+        self.ofs += INPUT_EVENT.size
+
+    def syn(self):
+        self.write(EV_SYN, SYN_REPORT, 0)
+
+    def flush(self, fd: int):
+        if not self.ofs:
+            return
+        try:
+            with memoryview(self.buf) as view:
+                os.write(fd, view[: self.ofs])
+        finally:
+            self.ofs = 0
+
 
 class UInputDevice(Consumer, Producer):
     @staticmethod
@@ -176,6 +227,7 @@ class UInputDevice(Consumer, Producer):
         self.last_imu = time.perf_counter()
         self.imu_failed = False
         self.wrote = False
+        self.frame = InputFrame()
 
         if self.ignore_cmds:
             # Do not wake up if we ignore to save utilization
@@ -184,6 +236,44 @@ class UInputDevice(Consumer, Producer):
             return []
         return [self.fd]
 
+    def reconfigure(self, other: "UInputDevice") -> bool:
+        """Applies the settings of `other`, an unopened device built from the
+        new configuration. Returns False if it needs a different device."""
+        if (
+            self.name != other.name
+            or self.vid != other.vid
+            or self.pid != other.pid
+            or self.bus != other.bus
+            or self.phys != other.phys
+            or self.uniq != other.uniq
+            or self.version != other.version
+            or self.capabilities != other.capabilities
+            or self.input_props != other.input_props
+            or self.motions_device != other.motions_device
+            or self.gyro != other.gyro
+        ):
+            return False
+
+        # Release the buttons whose codes change, or they would stay held on
+        # the node. The kernel drops the releases of keys that are not held.
+        if self.dev:
+            frame = self.frame
+            for btn, code in self.btn_map.items():
+                if other.btn_map.get(btn, None) != code:
+                    frame.write(EV_KEY, code, 0)
+            if frame.ofs:
+                frame.syn()
+                frame.flush(self.dev.fd)
+
+        # The maps only translate events, the node is kept
+        self.btn_map = other.btn_map
+        self.axis_map = other.axis_map
+        self.sync_gyro = other.sync_gyro
+        self.output_imu_timestamps = other.output_imu_timestamps
+        self.output_timestamps = other.output_timestamps
+        self.ignore_cmds = other.ignore_cmds
+        return True
+
     def close(self, exit: bool, in_cache: bool = False) -> bool:
         if not in_cache and self.cache:
             if self.motions_device:
@@ -207,6 +297,7 @@ class UInputDevice(Consumer, Producer):
         if not self.dev:
             return
 
+        frame = self.frame
         should_syn = not self.sync_gyro
         wrote = {}
         ts = 0
@@ -234,13 +325,13 @@ class UInputDevice(Consumer, Producer):
                             val = int(ax.scale * ev["value"] + ax.offset)
                         if ax.bounds:
                             val = min(max(val, ax.bounds[0]), ax.bounds[1])
-                        self.dev.write(B("EV_ABS"), ax.id, val)
+                        frame.write(EV_ABS, ax.id, val)
                         wrote[key] = val
 
                         if ev["code"] == "touchpad_x":
-                            self.dev.write(B("EV_ABS"), B("ABS_MT_POSITION_X"), val)
+                            frame.write(EV_ABS, ABS_MT_POSITION_X, val)
                         elif ev["code"] == "touchpad_y":
-                            self.dev.write(B("EV_ABS"), B("ABS_MT_POSITION_Y"), val)
+                            frame.write(EV_ABS, ABS_MT_POSITION_Y, val)
 
                     elif (
                         self.output_imu_timestamps is True
@@ -255,26 +346,26 @@ class UInputDevice(Consumer, Producer):
                         # Evdev expects us accuracy
                         self.last_imu_ts = ev["value"]
                         ts = (ev["value"] // 1000) % (2**31)
-                        self.dev.write(B("EV_MSC"), B("MSC_TIMESTAMP"), ts)
+                        frame.write(EV_MSC, MSC_TIMESTAMP, ts)
                         wrote[key] = ts
                 case "button":
                     if ev["code"] in self.btn_map:
                         if ev["code"] == "touchpad_touch":
-                            self.dev.write(
-                                B("EV_ABS"),
-                                B("ABS_MT_TRACKING_ID"),
+                            frame.write(
+                                EV_ABS,
+                                ABS_MT_TRACKING_ID,
                                 self.touch_id if ev["value"] else -1,
                             )
-                            self.dev.write(
-                                B("EV_KEY"),
-                                B("BTN_TOOL_FINGER"),
+                            frame.write(
+                                EV_KEY,
+                                BTN_TOOL_FINGER,
                                 1 if ev["value"] else 0,
                             )
                             self.touch_id += 1
                             if self.touch_id > 500:
                                 self.touch_id = 1
-                        self.dev.write(
-                            B("EV_KEY"),
+                        frame.write(
+                            EV_KEY,
                             self.btn_map[ev["code"]],
                             1 if ev["value"] else 0,
                         )
@@ -288,7 +379,7 @@ class UInputDevice(Consumer, Producer):
             # We have timestamps with ns accuracy.
             # Evdev expects us accuracy
             ts = (time.perf_counter_ns() // 1000) % (2**31)
-            self.dev.write(B("EV_MSC"), B("MSC_TIMESTAMP"), ts)
+            frame.write(EV_MSC, MSC_TIMESTAMP, ts)
 
         if self.sync_gyro:
             curr = time.perf_counter()
@@ -304,9 +395,13 @@ class UInputDevice(Consumer, Producer):
             and (should_syn or not self.sync_gyro or self.imu_failed)
             and (not self.output_imu_timestamps or ts)
         ):
-            self.dev.syn()
+            frame.syn()
             self.wrote = False
 
+        # Events that are not synced yet are held by the kernel until the
+        # next SYN_REPORT, so write them either way
+        frame.flush(self.dev.fd)
+
     def produce(self, fds: Sequence[int]) -> Sequence[Event]:
         if self.ignore_cmds or not self.fd or not self.fd in fds or not self.dev:
             return []
@@ -315,15 +410,15 @@ class UInputDevice(Consumer, Producer):
 
         while can_read(self.fd):
             for ev in self.dev.read():
-                if ev.type == B("EV_MSC") and ev.code == B("MSC_TIMESTAMP"):
+                if ev.type == EV_MSC and ev.code == MSC_TIMESTAMP:
                     # Skip timestamp feedback
                     # TODO: Figure out why it feedbacks
                     pass
-                elif ev.type == B("EV_UINPUT"):
-                    if ev.code == B("UI_FF_UPLOAD"):
+                elif ev.type == EV_UINPUT:
+                    if ev.code == UI_FF_UPLOAD:
                         # Keep uploaded effect to apply on input
                         upload = self.dev.begin_upload(ev.value)
-                        if upload.effect.type == B("FF_RUMBLE"):
+                        if upload.effect.type == FF_RUMBLE:
                             data = upload.effect.u.ff_rumble_effect
 
                             self.rumble = {
@@ -333,19 +428,19 @@ class UInputDevice(Consumer, Producer):
                                 "strong_magnitude": data.strong_magnitude / 0xFFFF,
                             }
                         self.dev.end_upload(upload)
-                    elif ev.code == B("UI_FF_ERASE"):
+                    elif ev.code == UI_FF_ERASE:
                         # Ignore erase events
                         erase = self.dev.begin_erase(ev.value)
                         erase.retval = 0
                         self.dev.end_erase(erase)
-                elif ev.type == B("EV_FF") and ev.value:
+                elif ev.type == EV_FF and ev.value:
                     if self.rumble:
                         out.append(self.rumble)
                     else:
                         logger.warning(
                             f"Rumble requested but a rumble effect has not been uploaded.\n{ev}"
                         )
-                elif ev.type == B("EV_FF") and not ev.value:
+                elif ev.type == EV_FF and not ev.value:
                     out.append(
                         {
                             "type": "rumble",
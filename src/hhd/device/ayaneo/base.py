@@ -1,11 +1,11 @@
 import logging
 import os
-import select
 import time
 from threading import Event as TEvent
 
-from hhd.controller import DEBUG_MODE, Multiplexer
+from hhd.controller import DEBUG_MODE, ControllerRuntime, Multiplexer
 from hhd.controller.lib.hide import unhide_all
+from hhd.controller.lib.registry import subscribe
 from hhd.controller.physical.evdev import XBOX_BUTTON_MAP
 from hhd.controller.physical.evdev import B as EC
 from hhd.controller.physical.evdev import GenericGamepadEvdev, enumerate_evs
@@ -29,7 +29,7 @@ def to_bytes(s: str):
     return bytes.fromhex(s.replace(" ", ""))
 
 
-FIND_DELAY = 0.1
+FIND_TIMEOUT = 2
 ERROR_DELAY = 0.3
 LONGER_ERROR_DELAY = 3
 LONGER_ERROR_MARGIN = 1.3
@@ -314,6 +314,7 @@ def plugin_run(
     first_disabled = True
     init = time.perf_counter()
     repeated_fail = False
+    devices = subscribe(subsystems=["input"], vid=[GAMEPAD_VID], pid=[GAMEPAD_PID])
 
     if others.get("info_left", None) is None:
         others["info_left"] = MODULE_UNPOWERED
@@ -423,6 +424,7 @@ def plugin_run(
             finally:
                 d_vend.close(True)
 
+        devices.clear()
         try:
             if not bool(enumerate_evs(vid=GAMEPAD_VID, pid=GAMEPAD_PID)):
                 found_device = False
@@ -433,7 +435,7 @@ def plugin_run(
         if not found_device:
             if first:
                 logger.info("Controller not found. Waiting...")
-            time.sleep(FIND_DELAY)
+            devices.wait(FIND_TIMEOUT, should_exit)
             first = False
             continue
 
@@ -460,11 +462,17 @@ def plugin_run(
             # Raise exception
             if DEBUG_MODE:
                 raise e
-            time.sleep(sleep_time)
+            if repeated_fail:
+                time.sleep(sleep_time)
+            else:
+                # Restart as soon as the controller re-enumerates
+                devices.clear()
+                devices.wait(sleep_time, should_exit)
 
     # Unhide all devices before exiting and close keyboard cache
     UInputDevice.close_volume_cached()
     unhide_all()
+    devices.close()
 
 
 def controller_loop(
@@ -580,35 +588,25 @@ def controller_loop(
     if motion:
         REPORT_FREQ_MAX = max(REPORT_FREQ_MAX, conf["imu_hz"].to(float))
 
-    REPORT_DELAY_MAX = 1 / REPORT_FREQ_MIN
-    REPORT_DELAY_MIN = 1 / REPORT_FREQ_MAX
-
-    fds = []
-    devs = []
-    fd_to_dev = {}
-
-    def prepare(m):
-        devs.append(m)
-        fs = m.open()
-        fds.extend(fs)
-        for f in fs:
-            fd_to_dev[f] = m
+    rt = ControllerRuntime(multiplexer, REPORT_FREQ_MIN, REPORT_FREQ_MAX)
 
     try:
-        prepare(d_xinput)
+        rt.prepare(d_xinput)
+        rt.allow_suspend(d_xinput)
         if motion and d_imu:
             start_imu = True
             if dconf.get("hrtimer", False):
                 start_imu = d_timer.open()
             if start_imu:
-                prepare(d_imu)
-        prepare(d_kbd_1)
+                rt.prepare(d_imu)
+                rt.allow_suspend(d_imu)
+        rt.prepare(d_kbd_1)
         if d_kbd_2:
-            prepare(d_kbd_2)
+            rt.prepare(d_kbd_2)
         for d in d_producers:
-            prepare(d)
+            rt.prepare(d)
 
-        prepare(d_vend)
+        rt.prepare(d_vend)
         changed_mode = d_vend.check()
         if reset or _reset or changed_mode:
             d_vend.init()
@@ -620,36 +618,14 @@ def controller_loop(
         else:
             d_vend.cfg()
 
+        rt.attach_async(d_xinput, types=("rumble",))
+        if d_vend:
+            rt.attach_async(d_vend, types=("led",))
+        rt.attach(*d_outs, always=True)
+
         logger.info("Emulated controller launched, have fun!")
         while not should_exit.is_set() and not updated.is_set():
-            start = time.perf_counter()
-            # Add timeout to call consumers a minimum amount of times per second
-            r, _, _ = select.select(fds, [], [], REPORT_DELAY_MAX)
-            evs = []
-            to_run = set()
-            for f in r:
-                to_run.add(id(fd_to_dev[f]))
-
-            for d in devs:
-                if id(d) in to_run:
-                    evs.extend(d.produce(r))
-
-            evs = multiplexer.process(evs)
-            if evs:
-                if debug:
-                    logger.info(evs)
-
-                d_xinput.consume(evs)
-
-            if d_vend:
-                d_vend.consume(evs)
-            for d in d_outs:
-                d.consume(evs)
-
-            t = time.perf_counter()
-            elapsed = t - start
-            if elapsed < REPORT_DELAY_MIN:
-                time.sleep(REPORT_DELAY_MIN - elapsed)
+            rt.step()
 
     except KeyboardInterrupt:
         raise
@@ -661,10 +637,4 @@ def controller_loop(
             logger.error(f"Error while closing device '{d}' with exception:\n{e}")
             if debug:
                 raise e
-        for d in reversed(devs):
-            try:
-                d.close(not updated.is_set())
-            except Exception as e:
-                logger.error(f"Error while closing device '{d}' with exception:\n{e}")
-                if debug:
-                    raise e
+        rt.close(not updated.is_set())
@@ -1,11 +1,11 @@
 import logging
 import re
-import select
 import time
 from threading import Event as TEvent
 
-from hhd.controller import DEBUG_MODE, Multiplexer, can_read
+from hhd.controller import DEBUG_MODE, ControllerRuntime, Multiplexer, can_read
 from hhd.controller.lib.hide import unhide_all
+from hhd.controller.lib.registry import subscribe
 from hhd.controller.physical.hidraw import GenericGamepadHidraw
 from hhd.controller.physical.evdev import B as EC
 from hhd.controller.physical.evdev import GenericGamepadEvdev, enumerate_evs
@@ -23,7 +23,7 @@ from hhd.controller import DEBUG_MODE, Event, Multiplexer
 
 from .const import MSI_CLAW_MAPPINGS
 
-FIND_DELAY = 0.1
+FIND_TIMEOUT = 2
 ERROR_DELAY = 0.3
 LONGER_ERROR_DELAY = 3
 LONGER_ERROR_MARGIN = 1.3
@@ -87,6 +87,12 @@ class MsiAtKbd(GenericGamepadEvdev):
         self.state = {}
         self.queued = []
 
+    def next_deadline(self) -> float | None:
+        deadline = super().next_deadline()
+        if self.queued and (deadline is None or self.queued[0][1] < deadline):
+            deadline = self.queued[0][1]
+        return deadline
+
     def produce(self, fds):
         evs = list(super().produce(fds))
         curr = time.perf_counter()
@@ -309,6 +315,7 @@ def plugin_run(
     initialized = False
     init = time.perf_counter()
     repeated_fail = False
+    devices = subscribe(subsystems=["input"], vid=[MSI_CLAW_VID])
     while not should_exit.is_set():
         if conf["controller_mode.mode"].to(str) == "disabled":
             time.sleep(ERROR_DELAY)
@@ -320,6 +327,7 @@ def plugin_run(
         else:
             first_disabled = True
 
+        devices.clear()
         use_dinput = conf.get("dinput_mode", False)
         try:
             is_xinput = bool(enumerate_evs(vid=MSI_CLAW_VID, pid=MSI_CLAW_XINPUT_PID))
@@ -357,7 +365,7 @@ def plugin_run(
         if not found_device and not test_mode:
             if first:
                 logger.info("Controller not found. Waiting...")
-            time.sleep(FIND_DELAY)
+            devices.wait(FIND_TIMEOUT, should_exit)
             first = False
             continue
 
@@ -390,11 +398,17 @@ def plugin_run(
             # Raise exception
             if DEBUG_MODE:
                 raise e
-            time.sleep(sleep_time)
+            if repeated_fail:
+                time.sleep(sleep_time)
+            else:
+                # Restart as soon as the controller re-enumerates
+                devices.clear()
+                devices.wait(sleep_time, should_exit)
 
     # Unhide all devices before exiting and close keyboard cache
     UInputDevice.close_volume_cached()
     unhide_all()
+    devices.close()
 
 
 class DesktopDetectorEvdev(GenericGamepadEvdev):
@@ -423,8 +437,6 @@ def controller_loop(
     test_mode: bool = False,
     use_dinput: bool = False,
 ):
-    debug = DEBUG_MODE
-
     logger.info(f"Test mode: {test_mode}")
     # Output
     d_producers, d_outs, d_params = get_outputs(
@@ -534,53 +546,38 @@ def controller_loop(
     REPORT_FREQ_MIN = 25
     REPORT_FREQ_MAX = 400
 
-    REPORT_DELAY_MAX = 1 / REPORT_FREQ_MIN
-    REPORT_DELAY_MIN = 1 / REPORT_FREQ_MAX
-
-    fds = []
-    devs = []
-    fd_to_dev = {}
-
-    def prepare(m):
-        devs.append(m)
-        fs = m.open()
-        fds.extend(fs)
-        for f in fs:
-            fd_to_dev[f] = m
+    rt = ControllerRuntime(multiplexer, REPORT_FREQ_MIN, REPORT_FREQ_MAX)
 
     try:
-        prepare(d_xinput)
-        prepare(d_volume_btn)
-        prepare(d_kbd_1)
-        prepare(d_msi_wmi)
+        rt.prepare(d_xinput)
+        rt.allow_suspend(d_xinput)
+        rt.prepare(d_volume_btn)
+        rt.prepare(d_kbd_1)
+        rt.prepare(d_msi_wmi)
         if not test_mode:
-            prepare(d_kbd_2)
-            prepare(d_mouse)
+            rt.prepare(d_kbd_2)
+            rt.prepare(d_mouse)
         for d in d_producers:
-            prepare(d)
-        prepare(d_vend)
+            rt.prepare(d)
+        rt.prepare(d_vend)
+
+        rt.attach(d_volume_btn)
+        rt.attach_async(d_xinput, types=("rumble",))
+        rt.attach_async(d_vend)
+        rt.attach(*d_outs, always=True)
 
         logger.info("Emulated controller launched, have fun!")
         switch_to_dinput = None
         while not should_exit.is_set() and not updated.is_set():
-            start = time.perf_counter()
-            # Add timeout to call consumers a minimum amount of times per second
-            r, _, _ = select.select(fds, [], [], REPORT_DELAY_MAX)
-            evs = []
-            to_run = set()
-            for f in r:
-                to_run.add(id(fd_to_dev[f]))
-
-            for d in devs:
-                if id(d) in to_run:
-                    evs.extend(d.produce(r))
+            r = rt.wait()
+            evs = rt.produce(r)
 
             # Detect if we are in desktop mode through events
             desktop_mode = d_mouse.desktop or d_kbd_2.desktop
             d_mouse.desktop = False
             d_kbd_2.desktop = False
 
-            if desktop_mode or (switch_to_dinput and start > switch_to_dinput):
+            if desktop_mode or (switch_to_dinput and rt.start > switch_to_dinput):
                 logger.info(
                     f"Setting controller to {'dinput' if use_dinput else 'xinput'} mode."
                 )
@@ -592,36 +589,15 @@ def controller_loop(
             #     # being stuck in desktop mode
             #     switch_to_dinput = time.perf_counter() + 2
 
-            # Read delayed events
-            evs.extend(d_kbd_1.produce([]))
-            evs.extend(d_msi_wmi.produce([]))
-
-            evs = multiplexer.process(evs)
+            evs = rt.process(evs)
             if evs:
                 switch_to_dinput = None
-                if debug:
-                    logger.info(evs)
-
-                d_volume_btn.consume(evs)
-                d_xinput.consume(evs)
-                d_vend.consume(evs)
-
-            for d in d_outs:
-                d.consume(evs)
+            rt.consume(evs)
 
-            t = time.perf_counter()
-            elapsed = t - start
-            if elapsed < REPORT_DELAY_MIN:
-                time.sleep(REPORT_DELAY_MIN - elapsed)
+            rt.pace()
 
     except KeyboardInterrupt:
         raise
     finally:
         d_vend.close(not updated.is_set())
-        for d in reversed(devs):
-            try:
-                d.close(not updated.is_set())
-            except Exception as e:
-                logger.error(f"Error while closing device '{d}' with exception:\n{e}")
-                if debug:
-                    raise e
+        rt.close(not updated.is_set())
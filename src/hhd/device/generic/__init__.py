@@ -1,6 +1,7 @@
 from threading import Event, Thread
 from typing import Any, Sequence
 
+from hhd.controller import LiveConfig
 from hhd.controller.physical.rgb import is_led_supported
 from hhd.plugins import (
     Config,
@@ -20,11 +21,14 @@ class GenericControllersPlugin(HHDPlugin):
     name = "generic_controllers"
     priority = 18
     log = "genc"
+    subscribe = ("controllers.handheld",)
+    periodic = False
 
     def __init__(self, dmi: str, dconf: dict) -> None:
         self.t = None
         self.should_exit = None
         self.updated = Event()
+        self.live = LiveConfig()
         self.started = False
         self.t = None
 
@@ -69,7 +73,11 @@ class GenericControllersPlugin(HHDPlugin):
         if self.prev is None:
             self.prev = new_conf
         else:
+            changed = self.prev.diff(new_conf)
             self.prev.update(new_conf.conf)
+            # Apply settings such as button swaps without a restart
+            if self.live.apply(self.prev.copy(), changed):
+                return
 
         self.updated.set()
         self.start(self.prev)
@@ -92,6 +100,7 @@ class GenericControllersPlugin(HHDPlugin):
                 self.should_exit,
                 self.updated,
                 self.dconf,
+                self.live,
             ),
         )
         self.t.start()
@@ -131,7 +140,7 @@ def autodetect(existing: Sequence[HHDPlugin]) -> Sequence[HHDPlugin]:
         with open("/sys/class/dmi/id/board_vendor") as f:
             vendor = f.read().lower().strip()
 
-        if "ayaneo" in vendor and 'AYANEO 3' not in dmi:
+        if "ayaneo" in vendor and "AYANEO 3" not in dmi:
             return [GenericControllersPlugin(dmi, get_default_config(dmi, "AYA"))]
     except Exception:
         return []
@@ -1,22 +1,31 @@
 import logging
 import os
-import select
 import time
 from threading import Event as TEvent
 
-from hhd.controller import DEBUG_MODE, Multiplexer
+from hhd.controller import DEBUG_MODE, ControllerRuntime, LiveConfig, Multiplexer
 from hhd.controller.lib.hide import unhide_all
+from hhd.controller.lib.registry import subscribe
 from hhd.controller.physical.hidraw import GenericGamepadHidraw
 from hhd.controller.physical.evdev import B as EC
 from hhd.controller.physical.evdev import GenericGamepadEvdev, enumerate_evs
 from hhd.controller.physical.imu import CombinedImu, HrtimerTrigger
 from hhd.controller.physical.rgb import LedDevice, is_led_supported
 from hhd.controller.virtual.uinput import UInputDevice
-from hhd.plugins import Config, Context, Emitter, get_gyro_state, get_outputs
+from hhd.plugins import (
+    OUTPUTS_HOT_KEYS,
+    Config,
+    Context,
+    Emitter,
+    get_gyro_state,
+    get_outputs,
+    reconfigure_outputs,
+)
+from hhd.plugins.conf import keys_within
 
 from .const import BTN_MAPPINGS, DEFAULT_MAPPINGS, TECNO_RAW_INTERFACE_BTN_MAP
 
-FIND_DELAY = 0.1
+FIND_TIMEOUT = 2
 ERROR_DELAY = 0.3
 LONGER_ERROR_DELAY = 3
 LONGER_ERROR_MARGIN = 1.3
@@ -38,6 +47,16 @@ KBD_PID = 0x0001
 
 BACK_BUTTON_DELAY = 0.1
 
+# Settings applied to a running controller, others restart it
+HOT_KEYS = [
+    "main_chords",
+    "swap_guide",
+    "imu_axis",
+    "nintendo_mode",
+    "select_reboots",
+    *(f"controller_mode.{k}" for k in OUTPUTS_HOT_KEYS),
+]
+
 
 def plugin_run(
     conf: Config,
@@ -46,11 +65,13 @@ def plugin_run(
     should_exit: TEvent,
     updated: TEvent,
     dconf: dict,
+    live: LiveConfig | None = None,
 ):
     first = True
     first_disabled = True
     init = time.perf_counter()
     repeated_fail = False
+    devices = subscribe(subsystems=["input"], vid=[GAMEPAD_VID, TECNO_VID, ZOTAC_VID])
     while not should_exit.is_set():
         if conf["controller_mode.mode"].to(str) == "disabled":
             time.sleep(ERROR_DELAY)
@@ -62,6 +83,7 @@ def plugin_run(
         else:
             first_disabled = True
 
+        devices.clear()
         try:
             match dconf.get("type", None):
                 case "tecno":
@@ -79,7 +101,7 @@ def plugin_run(
         if not found_device:
             if first:
                 logger.info("Controller not found. Waiting...")
-            time.sleep(FIND_DELAY)
+            devices.wait(FIND_TIMEOUT, should_exit)
             first = False
             continue
 
@@ -87,7 +109,7 @@ def plugin_run(
             logger.info("Launching emulated controller.")
             updated.clear()
             init = time.perf_counter()
-            controller_loop(conf.copy(), should_exit, updated, dconf, emit)
+            controller_loop(conf.copy(), should_exit, updated, dconf, emit, live)
             repeated_fail = False
         except Exception as e:
             failed_fast = init + LONGER_ERROR_MARGIN > time.perf_counter()
@@ -103,38 +125,54 @@ def plugin_run(
             # Raise exception
             if DEBUG_MODE:
                 raise e
-            time.sleep(sleep_time)
+            if repeated_fail:
+                time.sleep(sleep_time)
+            else:
+                # Restart as soon as the controller re-enumerates
+                devices.clear()
+                devices.wait(sleep_time, should_exit)
 
     # Unhide all devices before exiting and close keyboard cache
     UInputDevice.close_volume_cached()
     unhide_all()
+    devices.close()
 
 
 def controller_loop(
-    conf: Config, should_exit: TEvent, updated: TEvent, dconf: dict, emit: Emitter
+    conf: Config,
+    should_exit: TEvent,
+    updated: TEvent,
+    dconf: dict,
+    emit: Emitter,
+    live: LiveConfig | None = None,
 ):
     debug = DEBUG_MODE
     dtype = dconf.get("type", "generic")
     dgyro = dconf.get("display_gyro", True)
 
     # Output
-    d_producers, d_outs, d_params = get_outputs(
-        conf["controller_mode"],
-        None,
-        dgyro and conf["imu"].to(bool),
-        emit=emit,
-        rgb_modes={"disabled": [], "solid": ["color"]} if is_led_supported() else None,
-        rgb_resets_on_ac=is_led_supported(),
-        extra_buttons=dconf.get("extra_buttons", "dual"),
-    )
+    def outputs(conf: Config):
+        return get_outputs(
+            conf["controller_mode"],
+            None,
+            dgyro and conf["imu"].to(bool),
+            emit=emit,
+            rgb_modes=(
+                {"disabled": [], "solid": ["color"]} if is_led_supported() else None
+            ),
+            rgb_resets_on_ac=is_led_supported(),
+            extra_buttons=dconf.get("extra_buttons", "dual"),
+        )
+
+    d_producers, d_outs, d_params = outputs(conf)
     motion = d_params.get("uses_motion", True)
 
     # Imu
+    def gyro_state(conf: Config):
+        return get_gyro_state(conf["imu_axis"], dconf.get("mapping", DEFAULT_MAPPINGS))
+
     if dgyro:
-        d_imu = CombinedImu(
-            conf["imu_hz"].to(int),
-            get_gyro_state(conf["imu_axis"], dconf.get("mapping", DEFAULT_MAPPINGS)),
-        )
+        d_imu = CombinedImu(conf["imu_hz"].to(int), gyro_state(conf))
     else:
         d_imu = None
     d_timer = HrtimerTrigger(conf["imu_hz"].to(int), [HrtimerTrigger.IMU_NAMES])
@@ -166,16 +204,21 @@ def controller_loop(
             "qam_hhd": True,
         }
 
+    def options(conf: Config):
+        return {
+            "select_reboots": conf.get("select_reboots", False),
+            "nintendo_mode": conf["nintendo_mode"].to(bool),
+            "startselect_chord": conf.get("main_chords", "disabled"),
+            "swap_guide": "select_is_guide" if conf["swap_guide"].to(bool) else None,
+        }
+
     multiplexer = Multiplexer(
         trigger="analog_to_discrete",
         dpad="analog_to_discrete",
         share_to_qam=True,
-        select_reboots=conf.get("select_reboots", False),
-        nintendo_mode=conf["nintendo_mode"].to(bool),
         emit=emit,
         params=d_params,
-        startselect_chord=conf.get("main_chords", "disabled"),
-        swap_guide="select_is_guide" if conf["swap_guide"].to(bool) else None,
+        **options(conf),
         **kargs,
     )
 
@@ -202,19 +245,32 @@ def controller_loop(
     if motion:
         REPORT_FREQ_MAX = max(REPORT_FREQ_MAX, conf["imu_hz"].to(float))
 
-    REPORT_DELAY_MAX = 1 / REPORT_FREQ_MIN
-    REPORT_DELAY_MIN = 1 / REPORT_FREQ_MAX
-
-    fds = []
-    devs = []
-    fd_to_dev = {}
+    rt = ControllerRuntime(multiplexer, REPORT_FREQ_MIN, REPORT_FREQ_MAX)
+
+    def reconfigure(conf: Config, changed: set[str]):
+        if not keys_within(changed, HOT_KEYS):
+            return False
+
+        def apply():
+            # Held buttons would be released through the new mappings
+            rt.release()
+            _, outs, params = outputs(conf)
+            if not reconfigure_outputs(d_outs, outs):
+                updated.set()
+                return
+            multiplexer.reconfigure(
+                **options(conf),
+                noob_mode=params.get("noob_mode", False),
+                nintendo_qam=params.get("nintendo_qam", False),
+            )
+            if d_imu:
+                d_imu.mappings = gyro_state(conf)
+                if d_imu.dev:
+                    rt.reopen(d_imu)
+            logger.info("Applied new settings to the running controller.")
 
-    def prepare(m):
-        devs.append(m)
-        fs = m.open()
-        fds.extend(fs)
-        for f in fs:
-            fd_to_dev[f] = m
+        rt.post(apply)
+        return True
 
     try:
         if dtype == "tecno":
@@ -235,56 +291,40 @@ def controller_loop(
                 capabilities={EC("EV_KEY"): [EC("KEY_F17"), EC("KEY_F18")]},
             )
 
-        prepare(d_xinput)
+        rt.prepare(d_xinput)
+        rt.allow_suspend(d_xinput)
         if motion and d_imu:
             start_imu = True
             if dconf.get("hrtimer", False):
                 start_imu = d_timer.open()
             if start_imu:
-                prepare(d_imu)
+                rt.prepare(d_imu)
+                rt.allow_suspend(d_imu)
 
         if grab_at:
-            prepare(d_volume_btn)
-        prepare(d_kbd_1)
+            rt.prepare(d_volume_btn)
+        rt.prepare(d_kbd_1)
         if d_kbd_2:
-            prepare(d_kbd_2)
+            rt.prepare(d_kbd_2)
         for d in d_producers:
-            prepare(d)
+            rt.prepare(d)
+
+        rt.attach(d_volume_btn)
+        rt.attach_async(d_xinput, types=("rumble",))
+        rt.attach_async(d_rgb, types=("led",), always=True)
+        rt.attach(*d_outs, always=True)
 
+        if live:
+            live.attach(reconfigure)
         logger.info("Emulated controller launched, have fun!")
         while not should_exit.is_set() and not updated.is_set():
-            start = time.perf_counter()
-            # Add timeout to call consumers a minimum amount of times per second
-            r, _, _ = select.select(fds, [], [], REPORT_DELAY_MAX)
-            evs = []
-            to_run = set()
-            for f in r:
-                to_run.add(id(fd_to_dev[f]))
-
-            for d in devs:
-                if id(d) in to_run:
-                    evs.extend(d.produce(r))
-
-            evs = multiplexer.process(evs)
-            if evs:
-                if debug:
-                    logger.info(evs)
-
-                d_volume_btn.consume(evs)
-                d_xinput.consume(evs)
-
-            d_rgb.consume(evs)
-            for d in d_outs:
-                d.consume(evs)
-
-            t = time.perf_counter()
-            elapsed = t - start
-            if elapsed < REPORT_DELAY_MIN:
-                time.sleep(REPORT_DELAY_MIN - elapsed)
+            rt.step()
 
     except KeyboardInterrupt:
         raise
     finally:
+        if live:
+            live.detach()
         # d_vend.close(not updated.is_set())
         try:
             d_timer.close()
@@ -292,10 +332,4 @@ def controller_loop(
             logger.error(f"Error while closing device '{d}' with exception:\n{e}")
             if debug:
                 raise e
-        for d in reversed(devs):
-            try:
-                d.close(not updated.is_set())
-            except Exception as e:
-                logger.error(f"Error while closing device '{d}' with exception:\n{e}")
-                if debug:
-                    raise e
+        rt.close(not updated.is_set())
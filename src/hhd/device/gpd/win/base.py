@@ -1,13 +1,18 @@
 import logging
 import re
-import select
 import time
 from threading import Event as TEvent
 from typing import Sequence
 
 import evdev
 
-from hhd.controller import DEBUG_MODE, Event, Multiplexer, can_read
+from hhd.controller import (
+    DEBUG_MODE,
+    ControllerRuntime,
+    Event,
+    Multiplexer,
+    can_read,
+)
 from hhd.controller.base import Event
 from hhd.controller.lib.hide import unhide_all
 from hhd.controller.physical.evdev import B as EC
@@ -93,6 +98,12 @@ class BackbuttonsEvdev(GenericGamepadEvdev):
         self.right_released = None
         super().__init__(*args, **kwargs)
 
+    def next_deadline(self) -> float | None:
+        if not self.dev:
+            return None
+        ts = [t for t in (self.left_released, self.right_released) if t]
+        return min(ts) + BACK_BUTTON_DELAY if ts else None
+
     def produce(self, fds: Sequence[int]):
         if not self.dev:
             return []
@@ -382,35 +393,23 @@ def controller_loop(
     if motion:
         REPORT_FREQ_MAX = max(REPORT_FREQ_MAX, conf["imu_hz"].to(float))
 
-    REPORT_DELAY_MAX = 1 / REPORT_FREQ_MIN
-    REPORT_DELAY_MIN = 1 / REPORT_FREQ_MAX
-
-    fds = []
-    devs = []
-    fd_to_dev = {}
-
-    def prepare(m):
-        devs.append(m)
-        fs = m.open()
-        fds.extend(fs)
-        for f in fs:
-            fd_to_dev[f] = m
+    rt = ControllerRuntime(multiplexer, REPORT_FREQ_MIN, REPORT_FREQ_MAX)
 
     try:
-        hid_btn_fds = []
         if l4r4_enabled:
-            kbd_fds = d_kbd_1.open()
-            fds.extend(kbd_fds)
-        else:
-            kbd_fds = []
-        prepare(d_xinput)
+            # Wakes up the loop, but kbd_1 is always run below
+            rt.register(d_kbd_1.open())
+            rt.watch(d_kbd_1)
+        rt.prepare(d_xinput)
+        rt.allow_suspend(d_xinput)
         if motion:
             start_imu = True
             try:
                 if dconf.get("hrtimer", False):
                     start_imu = d_timer.open()
                 if start_imu:
-                    prepare(d_imu)
+                    rt.prepare(d_imu)
+                    rt.allow_suspend(d_imu)
             except Exception as e:
                 motion = False
                 try:
@@ -424,55 +423,28 @@ def controller_loop(
 
                 traceback.print_exc()
         if has_touchpad and d_params["uses_touch"]:
-            prepare(d_touch)
+            rt.prepare(d_touch)
         if grab_at and d_kbd_2:
-            prepare(d_volume_btn)
+            rt.prepare(d_volume_btn)
         if d_kbd_2:
-            prepare(d_kbd_2)
+            rt.prepare(d_kbd_2)
         for d in d_producers:
-            prepare(d)
+            rt.prepare(d)
+
+        rt.attach(d_volume_btn)
+        rt.attach_async(d_xinput, types=("rumble",))
+        rt.attach(*d_outs, always=True)
 
         logger.info("Emulated controller launched, have fun!")
         while not should_exit.is_set() and not updated.is_set():
-            start = time.perf_counter()
-            # Add timeout to call consumers a minimum amount of times per second
-            r, _, _ = select.select(fds, [], [], REPORT_DELAY_MAX)
-            evs = []
-            to_run = set()
-            for f in r:
-                # skip kbd_1 and hid_btns to always run them
-                if f not in kbd_fds and f not in hid_btn_fds:
-                    to_run.add(id(fd_to_dev[f]))
-
-            for d in devs:
-                if id(d) in to_run:
-                    evs.extend(d.produce(r))
+            r = rt.wait()
+            evs = rt.produce(r)
             evs.extend(d_kbd_1.produce(r))
 
-            evs = multiplexer.process(evs)
-            if evs:
-                if debug:
-                    logger.info(evs)
-                d_volume_btn.consume(evs)
-                d_xinput.consume(evs)
-
-            for d in d_outs:
-                d.consume(evs)
-
-            # If unbounded, the total number of events per second is the sum of all
-            # events generated by the producers.
-            # For Legion go, that would be 100 + 100 + 500 + 30 = 730
-            # Since the controllers of the legion go only update at 500hz, this is
-            # wasteful.
-            # By setting a target refresh rate for the report and sleeping at the
-            # end, we ensure that even if multiple fds become ready close to each other
-            # they are combined to the same report, limiting resource use.
-            # Ideally, this rate is smaller than the report rate of the hardware controller
-            # to ensure there is always a report from that ready during refresh
-            t = time.perf_counter()
-            elapsed = t - start
-            if elapsed < REPORT_DELAY_MIN:
-                time.sleep(REPORT_DELAY_MIN - elapsed)
+            evs = rt.process(evs)
+            rt.consume(evs)
+
+            rt.pace()
 
     except KeyboardInterrupt:
         raise
@@ -489,10 +461,4 @@ def controller_loop(
             logger.error(f"Error while closing device '{d}' with exception:\n{e}")
             if debug:
                 raise e
-        for d in reversed(devs):
-            try:
-                d.close(not updated.is_set())
-            except Exception as e:
-                logger.error(f"Error while closing device '{d}' with exception:\n{e}")
-                if debug:
-                    raise e
+        rt.close(not updated.is_set())
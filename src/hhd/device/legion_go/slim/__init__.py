@@ -1,5 +1,6 @@
 from threading import Event, Thread
 
+from hhd.controller import LiveConfig
 from hhd.plugins import (
     Config,
     Context,
@@ -15,12 +16,15 @@ class LegionGoSControllerPlugin(HHDPlugin):
     name = "legion_go_slim_controller"
     priority = 18
     log = "lgos"
+    subscribe = ("controllers.legion_gos",)
+    periodic = False
 
     def __init__(self, dconf) -> None:
         self.dconf = dconf
         self.t = None
         self.should_exit = None
         self.updated = Event()
+        self.live = LiveConfig()
         self.started = False
         self.t = None
         self.prev = None
@@ -51,7 +55,11 @@ class LegionGoSControllerPlugin(HHDPlugin):
         if self.prev is None:
             self.prev = new_conf
         else:
+            changed = self.prev.diff(new_conf)
             self.prev.update(new_conf.conf)
+            # Apply settings such as button swaps without a restart
+            if not reset and self.live.apply(self.prev.copy(), changed):
+                return
 
         if reset:
             self.started = False
@@ -78,6 +86,7 @@ class LegionGoSControllerPlugin(HHDPlugin):
                 self.updated,
                 self.dconf,
                 {"reset": reset},
+                self.live,
             ),
         )
         self.t.start()
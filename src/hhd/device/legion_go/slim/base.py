@@ -5,14 +5,31 @@ import time
 from threading import Event as TEvent
 from typing import Sequence
 
-from hhd.controller import DEBUG_MODE, Button, Consumer, Event, Producer
+from hhd.controller import (
+    DEBUG_MODE,
+    Button,
+    Consumer,
+    ControllerRuntime,
+    Event,
+    LiveConfig,
+    Producer,
+)
 from hhd.controller.base import Multiplexer
 from hhd.controller.lib.hide import unhide_all
+from hhd.controller.lib.registry import subscribe
 from hhd.controller.physical.evdev import B as EC
 from hhd.controller.physical.evdev import GenericGamepadEvdev, enumerate_evs
 from hhd.controller.physical.hidraw import GenericGamepadHidraw
 from hhd.controller.virtual.uinput import HHD_PID_VENDOR, UInputDevice
-from hhd.plugins import Config, Context, Emitter, get_outputs
+from hhd.plugins import (
+    OUTPUTS_HOT_KEYS,
+    Config,
+    Context,
+    Emitter,
+    get_outputs,
+    reconfigure_outputs,
+)
+from hhd.plugins.conf import keys_within
 
 from .const import (
     GOS_INTERFACE_AXIS_MAP,
@@ -23,7 +40,7 @@ from .const import (
 )
 from .hid import LegionHidraw, LegionHidrawTs, rgb_callback
 
-FIND_DELAY = 0.1
+FIND_TIMEOUT = 2
 ERROR_DELAY = 0.5
 LONGER_ERROR_DELAY = 3
 LONGER_ERROR_MARGIN = 1.3
@@ -38,6 +55,14 @@ GOS_PIDS = {
     0xE311: "dinput",
 }
 
+# Settings applied to a running controller, others restart it
+HOT_KEYS = [
+    "swap_legion",
+    "nintendo_mode",
+    "select_reboots",
+    *(f"xinput.{k}" for k in OUTPUTS_HOT_KEYS),
+]
+
 
 def plugin_run(
     conf: Config,
@@ -47,10 +72,12 @@ def plugin_run(
     updated: TEvent,
     dconf: dict,
     others: dict,
+    live: LiveConfig | None = None,
 ):
     reset = others.get("reset", False)
     init = time.perf_counter()
     repeated_fail = False
+    devices = subscribe(subsystems=["input"], vid=[GOS_VID])
 
     while not should_exit.is_set():
         try:
@@ -58,12 +85,13 @@ def plugin_run(
             pid = None
             first = True
             while not controller_mode and not should_exit.is_set():
+                devices.clear()
                 devs = enumerate_evs(vid=GOS_VID)
                 if not devs:
                     if first:
                         first = False
                         logger.warning(f"Legion Go S controller not found, waiting...")
-                    time.sleep(FIND_DELAY)
+                    devices.wait(FIND_TIMEOUT, should_exit)
                     continue
 
                 for d in devs.values():
@@ -75,7 +103,7 @@ def plugin_run(
                     logger.error(
                         f"Legion Go S controller not found, waiting {ERROR_DELAY}s."
                     )
-                    time.sleep(ERROR_DELAY)
+                    devices.wait(ERROR_DELAY, should_exit)
                     continue
 
             if not controller_mode:
@@ -90,7 +118,9 @@ def plugin_run(
             ):
                 logger.info("Launching emulated controller.")
                 init = time.perf_counter()
-                controller_loop_xinput(conf_copy, should_exit, updated, emit, reset, dconf)
+                controller_loop_xinput(
+                    conf_copy, should_exit, updated, emit, reset, dconf, live
+                )
             else:
                 if controller_mode != "xinput":
                     logger.info(
@@ -126,11 +156,17 @@ def plugin_run(
                     traceback.print_exc()
                 except Exception:
                     pass
-            time.sleep(sleep_time)
+            if repeated_fail:
+                time.sleep(sleep_time)
+            else:
+                # Restart as soon as the controller re-enumerates
+                devices.clear()
+                devices.wait(sleep_time, should_exit)
         reset = False
 
     # Unhide all devices before exiting
     unhide_all()
+    devices.close()
 
 
 def controller_loop_rest(
@@ -222,28 +258,35 @@ def controller_loop_rest(
 
 
 def controller_loop_xinput(
-    conf: Config, should_exit: TEvent, updated: TEvent, emit: Emitter, reset: bool, dconf
+    conf: Config,
+    should_exit: TEvent,
+    updated: TEvent,
+    emit: Emitter,
+    reset: bool,
+    dconf,
+    live: LiveConfig | None = None,
 ):
     debug = DEBUG_MODE
 
     # Output
-    touchpad_enable = conf.get("touchpad", "disabled")
-    d_producers, d_outs, d_params = get_outputs(
-        conf["xinput"],
-        None,
-        motion=True,
-        emit=emit,
-        touchpad_enable=touchpad_enable,  # type: ignore
-        rgb_modes={
-            "disabled": [],
-            "solid": ["color"],
-            "pulse": ["color", "speed"],
-            "rainbow": ["brightness", "speed"],
-            "spiral": ["brightness", "speed"],
-        },
-        extra_buttons=dconf.get("extra_buttons", "dual"),
-    )
-    swap_legion = conf["swap_legion"].to(bool)
+    def outputs(conf: Config):
+        return get_outputs(
+            conf["xinput"],
+            None,
+            motion=True,
+            emit=emit,
+            touchpad_enable=conf.get("touchpad", "disabled"),  # type: ignore
+            rgb_modes={
+                "disabled": [],
+                "solid": ["color"],
+                "pulse": ["color", "speed"],
+                "rainbow": ["brightness", "speed"],
+                "spiral": ["brightness", "speed"],
+            },
+            extra_buttons=dconf.get("extra_buttons", "dual"),
+        )
+
+    d_producers, d_outs, d_params = outputs(conf)
 
     # Inputs
     d_xinput = GenericGamepadEvdev(
@@ -320,89 +363,79 @@ def controller_loop_xinput(
         required=True,
     )
 
+    def options(conf: Config):
+        return {
+            "swap_guide": "select_is_guide" if conf["swap_legion"].to(bool) else None,
+            "select_reboots": conf["select_reboots"].to(bool),
+            "nintendo_mode": conf["nintendo_mode"].to(bool),
+        }
+
     multiplexer = Multiplexer(
         trigger="analog_to_discrete",
         dpad="both",
         share_to_qam=True,
-        swap_guide="select_is_guide" if swap_legion else None,
-        select_reboots=conf["select_reboots"].to(bool),
-        nintendo_mode=conf["nintendo_mode"].to(bool),
         emit=emit,
         params=d_params,
+        **options(conf),
     )
 
     REPORT_FREQ_MIN = 25
     REPORT_FREQ_MAX = 1000 if freq == "1000hz" else 500
 
-    REPORT_DELAY_MAX = 1 / REPORT_FREQ_MIN
-    REPORT_DELAY_MIN = 1 / REPORT_FREQ_MAX
-
-    fds = []
-    devs = []
-    fd_to_dev = {}
+    rt = ControllerRuntime(multiplexer, REPORT_FREQ_MIN, REPORT_FREQ_MAX)
+
+    def reconfigure(conf: Config, changed: set[str]):
+        if not keys_within(changed, HOT_KEYS):
+            return False
+
+        def apply():
+            # Held buttons would be released through the new mappings
+            rt.release()
+            _, outs, params = outputs(conf)
+            if not reconfigure_outputs(d_outs, outs):
+                updated.set()
+                return
+            multiplexer.reconfigure(
+                **options(conf),
+                noob_mode=params.get("noob_mode", False),
+                nintendo_qam=params.get("nintendo_qam", False),
+            )
+            logger.info("Applied new settings to the running controller.")
 
-    def prepare(m):
-        devs.append(m)
-        fs = m.open()
-        fds.extend(fs)
-        for f in fs:
-            fd_to_dev[f] = m
+        rt.post(apply)
+        return True
 
     try:
-        prepare(d_xinput)
-        prepare(d_shortcuts)
+        rt.prepare(d_xinput)
+        rt.allow_suspend(d_xinput)
+        rt.prepare(d_shortcuts)
         if uses_touch:
             d_touch_mute.open()
-            prepare(d_touch)
+            rt.prepare(d_touch)
         else:
             d_touch_mute = None
-        prepare(d_cfg)
-        prepare(d_raw)
+        rt.prepare(d_cfg)
+        rt.prepare(d_raw)
         for d in d_producers:
-            prepare(d)
+            rt.prepare(d)
 
+        rt.attach(d_raw, d_cfg)
+        rt.attach_async(d_xinput, types=("rumble",))
+        rt.attach(*d_outs, always=True)
+
+        if live:
+            live.attach(reconfigure)
         logger.info("Emulated controller launched, have fun!")
 
         while not should_exit.is_set() and not updated.is_set():
-            start = time.perf_counter()
-            # Add timeout to call consumers a minimum amount of times per second
-            r, _, _ = select.select(fds, [], [], REPORT_DELAY_MAX)
-            evs = []
-            to_run = set()
-            for f in r:
-                to_run.add(id(fd_to_dev[f]))
-
-            for d in devs:
-                if id(d) in to_run:
-                    evs.extend(d.produce(r))
-
-            evs = multiplexer.process(evs)
-            if evs:
-                if debug:
-                    logger.info(evs)
-
-                d_xinput.consume(evs)
-                d_raw.consume(evs)
-                d_cfg.consume(evs)
-
-            for d in d_outs:
-                d.consume(evs)
-
-            t = time.perf_counter()
-            elapsed = t - start
-            if elapsed < REPORT_DELAY_MIN:
-                time.sleep(REPORT_DELAY_MIN - elapsed)
+            rt.step()
 
     except KeyboardInterrupt:
         raise
     finally:
-        for d in reversed(devs):
-            try:
-                d.close(not updated.is_set())
-            except Exception as e:
-                logger.error(f"Error while closing device '{d}' with exception:\n{e}")
-                if debug:
-                    raise e
+        if live:
+            live.detach()
+        rt.close(not updated.is_set())
 
         if d_touch_mute:
             try:
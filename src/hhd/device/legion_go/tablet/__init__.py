@@ -1,5 +1,6 @@
 from threading import Event, Thread
 
+from hhd.controller import LiveConfig
 from hhd.plugins import (
     Config,
     Context,
@@ -17,12 +18,15 @@ class LegionGoControllersPlugin(HHDPlugin):
     name = "legion_go_controllers"
     priority = 18
     log = "llgo"
+    subscribe = ("controllers.legion_go",)
+    periodic = False
 
     def __init__(self, dconf) -> None:
         self.dconf = dconf
         self.t = None
         self.should_exit = None
         self.updated = Event()
+        self.live = LiveConfig()
         self.started = False
         self.t = None
         self.prev = None
@@ -60,7 +64,11 @@ class LegionGoControllersPlugin(HHDPlugin):
         if self.prev is None:
             self.prev = new_conf
         else:
+            changed = self.prev.diff(new_conf)
             self.prev.update(new_conf.conf)
+            # Apply settings such as button swaps without a restart
+            if not reset and self.live.apply(self.prev.copy(), changed):
+                return
 
         if reset:
             self.started = False
@@ -87,6 +95,7 @@ class LegionGoControllersPlugin(HHDPlugin):
                 self.updated,
                 self.dconf,
                 {"reset": reset},
+                self.live,
             ),
         )
         self.t.start()
@@ -5,13 +5,30 @@ import time
 from threading import Event as TEvent
 from typing import Sequence
 
-from hhd.controller import Button, Consumer, Event, Producer, DEBUG_MODE
+from hhd.controller import (
+    DEBUG_MODE,
+    Button,
+    Consumer,
+    ControllerRuntime,
+    Event,
+    LiveConfig,
+    Producer,
+)
 from hhd.controller.lib.hide import unhide_all
+from hhd.controller.lib.registry import subscribe
 from hhd.controller.base import Multiplexer, TouchpadAction
 from hhd.controller.physical.evdev import B as EC
 from hhd.controller.physical.evdev import GenericGamepadEvdev, enumerate_evs
 from hhd.controller.virtual.uinput import HHD_PID_VENDOR, UInputDevice
-from hhd.plugins import Config, Context, Emitter, get_outputs
+from hhd.plugins import (
+    OUTPUTS_HOT_KEYS,
+    Config,
+    Context,
+    Emitter,
+    get_outputs,
+    reconfigure_outputs,
+)
+from hhd.plugins.conf import keys_within
 
 from .const import (
     LGO_RAW_INTERFACE_AXIS_MAP,
@@ -23,7 +40,7 @@ from .const import (
 )
 from .hid import LegionHidraw, RgbCallback
 
-FIND_DELAY = 0.1
+FIND_TIMEOUT = 2
 ERROR_DELAY = 0.5
 LONGER_ERROR_DELAY = 3
 LONGER_ERROR_MARGIN = 1.3
@@ -44,6 +61,18 @@ LEN_PIDS = {
     0x61EE: "fps",
 }
 
+# Settings applied to a running controller, others restart it
+HOT_KEYS = [
+    "nintendo_mode",
+    "select_reboots",
+    "m2_to_mute",
+    "touchpad.controller.short",
+    "touchpad.controller.hold",
+    "touchpad.emulation.short",
+    "touchpad.emulation.hold",
+    *(f"xinput.{k}" for k in OUTPUTS_HOT_KEYS),
+]
+
 
 def plugin_run(
     conf: Config,
@@ -53,10 +82,12 @@ def plugin_run(
     updated: TEvent,
     dconf: dict,
     others: dict,
+    live: LiveConfig | None = None,
 ):
     reset = others.get("reset", False)
     init = time.perf_counter()
     repeated_fail = False
+    devices = subscribe(subsystems=["input"], vid=[LEN_VID])
 
     while not should_exit.is_set():
         try:
@@ -64,12 +95,13 @@ def plugin_run(
             pid = None
             first = True
             while not controller_mode and not should_exit.is_set():
+                devices.clear()
                 devs = enumerate_evs(vid=LEN_VID)
                 if not devs:
                     if first:
                         first = False
                         logger.warning(f"Legion go controllers not found, waiting...")
-                    time.sleep(FIND_DELAY)
+                    devices.wait(FIND_TIMEOUT, should_exit)
                     continue
 
                 for d in devs.values():
@@ -81,7 +113,7 @@ def plugin_run(
                     logger.error(
                         f"Legion go controllers not found, waiting {ERROR_DELAY}s."
                     )
-                    time.sleep(ERROR_DELAY)
+                    devices.wait(ERROR_DELAY, should_exit)
                     continue
 
             if not controller_mode:
@@ -96,7 +128,9 @@ def plugin_run(
             ):
                 logger.info("Launching emulated controller.")
                 init = time.perf_counter()
-                controller_loop_xinput(conf_copy, should_exit, updated, emit, reset)
+                controller_loop_xinput(
+                    conf_copy, should_exit, updated, emit, reset, live
+                )
             else:
                 if controller_mode != "xinput":
                     logger.info(
@@ -130,11 +164,17 @@ def plugin_run(
             # Raise exception
             if DEBUG_MODE:
                 raise e
-            time.sleep(sleep_time)
+            if repeated_fail:
+                time.sleep(sleep_time)
+            else:
+                # Restart as soon as the controller re-enumerates
+                devices.clear()
+                devices.wait(sleep_time, should_exit)
         reset = False
 
     # Unhide all devices before exiting
     unhide_all()
+    devices.close()
 
 
 def controller_loop_rest(
@@ -215,10 +255,13 @@ def controller_loop_rest(
 
 
 def controller_loop_xinput(
-    conf: Config, should_exit: TEvent, updated: TEvent, emit: Emitter, reset: bool
+    conf: Config,
+    should_exit: TEvent,
+    updated: TEvent,
+    emit: Emitter,
+    reset: bool,
+    live: LiveConfig | None = None,
 ):
-    debug = DEBUG_MODE
-
     # Output
     dimu = conf["imu.mode"].to(str)
 
@@ -233,22 +276,26 @@ def controller_loop_xinput(
             simu = None
             cidx = 0
 
-    d_producers, d_outs, d_params = get_outputs(
-        conf["xinput"],
-        conf["touchpad"],
-        dimu != "disabled",
-        controller_id=cidx,
-        emit=emit,
-        dual_motion=dimu == "both",
-        rgb_modes={
-            "disabled": [],
-            "solid": ["color"],
-            "pulse": ["color", "speed"],
-            "rainbow": ["brightness", "speed"],
-            "spiral": ["brightness", "speed"],
-        },
-        extra_buttons="quad",
-    )
+    def outputs(conf: Config):
+        imu = conf["imu.mode"].to(str)
+        return get_outputs(
+            conf["xinput"],
+            conf["touchpad"],
+            imu != "disabled",
+            controller_id=cidx,
+            emit=emit,
+            dual_motion=imu == "both",
+            rgb_modes={
+                "disabled": [],
+                "solid": ["color"],
+                "pulse": ["color", "speed"],
+                "rainbow": ["brightness", "speed"],
+                "spiral": ["brightness", "speed"],
+            },
+            extra_buttons="quad",
+        )
+
+    d_producers, d_outs, d_params = outputs(conf)
     motion = d_params.get("uses_motion", True)
     dual_motion = d_params.get("uses_dual_motion", True)
     swap_legion = conf["swap_legion_v2"].to(bool)
@@ -306,11 +353,20 @@ def controller_loop_xinput(
         required=True,
     )
 
-    touch_actions = (
-        conf["touchpad.controller"]
-        if conf["touchpad.mode"].to(TouchpadAction) == "controller"
-        else conf["touchpad.emulation"]
-    )
+    def options(conf: Config):
+        touch_actions = (
+            conf["touchpad.controller"]
+            if conf["touchpad.mode"].to(TouchpadAction) == "controller"
+            else conf["touchpad.emulation"]
+        )
+        return {
+            "touchpad_short": touch_actions["short"].to(TouchpadAction),
+            "touchpad_right": touch_actions["hold"].to(TouchpadAction),
+            "select_reboots": conf["select_reboots"].to(bool),
+            "r3_to_share": conf["m2_to_mute"].to(bool),
+            "nintendo_mode": conf["nintendo_mode"].to(bool),
+        }
+
     multiplexer = Multiplexer(
         trigger="analog_to_discrete",
         dpad="both",
@@ -318,58 +374,61 @@ def controller_loop_xinput(
         status="both_to_main",
         share_to_qam=True,
         swap_guide="guide_is_select" if swap_legion else None,
-        touchpad_short=touch_actions["short"].to(TouchpadAction),
-        touchpad_right=touch_actions["hold"].to(TouchpadAction),
-        select_reboots=conf["select_reboots"].to(bool),
-        r3_to_share=conf["m2_to_mute"].to(bool),
-        nintendo_mode=conf["nintendo_mode"].to(bool),
         emit=emit,
         imu=simu,
         params=d_params,
+        **options(conf),
     )
 
     REPORT_FREQ_MIN = 25
     REPORT_FREQ_MAX = 500
 
-    REPORT_DELAY_MAX = 1 / REPORT_FREQ_MIN
-    REPORT_DELAY_MIN = 1 / REPORT_FREQ_MAX
-
-    fds = []
-    devs = []
-    fd_to_dev = {}
+    rt = ControllerRuntime(multiplexer, REPORT_FREQ_MIN, REPORT_FREQ_MAX)
+
+    def reconfigure(conf: Config, changed: set[str]):
+        if not keys_within(changed, HOT_KEYS):
+            return False
+
+        def apply():
+            # Held buttons would be released through the new mappings
+            rt.release()
+            _, outs, params = outputs(conf)
+            if not reconfigure_outputs(d_outs, outs):
+                updated.set()
+                return
+            multiplexer.reconfigure(
+                **options(conf),
+                noob_mode=params.get("noob_mode", False),
+                nintendo_qam=params.get("nintendo_qam", False),
+            )
+            logger.info("Applied new settings to the running controller.")
 
-    def prepare(m):
-        devs.append(m)
-        fs = m.open()
-        fds.extend(fs)
-        for f in fs:
-            fd_to_dev[f] = m
+        rt.post(apply)
+        return True
 
     try:
-        prepare(d_xinput)
-        prepare(d_shortcuts)
+        rt.prepare(d_xinput)
+        rt.allow_suspend(d_xinput)
+        rt.prepare(d_shortcuts)
         if d_params["uses_touch"]:
-            prepare(d_touch)
-        prepare(d_raw)
+            rt.prepare(d_touch)
+        rt.prepare(d_raw)
         for d in d_producers:
-            prepare(d)
+            rt.prepare(d)
+
+        rt.attach(d_raw)
+        rt.attach_async(d_xinput, types=("rumble",))
+        rt.attach(*d_outs, always=True)
 
         ts_count: dict[str, int] = {"left_imu_ts": 0, "right_imu_ts": 0}
         ts_last: dict[str, int] = {"left_imu_ts": 0, "right_imu_ts": 0}
 
+        if live:
+            live.attach(reconfigure)
         logger.info("Emulated controller launched, have fun!")
         while not should_exit.is_set() and not updated.is_set():
-            start = time.perf_counter()
-            # Add timeout to call consumers a minimum amount of times per second
-            r, _, _ = select.select(fds, [], [], REPORT_DELAY_MAX)
-            evs = []
-            to_run = set()
-            for f in r:
-                to_run.add(id(fd_to_dev[f]))
-
-            for d in devs:
-                if id(d) in to_run:
-                    evs.extend(d.produce(r))
+            r = rt.wait()
+            evs = rt.produce(r)
 
             # Patch timestamps to convert them to ns
             # for d in ('x', 'y', 'z'):
@@ -402,32 +461,17 @@ def controller_loop_xinput(
                         # randomly output 254 or 255. If that happens, drop event
                         ev["code"] = ""  # type: ignore
 
-            evs = multiplexer.process(evs)
-            if evs:
-                if debug:
-                    logger.info(evs)
-
-                d_xinput.consume(evs)
-                d_raw.consume(evs)
-
-            for d in d_outs:
-                d.consume(evs)
+            evs = rt.process(evs)
+            rt.consume(evs)
 
-            t = time.perf_counter()
-            elapsed = t - start
-            if elapsed < REPORT_DELAY_MIN:
-                time.sleep(REPORT_DELAY_MIN - elapsed)
+            rt.pace()
 
     except KeyboardInterrupt:
         raise
     finally:
-        for d in reversed(devs):
-            try:
-                d.close(not updated.is_set())
-            except Exception as e:
-                logger.error(f"Error while closing device '{d}' with exception:\n{e}")
-                if debug:
-                    raise e
+        if live:
+            live.detach()
+        rt.close(not updated.is_set())
 
 
 class SelectivePassthrough(Producer, Consumer):
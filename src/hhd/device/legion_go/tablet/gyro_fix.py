@@ -1,5 +1,4 @@
-from threading import Thread, Event
-import time
+from hhd.controller.lib.sampler import get_sampler
 from hhd.controller.physical.imu import ForcedSampler
 
 import logging
@@ -7,41 +6,29 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-def gyro_fix(ev: Event, rate: int = 65):
-    g = None
-    try:
-        g = ForcedSampler(["gyro_3d"], True)
-        g.open()
-        while not ev.is_set():
-            g.sample()
-            time.sleep(1 / rate)
-    except KeyboardInterrupt:
-        raise
-    except Exception as e:
-        logger.warning(f"Gyro fix failed with error:\n{e}")
-    finally:
-        if g:
-            g.close()
-
-
 class GyroFixer:
     def __init__(self, rate: int = 65) -> None:
         self.rate = rate
-        self.ev = None
-        self.thread = None
+        self.sampler = None
+        self.task = None
 
     def open(self):
-        logger.info("Starting gyro fixer thread.")
+        logger.info("Starting gyro fixer.")
         self.close()
-        self.ev = Event()
-        self.thread = Thread(target=gyro_fix, args=(self.ev, self.rate))
-        self.thread.start()
+        try:
+            self.sampler = ForcedSampler(["gyro_3d"], True)
+            self.sampler.open()
+            # Sampled from the shared sampler thread
+            self.task = get_sampler().add(self.sampler.sample, self.rate)
+        except Exception as e:
+            logger.warning(f"Gyro fix failed with error:\n{e}")
+            self.close()
 
     def close(self):
-        if self.ev:
-            logger.info("Stopping the gyro fixer thread.")
-            self.ev.set()
-        if self.thread:
-            self.thread.join()
-        self.ev = None
-        self.thread = None
+        if self.task:
+            logger.info("Stopping the gyro fixer.")
+            self.task.close()
+        if self.sampler:
+            self.sampler.close()
+        self.task = None
+        self.sampler = None
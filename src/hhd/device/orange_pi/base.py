@@ -1,12 +1,11 @@
 import logging
 import os
-import select
 import time
 from threading import Event as TEvent
 
 import evdev
 
-from hhd.controller import Multiplexer, DEBUG_MODE
+from hhd.controller import ControllerRuntime, Multiplexer, DEBUG_MODE
 from hhd.controller.lib.hide import unhide_all
 from hhd.controller.physical.evdev import B as EC
 from hhd.controller.physical.evdev import GenericGamepadEvdev
@@ -168,74 +167,32 @@ def controller_loop(
     if motion:
         REPORT_FREQ_MAX = max(REPORT_FREQ_MAX, conf["imu_hz"].to(float))
 
-    REPORT_DELAY_MAX = 1 / REPORT_FREQ_MIN
-    REPORT_DELAY_MIN = 1 / REPORT_FREQ_MAX
-
-    fds = []
-    devs = []
-    fd_to_dev = {}
-
-    def prepare(m):
-        devs.append(m)
-        fs = m.open()
-        fds.extend(fs)
-        for f in fs:
-            fd_to_dev[f] = m
+    rt = ControllerRuntime(multiplexer, REPORT_FREQ_MIN, REPORT_FREQ_MAX)
 
     try:
         # d_vend.open()
-        prepare(d_xinput)
+        rt.prepare(d_xinput)
+        rt.allow_suspend(d_xinput)
         if motion:
             start_imu = True
             if dconf.get("hrtimer", False):
                 start_imu = d_timer.open()
             if start_imu:
-                prepare(d_imu)
-        prepare(d_kbd_1)
-        prepare(d_kbd_2)
+                rt.prepare(d_imu)
+                rt.allow_suspend(d_imu)
+        rt.prepare(d_kbd_1)
+        rt.prepare(d_kbd_2)
         for d in d_producers:
-            prepare(d)
+            rt.prepare(d)
+
+        # rt.attach(d_volume_btn)
+        rt.attach_async(d_xinput, types=("rumble",))
+        rt.attach_async(d_rgb, types=("led",), always=True)
+        rt.attach(*d_outs, always=True)
 
         logger.info("Emulated controller launched, have fun!")
         while not should_exit.is_set() and not updated.is_set():
-            start = time.perf_counter()
-            # Add timeout to call consumers a minimum amount of times per second
-            r, _, _ = select.select(fds, [], [], REPORT_DELAY_MAX)
-            evs = []
-            to_run = set()
-            for f in r:
-                to_run.add(id(fd_to_dev[f]))
-
-            for d in devs:
-                if id(d) in to_run:
-                    evs.extend(d.produce(r))
-
-            evs = multiplexer.process(evs)
-            if evs:
-                if debug:
-                    logger.info(evs)
-
-                # d_volume_btn.consume(evs)
-                d_xinput.consume(evs)
-
-            d_rgb.consume(evs)
-            for d in d_outs:
-                d.consume(evs)
-
-            # If unbounded, the total number of events per second is the sum of all
-            # events generated by the producers.
-            # For Legion go, that would be 100 + 100 + 500 + 30 = 730
-            # Since the controllers of the legion go only update at 500hz, this is
-            # wasteful.
-            # By setting a target refresh rate for the report and sleeping at the
-            # end, we ensure that even if multiple fds become ready close to each other
-            # they are combined to the same report, limiting resource use.
-            # Ideally, this rate is smaller than the report rate of the hardware controller
-            # to ensure there is always a report from that ready during refresh
-            t = time.perf_counter()
-            elapsed = t - start
-            if elapsed < REPORT_DELAY_MIN:
-                time.sleep(REPORT_DELAY_MIN - elapsed)
+            rt.step()
 
     except KeyboardInterrupt:
         raise
@@ -247,10 +204,4 @@ def controller_loop(
             logger.error(f"Error while closing device '{d}' with exception:\n{e}")
             if debug:
                 raise e
-        for d in reversed(devs):
-            try:
-                d.close(not updated.is_set())
-            except Exception as e:
-                logger.error(f"Error while closing device '{d}' with exception:\n{e}")
-                if debug:
-                    raise e
+        rt.close(not updated.is_set())
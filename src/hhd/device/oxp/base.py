@@ -1,11 +1,11 @@
 import logging
 import os
-import select
 import time
 from threading import Event as TEvent
 
-from hhd.controller import DEBUG_MODE, Multiplexer
+from hhd.controller import DEBUG_MODE, ControllerRuntime, Multiplexer
 from hhd.controller.lib.hide import unhide_all
+from hhd.controller.lib.registry import subscribe
 from hhd.controller.physical.evdev import B as EC
 from hhd.controller.physical.evdev import GenericGamepadEvdev, enumerate_evs
 from hhd.controller.physical.hidraw import enumerate_unique
@@ -24,7 +24,7 @@ from .hid_v1 import OxpHidraw
 from .hid_v2 import OxpHidrawV2
 from .serial import SerialDevice, get_serial
 
-FIND_DELAY = 0.1
+FIND_TIMEOUT = 2
 ERROR_DELAY = 0.3
 LONGER_ERROR_DELAY = 3
 LONGER_ERROR_MARGIN = 1.3
@@ -88,6 +88,9 @@ def plugin_run(
     repeated_fail = False
     switch_to_turbo = None
     first_disabled = True
+    devices = subscribe(
+        subsystems=["input", "hidraw"], vid=[GAMEPAD_VID, X1_MINI_VID, XFLY_VID]
+    )
 
     while not should_exit.is_set():
         if conf["controller_mode.mode"].to(str) == "disabled":
@@ -100,6 +103,7 @@ def plugin_run(
         else:
             first_disabled = True
 
+        devices.clear()
         try:
             found_device = bool(enumerate_evs(vid=GAMEPAD_VID, pid=GAMEPAD_PID))
         except Exception:
@@ -178,7 +182,7 @@ def plugin_run(
             if first:
                 logger.info("Controller not found. Waiting...")
                 switch_to_turbo = curr + TURBO_DELAY
-            time.sleep(FIND_DELAY)
+            devices.wait(FIND_TIMEOUT, should_exit)
             first = False
             if found_vendor and turbo and switch_to_turbo and curr > switch_to_turbo:
                 logger.info("Switching to turbo only button mode")
@@ -211,11 +215,17 @@ def plugin_run(
             # Raise exception
             if DEBUG_MODE:
                 raise e
-            time.sleep(sleep_time)
+            if repeated_fail:
+                time.sleep(sleep_time)
+            else:
+                # Restart as soon as the controller re-enumerates
+                devices.clear()
+                devices.wait(sleep_time, should_exit)
 
     # Close the volume keyboard cache
     UInputDevice.close_volume_cached()
     unhide_all()
+    devices.close()
 
 
 class OxpAtKbd(GenericGamepadEvdev):
@@ -227,6 +237,12 @@ class OxpAtKbd(GenericGamepadEvdev):
         self.state = {}
         self.queued = []
 
+    def next_deadline(self) -> float | None:
+        deadline = super().next_deadline()
+        if self.queued and (deadline is None or self.queued[0][1] < deadline):
+            deadline = self.queued[0][1]
+        return deadline
+
     def produce(self, fds):
         evs = list(super().produce(fds))
         curr = time.perf_counter()
@@ -391,8 +407,6 @@ def turbo_loop(
     dconf: dict,
     emit: Emitter,
 ):
-    debug = DEBUG_MODE
-
     # Output
     if dconf.get("rgb_secondary", False):
         rgb_modes = (
@@ -501,45 +515,37 @@ def turbo_loop(
     REPORT_FREQ_MIN = 25
     REPORT_FREQ_MAX = 25
 
-    REPORT_DELAY_MAX = 1 / REPORT_FREQ_MIN
-    REPORT_DELAY_MIN = 1 / REPORT_FREQ_MAX
-
-    fds = []
-    devs = []
-    fd_to_dev = {}
-
-    def prepare(m):
-        devs.append(m)
-        fs = m.open()
-        fds.extend(fs)
-        for f in fs:
-            fd_to_dev[f] = m
+    rt = ControllerRuntime(multiplexer, REPORT_FREQ_MIN, REPORT_FREQ_MAX)
 
     try:
-        prepare(d_volume_btn)
+        rt.prepare(d_volume_btn)
         d_vend = find_vendor(
-            prepare,
+            rt.prepare,
             True,
             protocol=dconf.get("protocol", None),
             secondary=dconf.get("rgb_secondary", False),
             secondary_breathing=dconf.get("rgb_secondary_breathing", False),
             vibration=conf.get("vibration_strength", None),
         )
-        d_vend_id = [id(d) for d in d_vend]
+        rt.always_produce(*d_vend)
 
         for d in d_producers:
-            prepare(d)
+            rt.prepare(d)
         for d in d_kbds:
-            prepare(d)
+            rt.prepare(d)
+
+        rt.attach(d_volume_btn)
+        # Shares its command queue with produce() and open()
+        rt.attach(*d_vend, always=True)
+        rt.attach(*d_outs, always=True)
 
         logger.info(
             "Turbo only mode started, the turbo button of the device will still work."
         )
         while not should_exit.is_set() and not updated.is_set():
-            start = time.perf_counter()
-
-            if start - last_controller_check > TURBO_CONTROLLER_CHECK:
-                last_controller_check = start
+            curr = time.perf_counter()
+            if curr - last_controller_check > TURBO_CONTROLLER_CHECK:
+                last_controller_check = curr
                 try:
                     found_device = bool(enumerate_evs(vid=GAMEPAD_VID, pid=GAMEPAD_PID))
                 except Exception:
@@ -549,48 +555,17 @@ def turbo_loop(
                     logger.info("Controller found, switching to controller mode.")
                     break
 
-            r, _, _ = select.select(fds, [], [], REPORT_DELAY_MAX)
-            evs = []
-            to_run = set()
-            for f in r:
-                to_run.add(id(fd_to_dev[f]))
-
-            for d in devs:
-                d_id = id(d)
-                if d_id in to_run or d_id in d_vend_id:
-                    evs.extend(d.produce(r))
-
-            # Read delayed events
-            for d in d_kbds:
-                evs.extend(d.produce([]))
+            r = rt.wait()
+            evs = rt.produce(r)
+            evs = rt.process(evs)
+            rt.consume(evs)
 
-            evs = multiplexer.process(evs)
-            if evs:
-                if debug:
-                    logger.info(evs)
-
-                d_volume_btn.consume(evs)
-
-            for d in d_vend:
-                d.consume(evs)
-            for d in d_outs:
-                d.consume(evs)
-
-            t = time.perf_counter()
-            elapsed = t - start
-            if elapsed < REPORT_DELAY_MIN:
-                time.sleep(REPORT_DELAY_MIN - elapsed)
+            rt.pace()
 
     except KeyboardInterrupt:
         raise
     finally:
-        for d in reversed(devs):
-            try:
-                d.close(not updated.is_set())
-            except Exception as e:
-                logger.error(f"Error while closing device '{d}' with exception:\n{e}")
-                if debug:
-                    raise e
+        rt.close(not updated.is_set())
 
 
 def controller_loop(
@@ -745,82 +720,50 @@ def controller_loop(
     if motion:
         REPORT_FREQ_MAX = max(REPORT_FREQ_MAX, conf["imu_hz"].to(float))
 
-    REPORT_DELAY_MAX = 1 / REPORT_FREQ_MIN
-    REPORT_DELAY_MIN = 1 / REPORT_FREQ_MAX
-
-    fds = []
-    devs = []
-    fd_to_dev = {}
-
-    def prepare(m):
-        devs.append(m)
-        fs = m.open()
-        fds.extend(fs)
-        for f in fs:
-            fd_to_dev[f] = m
+    rt = ControllerRuntime(multiplexer, REPORT_FREQ_MIN, REPORT_FREQ_MAX)
 
     try:
         d_vend = find_vendor(
-            prepare,
+            rt.prepare,
             turbo,
             protocol=dconf.get("protocol", None),
             secondary=dconf.get("rgb_secondary", False),
             secondary_breathing=dconf.get("rgb_secondary_breathing", False),
             vibration=conf.get("vibration_strength", None),
         )
-        d_vend_id = [id(d) for d in d_vend]
+        rt.always_produce(*d_vend)
         if dconf.get("g1", False):
-            prepare(d_kbd_2)
-        prepare(d_xinput)
+            rt.prepare(d_kbd_2)
+        rt.prepare(d_xinput)
+        rt.allow_suspend(d_xinput)
         if motion:
             start_imu = True
             if dconf.get("hrtimer", False):
                 start_imu = d_timer.open()
             if start_imu:
-                prepare(d_imu)
-        prepare(d_volume_btn)
+                rt.prepare(d_imu)
+                rt.allow_suspend(d_imu)
+        rt.prepare(d_volume_btn)
         for d in d_kbds:
-            prepare(d)
+            rt.prepare(d)
 
         for d in d_producers:
-            prepare(d)
+            rt.prepare(d)
+
+        rt.attach(d_volume_btn)
+        rt.attach_async(d_xinput, types=("rumble",))
+        # Shares its command queue with produce() and open()
+        rt.attach(*d_vend, always=True)
+        rt.attach(*d_outs, always=True)
 
         logger.info("Emulated controller launched, have fun!")
         while not should_exit.is_set() and not updated.is_set():
-            start = time.perf_counter()
-            # Add timeout to call consumers a minimum amount of times per second
-            r, _, _ = select.select(fds, [], [], REPORT_DELAY_MAX)
-            evs = []
-            to_run = set()
-            for f in r:
-                to_run.add(id(fd_to_dev[f]))
-
-            for d in devs:
-                d_id = id(d)
-                if d_id in to_run or d_id in d_vend_id:
-                    evs.extend(d.produce(r))
-
-            # Read delayed events
-            for d in d_kbds:
-                evs.extend(d.produce([]))
-
-            evs = multiplexer.process(evs)
-            if evs:
-                if debug:
-                    logger.info(evs)
-
-                d_volume_btn.consume(evs)
-                d_xinput.consume(evs)
-
-            for d in d_vend:
-                d.consume(evs)
-            for d in d_outs:
-                d.consume(evs)
-
-            t = time.perf_counter()
-            elapsed = t - start
-            if elapsed < REPORT_DELAY_MIN:
-                time.sleep(REPORT_DELAY_MIN - elapsed)
+            r = rt.wait()
+            evs = rt.produce(r)
+            evs = rt.process(evs)
+            rt.consume(evs)
+
+            rt.pace()
 
     except KeyboardInterrupt:
         raise
@@ -832,10 +775,4 @@ def controller_loop(
             logger.error(f"Error while closing device '{d}' with exception:\n{e}")
             if debug:
                 raise e
-        for d in reversed(devs):
-            try:
-                d.close(not updated.is_set())
-            except Exception as e:
-                logger.error(f"Error while closing device '{d}' with exception:\n{e}")
-                if debug:
-                    raise e
+        rt.close(not updated.is_set())
@@ -123,6 +123,14 @@ class OxpHidrawV2(GenericGamepadHidraw):
         self.queue_cmd.extend(INITIALIZE)
         return a
 
+    def next_deadline(self) -> float | None:
+        if not self.dev:
+            return None
+        ts = [t + KBD_HOLD for t in (self.queue_kbd, self.queue_home) if t]
+        if self.queue_cmd:
+            ts.append(self.next_send)
+        return min(ts) if ts else None
+
     def consume(self, events):
         if not self.dev:
             return
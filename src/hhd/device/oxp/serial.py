@@ -225,6 +225,16 @@ class SerialDevice(Consumer, Producer):
 
         return [ser.fd]
 
+    def next_deadline(self) -> float | None:
+        if not self.ser:
+            return None
+        ts = []
+        if self.queue_kbd:
+            ts.append(self.queue_kbd + KBD_HOLD)
+        if self.queue_cmd:
+            ts.append(self.last_sent + WRITE_DELAY)
+        return min(ts) if ts else None
+
     def consume(self, events):
         if not self.ser:
             return
@@ -1,11 +1,18 @@
 import logging
-import select
 import time
 from threading import Event as TEvent
 from typing import Sequence, Literal
 
-from hhd.controller import DEBUG_MODE, Axis, Event, Multiplexer, can_read
+from hhd.controller import (
+    DEBUG_MODE,
+    Axis,
+    ControllerRuntime,
+    Event,
+    Multiplexer,
+    can_read,
+)
 from hhd.controller.lib.hide import unhide_all
+from hhd.controller.lib.registry import subscribe
 from hhd.controller.physical.evdev import DINPUT_AXIS_POSTPROCESS, AbsAxis
 from hhd.controller.physical.evdev import B as EC
 from hhd.controller.physical.evdev import (
@@ -65,7 +72,7 @@ VIBRATION_OFF: Event = {
     "weak_magnitude": 0,
 }
 
-FIND_DELAY = 0.1
+FIND_TIMEOUT = 2
 ERROR_DELAY = 0.3
 LONGER_ERROR_DELAY = 3
 LONGER_ERROR_MARGIN = 1.3
@@ -145,6 +152,16 @@ class AllyHidraw(GenericGamepadHidraw):
         self.late_init = time.perf_counter()
         return a
 
+    def next_deadline(self) -> float | None:
+        if not self.dev:
+            return None
+        ts = []
+        if self.queue:
+            ts.append(self.queue[0][1])
+        if self.late_init:
+            ts.append(self.late_init + 5)
+        return min(ts) if ts else None
+
     def produce(self, fds: Sequence[int]) -> Sequence[Event]:
         # If we can not read return
         if not self.fd or not self.dev:
@@ -267,9 +284,11 @@ def plugin_run(
     init = time.perf_counter()
     repeated_fail = False
     first = True
+    devices = subscribe(subsystems=["input", "hidraw"], vid=[GAMEPAD_VID, ASUS_VID])
 
     while not should_exit.is_set():
         try:
+            devices.clear()
             gamepad_devs = enumerate_evs(vid=GAMEPAD_VID)
             nkey_devs = enumerate_unique(vid=ASUS_VID)
 
@@ -277,7 +296,7 @@ def plugin_run(
                 if first:
                     first = False
                     logger.warning(f"Ally controller not found, waiting...")
-                time.sleep(FIND_DELAY)
+                devices.wait(FIND_TIMEOUT, should_exit)
                 continue
 
             logger.info("Launching emulated controller.")
@@ -300,10 +319,16 @@ def plugin_run(
             # Raise exception
             if DEBUG_MODE:
                 raise e
-            time.sleep(sleep_time)
+            if repeated_fail:
+                time.sleep(sleep_time)
+            else:
+                # Restart as soon as the controller re-enumerates
+                devices.clear()
+                devices.wait(sleep_time, should_exit)
 
     # Unhide all devices before exiting
     unhide_all()
+    devices.close()
 
 
 def controller_loop(
@@ -432,52 +457,38 @@ def controller_loop(
     if motion:
         REPORT_FREQ_MAX = max(REPORT_FREQ_MAX, conf["imu_hz"].to(float))
 
-    REPORT_DELAY_MAX = 1 / REPORT_FREQ_MIN
-    REPORT_DELAY_MIN = 1 / REPORT_FREQ_MAX
-
-    fds = []
-    devs = []
-    fd_to_dev = {}
-
-    def prepare(m):
-        devs.append(m)
-        fs = m.open()
-        fds.extend(fs)
-        for f in fs:
-            fd_to_dev[f] = m
+    rt = ControllerRuntime(multiplexer, REPORT_FREQ_MIN, REPORT_FREQ_MAX)
 
     try:
-        d_vend.open()
-        prepare(d_xinput)
+        # Read by the loop, so the fds only wake it up
+        rt.register(d_vend.open())
+        rt.watch(d_vend)
+        rt.prepare(d_xinput)
+        rt.allow_suspend(d_xinput)
         if d_allyx:
-            prepare(d_allyx)
+            rt.prepare(d_allyx)
+            rt.allow_suspend(d_allyx)
         if motion:
             if d_timer.open():
-                prepare(d_imu)
-        prepare(d_kbd_1)
+                rt.prepare(d_imu)
+                rt.allow_suspend(d_imu)
+        rt.prepare(d_kbd_1)
         for d in d_producers:
-            prepare(d)
+            rt.prepare(d)
+
+        rt.attach_async(d_vend, types=("led",))
+        rt.attach_async(d_xinput, types=("rumble",))
+        if d_allyx:
+            rt.attach_async(d_allyx, types=("rumble",))
+        rt.attach(*d_outs, always=True)
 
         woke_up.set()
         logger.info("Emulated controller launched, have fun!")
         while not should_exit.is_set() and not updated.is_set():
-            start = time.perf_counter()
-            # Add timeout to call consumers a minimum amount of times per second
-            r, _, _ = select.select(fds, [], [], REPORT_DELAY_MAX)
-            evs = []
-            to_run = set()
-            for f in r:
-                to_run.add(id(fd_to_dev[f]))
-
-            for d in devs:
-                if id(d) in to_run:
-                    evs.extend(d.produce(r))
+            r = rt.wait()
+            evs = rt.produce(r)
             evs.extend(d_vend.produce(r))
-
-            evs = multiplexer.process(evs)
-            if evs:
-                if debug:
-                    logger.info(evs)
+            evs = rt.process(evs)
 
             # Handle dynamic lighting quirk
             if ally_x and xbox and woke_up.is_set():
@@ -503,13 +514,7 @@ def controller_loop(
                     except Exception:
                         pass
 
-            d_vend.consume(evs)
-            d_xinput.consume(evs)
-            if d_allyx:
-                d_allyx.consume(evs)
-
-            for d in d_outs:
-                d.consume(evs)
+            rt.consume(evs)
 
             if d_vend.mouse_mode and d_kbd_grabbed and d_kbd_1.dev:
                 try:
@@ -524,24 +529,12 @@ def controller_loop(
                     pass
                 d_kbd_grabbed = True
 
-            # If unbounded, the total number of events per second is the sum of all
-            # events generated by the producers.
-            # For Legion go, that would be 100 + 100 + 500 + 30 = 730
-            # Since the controllers of the legion go only update at 500hz, this is
-            # wasteful.
-            # By setting a target refresh rate for the report and sleeping at the
-            # end, we ensure that even if multiple fds become ready close to each other
-            # they are combined to the same report, limiting resource use.
-            # Ideally, this rate is smaller than the report rate of the hardware controller
-            # to ensure there is always a report from that ready during refresh
-            t = time.perf_counter()
-            elapsed = t - start
-            if elapsed < REPORT_DELAY_MIN:
-                time.sleep(REPORT_DELAY_MIN - elapsed)
+            rt.pace()
 
     except KeyboardInterrupt:
         raise
     finally:
+        rt.stop_async()
         try:
             d_vend.close(not updated.is_set())
         except Exception as e:
@@ -554,10 +547,4 @@ def controller_loop(
             logger.error(f"Error while closing device '{d}' with exception:\n{e}")
             if debug:
                 raise e
-        for d in reversed(devs):
-            try:
-                d.close(not updated.is_set())
-            except Exception as e:
-                logger.error(f"Error while closing device '{d}' with exception:\n{e}")
-                if debug:
-                    raise e
+        rt.close(not updated.is_set())
@@ -10,6 +10,7 @@ from threading import Condition, Thread
 from typing import Any, Mapping, Sequence, cast
 from urllib.parse import parse_qs, urlparse
 
+from hhd.controller.latency import TRACER
 from hhd.plugins import (
     Config,
     Context,
@@ -364,6 +365,17 @@ class RestHandler(BaseHTTPRequestHandler):
                         )
                         self.wfile.write(json.dumps(out).encode())
 
+            case "latency":
+                if content:
+                    if not isinstance(content, Mapping):
+                        return self.send_error(
+                            f"Latency content should be a dictionary."
+                        )
+                    if "enabled" in content:
+                        TRACER.enable(bool(content["enabled"]))
+                    if content.get("reset", False):
+                        TRACER.reset()
+                self.send_json(TRACER.summary())
             case "version":
                 self.send_json({"version": 5})
             case "sections":
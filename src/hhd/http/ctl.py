@@ -5,7 +5,7 @@ from http.client import HTTPConnection
 
 SOCKET_UNIX = "/run/hhd/api"
 USAGE = """
-hhdctl [-h] [--sep SEP] [--values] {get,set,poll,track} [keys ...]
+hhdctl [-h] [--sep SEP] [--values] {get,set,poll,track,latency} [keys ...]
 
 Handheld Daemon CLI
 This CLI is used to interact with  Handheld Daemon (hhd) via its API. It requires 
@@ -23,6 +23,11 @@ Commands:
     track: Continuously track the provided values. Same as calling get and then 
         poll repeatedly. The separator between updates can be changed with --sep. 
         Default is \\n. track will print the values even if they did not change.
+    latency: Show the input latency of the controller loops per stage (decode,
+        process, write, total) in microseconds. Tracing is off by default,
+        use `latency enable` to start it, `latency disable` to stop it and
+        `latency reset` to clear the histograms. It can also be enabled on
+        startup with HHD_LATENCY=1.
 
 Examples:
     hhdctl get
@@ -30,6 +35,8 @@ Examples:
     hhdctl set rgb.handheld.mode.mode=oxp
     # For a single value, --values and --sep='' can be used to return the value
     hhdctl get rgb.handheld.mode.mode --values --sep=''
+    hhdctl latency enable
+    hhdctl latency total.p99_us
 """
 
 
@@ -77,6 +84,12 @@ def send_event(event):
     return _request("POST", f"/api/v1/event", body=json.dumps(event))
 
 
+def _get_latency(options=None):
+    if options is not None:
+        return _request("POST", f"/api/v1/latency", body=json.dumps(options))
+    return _request("GET", f"/api/v1/latency")
+
+
 def _get(keys, poll: bool = False, state=None, values: bool = False):
     if state is not None:
         state = _set_state(state)
@@ -130,6 +143,42 @@ def _track(keys, sep, values):
         poll = True
 
 
+def _latency(keys, values):
+    options = {}
+    keys = list(keys or [])
+    while keys and keys[0] in ("enable", "disable", "reset"):
+        match keys.pop(0):
+            case "enable":
+                options["enabled"] = True
+            case "disable":
+                options["enabled"] = False
+            case "reset":
+                options["reset"] = True
+
+    res = _get_latency(options or None)
+    if res.status != 200:
+        _log_error(f"Failed to get latency with status: {res.status}")
+        return 2
+
+    data = json.loads(res.read())
+    if not data["enabled"]:
+        _log_error("Latency tracing is disabled, use 'hhdctl latency enable'.")
+    stats = unroll_dict(data["stages"])
+
+    out = ""
+    err = 0
+    for k in keys or stats:
+        if k not in stats:
+            _log_error(f"Key {k} not found in latency stats")
+            err = 3
+            continue
+        out += f"{stats[k]}\n" if values else f"{k}={stats[k]}\n"
+
+    sys.stdout.write(out)
+    sys.stdout.flush()
+    return err
+
+
 def _set(keys, values):
     if not keys:
         _log_error("No keys provided to set")
@@ -173,7 +222,9 @@ def _main():
     )
 
     parser.add_argument(
-        "command", help="Command to execute", choices=["get", "set", "poll", "track"]
+        "command",
+        help="Command to execute",
+        choices=["get", "set", "poll", "track", "latency"],
     )
     parser.add_argument(
         "keys",
@@ -203,6 +254,8 @@ def _main():
             v = _track(args.keys, args.sep, args.values)
         case "poll":
             v = _get(args.keys, poll=True, values=args.values)
+        case "latency":
+            v = _latency(args.keys, args.values)
         case _:
             _log_error(f"Invalid command: '{args.command}'")
             v = -1
@@ -1,11 +1,13 @@
 from .conf import Config
 from .inputs import gen_gyro_state, get_gyro_config, get_gyro_state, get_touchpad_config
 from .outputs import (
+    OUTPUTS_HOT_KEYS,
     fix_limits,
     get_limits,
     get_limits_config,
     get_outputs,
     get_outputs_config,
+    reconfigure_outputs,
 )
 from .plugin import (
     Context,
@@ -42,4 +44,6 @@ __all__ = [
     "get_limits",
     "get_gid",
     "fix_limits",
+    "reconfigure_outputs",
+    "OUTPUTS_HOT_KEYS",
 ]
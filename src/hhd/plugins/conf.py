@@ -2,6 +2,7 @@ from copy import deepcopy
 from threading import Lock
 from typing import (
     Any,
+    Iterable,
     Mapping,
     MutableMapping,
     MutableSequence,
@@ -13,6 +14,8 @@ from typing import (
 Pytree = int | float | str | Sequence["Pytree"] | Mapping[str, "Pytree"]
 A = TypeVar("A")
 
+_MISSING = object()
+
 
 def parse_conf(c: Pytree, out: MutableMapping | None = None):
     if not isinstance(c, MutableMapping):
@@ -67,7 +70,66 @@ def to_seq(key: str | tuple[str, ...]):
     return seq
 
 
+# Split keys, as plugins look up the same few hundred keys repeatedly
+_PATHS: dict[str | tuple[str, ...], tuple[str, ...]] = {}
+# Keys built at runtime (e.g., with f-strings) could grow the cache unbounded
+_PATHS_MAX = 8192
+
+
+def _split(key: str | tuple[str, ...]) -> tuple[str, ...]:
+    seq = _PATHS.get(key, None)
+    if seq is None:
+        seq = tuple(to_seq(key))
+        if len(_PATHS) < _PATHS_MAX:
+            _PATHS[key] = seq
+    return seq
+
+
+# Values that can be shared between trees as is
+_IMMUTABLE = (str, int, float, bool, bytes, type(None))
+
+
+def _own(v):
+    """Returns `v`, or a copy of it if it can be mutated by the caller."""
+    if isinstance(v, _IMMUTABLE):
+        return v
+    if isinstance(v, Mapping):
+        return {k: _own(s) for k, s in v.items()}
+    if isinstance(v, list):
+        return [_own(s) for s in v]
+    return deepcopy(v)
+
+
+def _merge(base, v):
+    """Returns a new tree with `v` parsed and merged onto `base`, in the same
+    way as `parse_conf`. Neither is modified and the branches of `base` that
+    are not written to are shared with the result."""
+    if not isinstance(v, Mapping):
+        return _own(v)
+
+    out = dict(base) if isinstance(base, Mapping) else {}
+    for multival, sub in v.items():
+        k, *rest = multival.split(".")
+        if rest:
+            sub = {".".join(rest): sub}
+        out[k] = _merge(out.get(k, None), sub)
+    return out
+
+
+def _delete(tree, seq: Sequence[str]):
+    """Returns a new tree without the value at `seq`."""
+    tree = cast(Mapping, tree)
+    out = dict(tree)
+    if len(seq) == 1:
+        del out[seq[0]]
+    else:
+        out[seq[0]] = _delete(tree[seq[0]], seq[1:])
+    return out
+
+
 def compare_dicts(a, b):
+    if a is b:
+        return True
     if len(a) != len(b):
         return False
 
@@ -85,27 +147,113 @@ def compare_dicts(a, b):
     return True
 
 
+def diff_dicts(a, b, prefix: str = "") -> set[str]:
+    """Returns the dotted paths of the values that differ between `a` and `b`."""
+    if a is b:
+        return set()
+    if not isinstance(a, Mapping) or not isinstance(b, Mapping):
+        return set() if a == b else {prefix}
+
+    out = set()
+    for k in set(a) | set(b):
+        key = f"{prefix}.{k}" if prefix else k
+        if k not in a or k not in b:
+            out.add(key)
+        else:
+            out.update(diff_dicts(a[k], b[k], key))
+    return out
+
+
+def keys_within(keys: Iterable[str], prefixes: Iterable[str]) -> bool:
+    """Returns True if every key is one of `prefixes` or nested below one."""
+    prefixes = tuple(prefixes)
+    for k in keys:
+        if not any(k == p or k.startswith(p + ".") for p in prefixes):
+            return False
+    return True
+
+
+def keys_overlap(keys: Iterable[str], prefixes: Iterable[str]) -> bool:
+    """Returns True if any key is one of `prefixes`, nested below one, or a
+    parent of one."""
+    prefixes = tuple(prefixes)
+    for k in keys:
+        for p in prefixes:
+            if k == p or k.startswith(p + ".") or p.startswith(k + "."):
+                return True
+    return False
+
+
 class Config:
+    """Thread safe configuration tree, accessed with dotted keys.
+
+    The tree is persistent: it is never modified in place, writes replace
+    the dictionaries along the written path and share the rest. Therefore,
+    subtrees and copies can be handed out without copying them, and only
+    `conf` and `to()` copy the (sub)tree they return.
+
+    Lookups are memoized in a flat index from split paths to values, which
+    is reset when the tree is replaced by a write.
+
+    The paths written since the last `take_dirty()` are tracked, so that
+    validation only has to recheck them."""
+
     def __init__(
         self, conf: Pytree | Sequence[Pytree] = [], readonly: bool = False
     ) -> None:
         self._conf: Pytree | MutableMapping = {}
+        self._index: dict[tuple[str, ...], Any] = {}
+        self._dirty: set[tuple[str, ...]] | None = None
         self._lock = Lock()
         self._updated = False
         self.readonly = readonly
         self.update(conf)
         self.updated = False
 
+    @staticmethod
+    def _wrap(tree: Pytree) -> "Config":
+        """Returns a config over `tree`, which is shared and not copied."""
+        c = Config.__new__(Config)
+        c._conf = tree
+        c._index = {}
+        c._dirty = None
+        c._lock = Lock()
+        c._updated = False
+        c.readonly = False
+        return c
+
+    def _replace(self, tree: Pytree):
+        # Lock should be held
+        self._conf = tree
+        self._index = {}
+
+    def _lookup(self, seq: tuple[str, ...]):
+        with self._lock:
+            v = self._index.get(seq, _MISSING)
+            if v is _MISSING:
+                v = self._conf
+                for s in seq:
+                    v = cast(Mapping, v)[s]
+                self._index[seq] = v
+            return v
+
     def update(self, conf: Pytree | Sequence[Pytree]):
         with self._lock:
-            conf = deepcopy(conf)
             if isinstance(conf, Sequence):
-                self._conf = parse_confs(conf, self._conf)
+                tree = self._conf
+                if not isinstance(tree, Mapping):
+                    tree = {}
+                for c in conf:
+                    tree = _merge(tree, c)
+                self._replace(tree)
             else:
-                if isinstance(self._conf, MutableMapping):
-                    parse_conf(conf, self._conf)
+                if isinstance(self._conf, Mapping):
+                    if isinstance(conf, Mapping):
+                        self._replace(_merge(self._conf, conf))
                 else:
-                    self._conf = conf
+                    self._replace(_own(conf))
+            # Merges may touch any key
+            self._dirty = None
         self.updated = True
 
     def __eq__(self, __value: object) -> bool:
@@ -118,61 +266,78 @@ class Config:
         with __value._lock, self._lock:
             return compare_dicts(__value._conf, self._conf)
 
+    def diff(self, other: "Config") -> set[str]:
+        """Returns the dotted paths of the values that changed in `other`."""
+        if other is self:
+            return set()
+
+        with other._lock, self._lock:
+            return diff_dicts(self._conf, other._conf)
+
     def __setitem__(self, key: str | tuple[str, ...], val):
-        with self._lock:
-            val = deepcopy(val)
-            seq = to_seq(key)
+        self._set(_split(key), val)
 
-            cont = {}
-            d = cont
+    def _set(self, seq: tuple[str, ...], val):
+        with self._lock:
+            # Copy the path to the written value, comparing only that value
+            path = [self._conf if isinstance(self._conf, Mapping) else {}]
             for s in seq[:-1]:
-                d[s] = {}
-                d = d[s]
-
-            d[seq[-1]] = val
-            if isinstance(self._conf, MutableMapping):
-                init = deepcopy(self._conf)
-                parse_conf(cont, self._conf)
-                # FIXME: verify no regressions
-                if init != self._conf:
-                    self._updated = True
-            else:
-                self._conf = cont
-                if self._conf != cont:
-                    self._updated = True
+                d = path[-1].get(s, None)
+                path.append(d if isinstance(d, Mapping) else {})
+            old = path[-1].get(seq[-1], _MISSING)
+            new = _merge(None if old is _MISSING else old, val)
+            changed = old is _MISSING or old != new
+            if not changed and type(old) is type(new):
+                return
+
+            for s, d in zip(reversed(seq), reversed(path)):
+                new = {**d, s: new}
+            self._replace(new)
+            if self._dirty is not None:
+                self._dirty.add(seq)
+            if changed:
+                self._updated = True
 
     def __contains__(self, key: str | tuple[str, ...]):
-        with self._lock:
-            seq = to_seq(key)
-            d = self._conf
-            for s in seq:
-                if s not in d:
-                    return False
-                d = cast(Mapping, d)[s]
-        return True
+        try:
+            self._lookup(_split(key))
+            return True
+        except (KeyError, TypeError):
+            return False
 
     def __getitem__(self, key: str | tuple[str, ...]) -> "Config":
-        with self._lock:
-            assert isinstance(self._conf, MutableMapping)
-            seq = to_seq(key)
-            d = self._conf
-            for s in seq:
-                d = cast(Mapping, d)[s]
-            return Config([deepcopy(d)])
+        assert isinstance(self._conf, Mapping)
+        return Config._wrap(self._lookup(_split(key)))
 
     def __delitem__(self, key: str | tuple[str, ...]):
         with self._lock:
-            assert isinstance(self._conf, MutableMapping)
-            seq = to_seq(key)
-            d = self._conf
-            for s in seq[:-1]:
-                d = cast(Mapping, d)[s]
-            del d[seq[-1]]
+            assert isinstance(self._conf, Mapping)
+            seq = _split(key)
+            self._replace(_delete(self._conf, seq))
+            if self._dirty is not None:
+                self._dirty.add(seq)
         self.updated = True
 
+    def take_dirty(self) -> set[tuple[str, ...]] | None:
+        """Returns the split paths written since the last call, or None if
+        any key may have changed (e.g., after `update()`) and resets them."""
+        with self._lock:
+            dirty = self._dirty
+            self._dirty = set()
+            return dirty
+
+    def mark_dirty(self):
+        """Marks every key as written, e.g., after the settings change."""
+        with self._lock:
+            self._dirty = None
+
+    def view(self, prefix: str | tuple[str, ...]) -> "ConfigView":
+        """Returns a view of the subtree at `prefix`, for repeated lookups."""
+        return ConfigView(self, _split(prefix))
+
     def get(self, key, default: A) -> A:
         try:
-            return self[key].to(type(default))
+            return cast(type(default), _own(self._lookup(_split(key))))
         except KeyError:
             return default
         except TypeError:
@@ -200,12 +365,14 @@ class Config:
         return cast(t, self.conf)
 
     def copy(self):
-        return Config([self.conf])
+        with self._lock:
+            tree = self._conf
+        return Config._wrap(tree)
 
     @property
     def conf(self):
         with self._lock:
-            return deepcopy(self._conf)
+            return _own(self._conf)
 
     @property
     def updated(self):
@@ -216,3 +383,34 @@ class Config:
     def updated(self, v: bool):
         with self._lock:
             self._updated = v
+
+
+class ConfigView:
+    """Cursor over the subtree of a config at `prefix`.
+
+    Keys are relative to the prefix and reads and writes go through the
+    config, so the view follows its changes. Use it to avoid repeating
+    (and re-splitting) long prefixes for each lookup."""
+
+    def __init__(self, conf: Config, prefix: tuple[str, ...]) -> None:
+        self._parent = conf
+        self.prefix = prefix
+
+    def __getitem__(self, key: str | tuple[str, ...]) -> Config:
+        return Config._wrap(self._parent._lookup(self.prefix + _split(key)))
+
+    def __setitem__(self, key: str | tuple[str, ...], val):
+        self._parent._set(self.prefix + _split(key), val)
+
+    def __contains__(self, key: str | tuple[str, ...]):
+        return (self.prefix + _split(key)) in self._parent
+
+    def get(self, key, default: A) -> A:
+        return self._parent.get(self.prefix + _split(key), default)
+
+    def view(self, prefix: str | tuple[str, ...]) -> "ConfigView":
+        return ConfigView(self._parent, self.prefix + _split(prefix))
+
+    @property
+    def conf(self):
+        return self._parent[self.prefix].conf
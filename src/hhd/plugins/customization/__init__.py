@@ -24,6 +24,9 @@ def write_led(path: str, enabled: bool):
 
 
 class CustomizationPlugin(HHDPlugin):
+    subscribe = ("gamemode.customization",)
+    periodic = False
+
     def __init__(self, leds: Mapping[str, str]) -> None:
         self.name = "customization"
         self.priority = 76
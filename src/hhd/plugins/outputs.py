@@ -170,7 +170,7 @@ def get_outputs(
                             version = 1
                         case "dual":
                             version = 2
-                        case _: # "quad"
+                        case _:  # "quad"
                             version = 3
                 sync_gyro = conf.get("hori_steam.sync_gyro", True)
                 has_qam = True
@@ -208,6 +208,9 @@ def get_outputs(
                 sync_gyro=sync_gyro and motion,
                 gyro=motion,
             )
+            # Uinput does not report if the node has readers, so the main
+            # gamepad keeps the controller from suspending
+            d.available = True
             producers.append(d)
             consumers.append(d)
             # Deactivate motion if using an xbox theme
@@ -292,6 +295,36 @@ def get_outputs(
     )
 
 
+# Output settings that `reconfigure_outputs` may apply to a running controller,
+# relative to the controller mode
+OUTPUTS_HOT_KEYS = [
+    "hidden.noob_mode",
+    "uinput.paddles_as",
+    "uinput.nintendo_qam",
+    "joycon_pair.nintendo_qam",
+    "hori_steam.noob_mode",
+    "hori_steam.sync_gyro",
+    "hori_steam.flip_z",
+    "dualsense.paddles_as",
+    "dualsense.sync_gyro",
+    "dualsense.flip_z",
+]
+
+
+def reconfigure_outputs(consumers: Sequence[Consumer], new: Sequence[Consumer]) -> bool:
+    """Applies the settings of outputs built by `get_outputs` from the new
+    configuration to the running ones. Returns False if different devices
+    are needed and the controller should be restarted."""
+    if len(consumers) != len(new):
+        return False
+    for c, n in zip(consumers, new):
+        if type(c) is not type(n) or not hasattr(c, "reconfigure"):
+            return False
+        if not getattr(c, "reconfigure")(n):
+            return False
+    return True
+
+
 def get_outputs_config(
     can_disable: bool = False,
     has_leds: bool = True,
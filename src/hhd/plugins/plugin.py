@@ -131,6 +131,13 @@ class HHDPlugin:
     name: str
     priority: int
     log: str
+    # Config key prefixes `update()` depends on, e.g., "controllers.legion_go".
+    # Plugins that are not `periodic` are updated only when one of them
+    # changes (and when the configuration reloads).
+    subscribe: Sequence[str] = ()
+    # Update the plugin on every loop iteration, e.g., to poll the hardware
+    # or to apply values queued by `notify()`.
+    periodic: bool = True
 
     def open(
         self,
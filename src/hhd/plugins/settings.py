@@ -705,6 +705,33 @@ def unravel_options(settings: HHDSettings):
     return options
 
 
+# Unravelled options by settings hash. Settings only change on reload, so
+# a couple of entries are enough.
+_OPTIONS_CACHE: dict[str, tuple[Mapping, Mapping]] = {}
+_OPTIONS_CACHE_MAX = 4
+
+
+def get_options(settings: HHDSettings, shash: str | None = None):
+    """Returns the unravelled options of `settings` and the keys of the
+    options under each path prefix, cached by the settings hash."""
+    if shash is None:
+        shash = get_settings_hash(settings)
+    if shash in _OPTIONS_CACHE:
+        return _OPTIONS_CACHE[shash]
+
+    options = unravel_options(settings)
+    prefixes: dict[tuple[str, ...], list[str]] = {}
+    for k in options:
+        seq = tuple(k.split("."))
+        for i in range(1, len(seq) + 1):
+            prefixes.setdefault(seq[:i], []).append(k)
+
+    if len(_OPTIONS_CACHE) >= _OPTIONS_CACHE_MAX:
+        _OPTIONS_CACHE.clear()
+    _OPTIONS_CACHE[shash] = (options, prefixes)
+    return options, prefixes
+
+
 class Validator(Protocol):
     def __call__(self, tags: Sequence[str], config: Any, value: Any) -> bool:
         return False
@@ -778,11 +805,34 @@ def standard_validator(tags, config, value):
     return False
 
 def validate_config(
-    conf: Config, settings: HHDSettings, validator: Validator, use_defaults: bool = True
+    conf: Config,
+    settings: HHDSettings,
+    validator: Validator,
+    use_defaults: bool = True,
+    shash: str | None = None,
 ):
-    options = unravel_options(settings)
+    """Fixes the values of `conf` that are invalid according to `settings`.
+
+    Only the options written since the last validation of `conf` are checked,
+    unless all of them could have changed (see `Config.take_dirty()`)."""
+    options, prefixes = get_options(settings, shash)
 
-    for k, d in options.items():
+    dirty = conf.take_dirty()
+    if dirty is None:
+        keys = options
+    else:
+        keys = set()
+        for seq in dirty:
+            # Options written directly or through one of their parents
+            keys.update(prefixes.get(seq, ()))
+            # Values within options (e.g., the channels of a color)
+            for i in range(1, len(seq)):
+                k = ".".join(seq[:i])
+                if k in options:
+                    keys.add(k)
+
+    for k in keys:
+        d = options[k]
         v = conf.get(k, None)
         if d["type"] == "action":
             default = False
@@ -0,0 +1,98 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from hhd.controller import runtime
+from hhd.controller.base import Consumer
+from hhd.controller.runtime import AsyncConsumer, ControllerRuntime
+
+
+def led(red, initialize=False, code="main"):
+    return {
+        "type": "led",
+        "code": code,
+        "initialize": initialize,
+        "mode": "solid",
+        "red": red,
+        "green": 0,
+        "blue": 0,
+    }
+
+
+class SlowConsumer(Consumer):
+    def __init__(self) -> None:
+        self.gate = threading.Event()
+        self.calls = []
+
+    def consume(self, events):
+        self.gate.wait(1)
+        self.calls.append(list(events))
+
+
+class AsyncConsumerTest(unittest.TestCase):
+    def setUp(self):
+        self.inner = SlowConsumer()
+        self.c = AsyncConsumer(self.inner, maxsize=2)
+        self.c.start()
+
+    def tearDown(self):
+        self.inner.gate.set()
+        self.c.close()
+
+    def test_keeps_latest_state(self):
+        # Blocks the worker on the first write, so the rest queue up
+        self.c.consume([led(1)])
+        time.sleep(0.05)
+        self.c.consume([led(2, initialize=True)])
+        self.c.consume([led(3), {"type": "axis", "code": "ls_x", "value": 0}])
+
+        self.assertEqual(self.c.stats().depth, 1)
+        self.inner.gate.set()
+        self.c.close()
+
+        self.assertEqual(len(self.inner.calls), 2)
+        (ev,) = self.inner.calls[1]
+        self.assertEqual(ev["red"], 3)
+        self.assertTrue(ev["initialize"])
+        st = self.c.stats()
+        self.assertEqual((st.coalesced, st.processed), (1, 2))
+
+    def test_drops_oldest_when_full(self):
+        self.c.consume([led(1)])
+        time.sleep(0.05)
+        self.c.consume([led(2, code="left"), led(3, code="right")])
+        self.c.consume([{"type": "rumble", "code": "main", "weak_magnitude": 1}])
+
+        st = self.c.stats()
+        self.assertEqual((st.depth, st.max_depth, st.dropped), (2, 2, 1))
+        self.inner.gate.set()
+        self.c.close()
+
+        codes = [ev["code"] for ev in self.inner.calls[1]]
+        self.assertEqual(codes, ["right", "main"])
+
+    def test_close_waits_for_the_worker(self):
+        self.c.consume([led(1)])
+        time.sleep(0.05)
+        threading.Timer(0.1, self.inner.gate.set).start()
+
+        with patch.object(runtime, "ASYNC_JOIN_TIMEOUT", 0.01):
+            self.c.close()
+
+        self.assertEqual(len(self.inner.calls), 1)
+
+    def test_runtime_stops_async_consumers(self):
+        rt = ControllerRuntime()
+        rt.attach_async(self.inner, types=("rumble",))
+        self.inner.gate.set()
+
+        rt.consume([{"type": "rumble", "code": "main", "weak_magnitude": 1}])
+        rt.close(True)
+
+        self.assertEqual(len(self.inner.calls), 1)
+        self.assertEqual(rt.consumers, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+
+from hhd.contrib.bench import CASES, Bench, Result, compare, measure
+
+
+class BenchTest(unittest.TestCase):
+    def test_cases_run(self):
+        for name in CASES:
+            with self.subTest(name):
+                r = measure(name, 20, 1000)
+                self.assertGreater(r.ns_op, 0)
+                self.assertGreaterEqual(r.bytes_op, 0)
+
+    def test_counts_retained_allocations(self):
+        kept = []
+        CASES["test.retain"] = lambda: Bench(lambda: kept.append(bytes(1000)))
+        try:
+            r = measure("test.retain", 200, 1000)
+        finally:
+            del CASES["test.retain"]
+
+        # The object header and list growth add to it
+        self.assertAlmostEqual(r.bytes_op, 1000, delta=200)
+        self.assertAlmostEqual(r.blocks_op, 1, delta=0.2)
+        self.assertGreaterEqual(r.peak_op, 1000)
+
+    def test_compare(self):
+        results = [Result(n, ns, 0, 0, 0, 0) for n, ns in (("a", 130), ("b", 110))]
+        baseline = {"a": 100, "b": 100}
+
+        self.assertEqual(compare(results, baseline, 1.25), ["a"])
+        self.assertEqual(compare(results, baseline, 1.05), ["a", "b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
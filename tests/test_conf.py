@@ -0,0 +1,108 @@
+import unittest
+from copy import deepcopy
+
+from hhd.plugins.conf import Config, keys_overlap, parse_confs
+
+
+class ConfigTest(unittest.TestCase):
+    def setUp(self):
+        self.conf = Config(
+            [{"tdp": {"mode": "smart", "smart": {"tdp": 15}}, "rgb.enabled": True}]
+        )
+
+    def test_matches_parse_confs(self):
+        confs = [
+            {"a.b": 1, "a": {"c": [1, 2]}, "d": 3},
+            {"a": {"g.e": 2}, "d": {"f": 4}},
+            {"a.c": "x"},
+        ]
+        expected = parse_confs(deepcopy(confs))
+
+        self.assertEqual(Config(confs).conf, expected)
+        c = Config()
+        for conf in confs:
+            c.update(conf)
+        self.assertEqual(c.conf, expected)
+
+    def test_write_detects_changes(self):
+        self.conf.updated = False
+        self.conf["tdp.smart.tdp"] = 15
+        self.conf["tdp"] = {"mode": "smart"}
+        self.assertFalse(self.conf.updated)
+
+        self.conf["tdp.smart"] = {"tdp": 20, "boost": True}
+        self.assertTrue(self.conf.updated)
+        self.assertEqual(
+            self.conf["tdp"].conf,
+            {"mode": "smart", "smart": {"tdp": 20, "boost": True}},
+        )
+
+    def test_copies_share_structure(self):
+        copy = self.conf.copy()
+        rgb = self.conf["rgb"]
+        self.conf["tdp.smart.tdp"] = 20
+
+        self.assertEqual(copy.get("tdp.smart.tdp", 0), 15)
+        self.assertEqual(self.conf.get("tdp.smart.tdp", 0), 20)
+        # Branches that were not written to are not copied
+        self.assertIs(self.conf._conf["rgb"], copy._conf["rgb"])
+        self.assertIs(rgb._conf, copy._conf["rgb"])
+        self.assertEqual(copy.diff(self.conf), {"tdp.smart.tdp"})
+
+    def test_subtree_writes_do_not_leak(self):
+        tdp = self.conf["tdp"]
+        tdp["mode"] = "manual"
+        del self.conf["tdp.smart"]
+
+        self.assertEqual(self.conf["tdp"].conf, {"mode": "smart"})
+        self.assertEqual(tdp.get("smart.tdp", 0), 15)
+
+    def test_returned_values_are_copies(self):
+        self.conf["list"] = vals = [1, 2]
+        vals.append(3)
+        out = self.conf.conf
+        out["tdp"]["mode"] = "manual"
+        out["list"].append(4)
+
+        self.assertEqual(self.conf.get("tdp.mode", ""), "smart")
+        self.assertEqual(self.conf.get("list", []), [1, 2])
+
+    def test_view(self):
+        tdp = self.conf.view("tdp")
+        smart = tdp.view("smart")
+
+        self.assertEqual(tdp["mode"].to(str), "smart")
+        self.assertEqual(smart.get("tdp", 0), 15)
+        self.assertNotIn("boost", smart)
+
+        smart["boost"] = True
+        self.conf["tdp.smart.tdp"] = 20
+        self.assertTrue(self.conf.get("tdp.smart.boost", False))
+        self.assertEqual(smart.get("tdp", 0), 20)
+        self.assertEqual(tdp.get("missing.key", "x"), "x")
+
+    def test_index_follows_writes(self):
+        self.assertEqual(self.conf.get("tdp.smart.tdp", 0), 15)
+        self.assertIn(("tdp", "smart", "tdp"), self.conf._index)
+
+        self.conf.update({"tdp.smart.tdp": 10})
+        self.assertEqual(self.conf.get("tdp.smart.tdp", 0), 10)
+        del self.conf["tdp.smart"]
+        self.assertNotIn("tdp.smart.tdp", self.conf)
+        self.assertEqual(self.conf.get("tdp.smart.tdp", 0), 0)
+
+    def test_changed_keys_per_loop(self):
+        last = self.conf.copy()
+        self.conf["tdp.smart.tdp"] = 15
+        self.conf["rgb.enabled"] = False
+        changed = last.diff(self.conf)
+
+        self.assertEqual(changed, {"rgb.enabled"})
+        self.assertTrue(keys_overlap(changed, ["rgb"]))
+        self.assertFalse(keys_overlap(changed, ["tdp", "rgb.mode", "rgbx"]))
+        # Replacing a parent affects the keys below it
+        self.assertTrue(keys_overlap(["controllers"], ["controllers.legion_go"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
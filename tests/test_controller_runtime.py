@@ -0,0 +1,140 @@
+import os
+import time
+import unittest
+from unittest.mock import Mock
+
+from hhd.controller import Consumer, ControllerRuntime, Producer
+from hhd.controller.physical.evdev import META_DELAY, GenericGamepadEvdev
+
+
+class PipeProducer(Producer):
+    def __init__(self, code):
+        self.code = code
+        self.calls = 0
+        self.closed = None
+
+    def open(self):
+        self.r, self.w = os.pipe()
+        return [self.r]
+
+    def produce(self, fds):
+        self.calls += 1
+        if self.r not in fds:
+            return []
+        os.read(self.r, 64)
+        return [{"type": "button", "code": self.code, "value": True}]
+
+    def close(self, exit):
+        self.closed = exit
+        os.close(self.r)
+        os.close(self.w)
+        return True
+
+
+class TimedProducer(PipeProducer):
+    def __init__(self, code):
+        super().__init__(code)
+        self.deadline = None
+
+    def next_deadline(self):
+        return self.deadline
+
+
+class RecordingConsumer(Consumer):
+    def __init__(self):
+        self.frames = []
+
+    def consume(self, events):
+        self.frames.append(list(events))
+
+
+class ControllerRuntimeTest(unittest.TestCase):
+    def setUp(self):
+        self.rt = ControllerRuntime(report_freq_min=100, report_freq_max=1000)
+        self.a = PipeProducer("a")
+        self.b = PipeProducer("b")
+        self.rt.prepare(self.a)
+        self.rt.prepare(self.b)
+
+    def tearDown(self):
+        if self.rt.devs:
+            self.rt.close(True)
+
+    def test_dispatches_only_ready_producers(self):
+        os.write(self.b.w, b"x")
+
+        evs = self.rt.produce(self.rt.wait())
+
+        self.assertEqual(evs, [{"type": "button", "code": "b", "value": True}])
+        self.assertEqual(self.a.calls, 0)
+        self.assertEqual(self.b.calls, 1)
+
+    def test_always_produce_runs_on_timeout(self):
+        self.rt.always_produce(self.a)
+
+        evs = self.rt.produce(self.rt.wait(0))
+
+        self.assertEqual(evs, [])
+        self.assertEqual(self.a.calls, 1)
+        self.assertEqual(self.b.calls, 0)
+
+    def test_consumers_fan_out(self):
+        inputs = RecordingConsumer()
+        outputs = RecordingConsumer()
+        self.rt.attach(inputs)
+        self.rt.attach(outputs, always=True)
+
+        self.rt.step()
+        os.write(self.a.w, b"x")
+        self.rt.step()
+
+        self.assertEqual(len(inputs.frames), 1)
+        self.assertEqual(outputs.frames[0], [])
+        self.assertEqual(outputs.frames[1][0]["code"], "a")
+
+    def test_deadlines_wake_up_the_loop(self):
+        timed = TimedProducer("t")
+        self.rt.prepare(timed)
+        self.rt.epoll = Mock(wraps=self.rt.epoll)
+
+        timed.deadline = time.perf_counter() + 0.005
+        self.rt.produce(self.rt.wait())
+
+        self.assertLessEqual(self.rt.epoll.poll.call_args.args[0], 0.005)
+        self.assertEqual(timed.calls, 1)
+        self.assertEqual(self.a.calls, 0)
+
+        timed.deadline = None
+        self.rt.produce(self.rt.wait(0))
+        self.assertEqual(timed.calls, 1)
+
+    def test_watched_deadlines_are_not_run(self):
+        timed = TimedProducer("t")
+        timed.open()
+        self.rt.watch(timed)
+
+        timed.deadline = time.perf_counter()
+        self.rt.produce(self.rt.wait())
+
+        self.assertEqual(timed.calls, 0)
+        timed.close(True)
+
+    def test_evdev_reports_delayed_meta(self):
+        d = GenericGamepadEvdev([], [])
+        self.assertIsNone(d.next_deadline())
+
+        d.start_pressed = time.time()
+        self.assertAlmostEqual(
+            d.next_deadline() or 0, time.perf_counter() + META_DELAY, delta=0.01
+        )
+
+    def test_close_closes_producers(self):
+        self.rt.close(False)
+
+        self.assertIs(self.a.closed, False)
+        self.assertIs(self.b.closed, False)
+        self.assertEqual(self.rt.devs, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+import errno
+import os
+import socket
+import tempfile
+import unittest
+from threading import Event, Thread
+from unittest.mock import patch
+
+from hhd.controller.lib import registry
+from hhd.controller.lib.registry import DeviceRegistry, parse_uevent
+
+
+class DeviceRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.sysfs = self.tmp.name
+        self.patcher = patch.object(registry, "SYSFS_DIR", self.sysfs)
+        self.patcher.start()
+
+        # inputN holds the IDs, eventN is a child
+        self.input = "/devices/virtual/input/input5"
+        self.write(
+            self.input,
+            'PRODUCT=3/45e/28e/110\nNAME="Microsoft X-Box 360 pad"\n',
+        )
+        self.event = self.input + "/event5"
+        self.write(self.event, "MAJOR=13\nMINOR=69\nDEVNAME=input/event5\n")
+        os.symlink(self.sysfs + self.input, self.sysfs + self.event + "/device")
+
+        self.reg = DeviceRegistry()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.tmp.cleanup()
+
+    def write(self, devpath, uevent):
+        os.makedirs(self.sysfs + devpath, exist_ok=True)
+        with open(self.sysfs + devpath + "/uevent", "w") as f:
+            f.write(uevent)
+
+    def add(self, devpath, subsystem="input"):
+        self.reg.process({"ACTION": "add", "DEVPATH": devpath, "SUBSYSTEM": subsystem})
+
+    def test_read_entry(self):
+        entry = registry.read_entry("input", self.event)
+
+        assert entry
+        self.assertEqual(entry.devname, "input/event5")
+        self.assertEqual((entry.vid, entry.pid), (0x045E, 0x028E))
+        self.assertEqual(entry.name, "Microsoft X-Box 360 pad")
+
+    def test_parse_uevent(self):
+        ev = parse_uevent(
+            b"add@/devices/virtual/input/input5\0ACTION=add\0"
+            b"DEVPATH=/devices/virtual/input/input5\0SUBSYSTEM=input\0SEQNUM=42\0"
+        )
+
+        assert ev
+        self.assertEqual(ev["ACTION"], "add")
+        self.assertEqual(ev["SUBSYSTEM"], "input")
+        self.assertIsNone(parse_uevent(b"libudev\0\xfe\xed"))
+
+    def test_matching_device_wakes_subscription(self):
+        xbox = self.reg.subscribe(subsystems=["input"], vid=[0x045E])
+        other = self.reg.subscribe(vid=[0x17EF])
+
+        self.add(self.event)
+
+        self.assertTrue(xbox.event.is_set())
+        self.assertFalse(other.event.is_set())
+        self.assertEqual([d.devpath for d in xbox.find()], [self.event])
+
+        xbox.close()
+        other.close()
+
+    def test_remove_updates_index(self):
+        self.add(self.event)
+        self.reg.process(
+            {"ACTION": "remove", "DEVPATH": self.event, "SUBSYSTEM": "input"}
+        )
+
+        self.assertNotIn(self.event, self.reg.index)
+
+    def test_wait_polls_without_socket(self):
+        sub = registry.Subscription(self.reg, [], [], [], [])
+
+        # Not live, so the timeout is capped to the poll delay
+        self.assertFalse(sub.wait(10))
+
+    def test_restarts_after_socket_failure(self):
+        class BrokenSocket:
+            def recv(self, size):
+                raise OSError("No buffer space available")
+
+            def close(self):
+                pass
+
+        sock = BrokenSocket()
+        stop = Event()
+        self.reg.sock, self.reg.stop, self.reg.live = sock, stop, True
+        self.reg._loop(sock, stop)  # type: ignore
+
+        self.assertFalse(self.reg.live)
+        with patch.object(self.reg, "_start") as start:
+            self.reg.subscribe(vid=[0x045E]).close()
+        start.assert_called_once()
+
+    def test_rescans_after_socket_overflow(self):
+        reg = self.reg
+        os.makedirs(self.sysfs + "/class/input")
+        os.symlink(self.sysfs + self.event, self.sysfs + "/class/input/event5")
+        sub = registry.Subscription(reg, [], [0x045E], [], [])
+        reg.subs.append(sub)
+
+        class OverflowSocket:
+            calls = 0
+
+            def recv(self, size):
+                self.calls += 1
+                if self.calls == 1:
+                    raise OSError(errno.ENOBUFS, "No buffer space available")
+                stop.set()
+                raise socket.timeout()
+
+            def close(self):
+                pass
+
+        sock = OverflowSocket()
+        stop = Event()
+        reg.sock, reg.stop, reg.live = sock, stop, True
+        reg._loop(sock, stop)  # type: ignore
+
+        self.assertIn(self.event, reg.index)
+        self.assertTrue(sub.event.is_set())
+        self.assertEqual(sock.calls, 2)
+
+    def test_exit_wakes_up_wait(self):
+        sub = registry.Subscription(self.reg, [], [], [], [])
+        self.reg.subs.append(sub)
+        self.reg.live = True
+        should_exit = Event()
+        out = []
+
+        t = Thread(target=lambda: out.append(sub.wait(10, should_exit)))
+        t.start()
+        while sub.should_exit is None:
+            pass
+        should_exit.set()
+        self.reg.check_exit()
+        t.join(1)
+
+        self.assertEqual(out, [False])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+import unittest
+from unittest.mock import patch
+
+from hhd.controller.lib.common import AM, BM, encode_axis, set_button
+from hhd.controller.lib.codec import compile_axis_encoder, compile_button_encoder
+from hhd.controller.virtual import dualsense
+from hhd.controller.virtual.dualsense import Dualsense
+from hhd.controller.virtual.dualsense.const import (
+    DS5_EDGE_DELTA_TIME_NS,
+    DS5_INPUT_REPORT_BT_OFS as OFS,
+    DS5_BT_AXIS_MAP,
+    DS5_BT_BTN_MAP,
+)
+
+
+class FakeUhid:
+    def __init__(self, **_) -> None:
+        self.fd = 5
+        self.reports = []
+
+    def open(self):
+        return self.fd
+
+    def send_input_report(self, rep):
+        self.reports.append(bytes(rep))
+
+
+class EncoderTest(unittest.TestCase):
+    def test_axis_matches_encode_axis(self):
+        for m in (
+            AM(8, "m8"),
+            AM(8, "u8", flipped=True),
+            AM(8, "i16", "big", scale=20 * 180 / 3.14),
+            AM(8, "i16", scale=1019, bounds=(-(2**15) + 2, 2**15 - 1)),
+            AM(8, "u32"),
+        ):
+            for val in (-1, -0.3, 0, 0.25, 0.99):
+                a = bytearray(8)
+                b = bytearray(8)
+                try:
+                    encode_axis(a, m, val)
+                except OverflowError:
+                    with self.assertRaises(OverflowError):
+                        compile_axis_encoder(b, m)(val)
+                    continue
+                compile_axis_encoder(b, m)(val)
+                self.assertEqual(a, b, (m, val))
+
+    def test_overflow_keeps_value(self):
+        buf = bytearray(2)
+        enc = compile_axis_encoder(buf, AM(0, "i16", scale=1000))
+
+        enc(1)
+        with self.assertRaises(OverflowError):
+            enc(100)
+        self.assertEqual(buf, (1000).to_bytes(2, "little"))
+
+    def test_button_matches_set_button(self):
+        for m in (BM(3), BM(12, flipped=True)):
+            for val in (True, False):
+                a = bytearray(b"\x55\xaa")
+                b = bytearray(b"\x55\xaa")
+                set_button(a, m, val)
+                compile_button_encoder(b, m)(val)
+                self.assertEqual(a, b)
+
+
+class DualsenseConsumeTest(unittest.TestCase):
+    def setUp(self):
+        self.patcher = patch.object(dualsense, "UhidDevice", FakeUhid)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def open(self, **kwargs):
+        d = Dualsense(**kwargs)
+        d.open()
+        return d
+
+    def test_report_is_updated_in_place(self):
+        d = self.open(sync_gyro=True)
+        rep = d.report
+        assert rep
+
+        d.consume(
+            [
+                {"type": "axis", "code": "ls_x", "value": 1},
+                {"type": "axis", "code": "gyro_z", "value": 0.5},
+                {"type": "button", "code": "a", "value": True},
+            ]
+        )
+        # No timestamp, so nothing is sent
+        self.assertEqual(d.dev.reports, [])  # type: ignore
+
+        d.consume(
+            [{"type": "axis", "code": "imu_ts", "value": 3 * DS5_EDGE_DELTA_TIME_NS}]
+        )
+
+        self.assertIs(d.report, rep)
+        (sent,) = d.dev.reports  # type: ignore
+        self.assertEqual(sent[OFS], 0xFE)
+        # flip_z is on by default
+        gz = AM(DS5_BT_AXIS_MAP["gyro_z"].loc, "i16", scale=20 * 180 / 3.14)
+        expected = bytearray(2 + (gz.loc >> 3))
+        encode_axis(expected, gz, -0.5)
+        self.assertEqual(sent[gz.loc >> 3 : (gz.loc >> 3) + 2], expected[-2:])
+        self.assertEqual(int.from_bytes(sent[OFS + 27 : OFS + 31], "little"), 3)
+        a = DS5_BT_BTN_MAP["a"].loc
+        self.assertTrue(sent[a >> 3] & (1 << (7 - (a & 7))))
+
+    def test_left_motion(self):
+        d = self.open(left_motion=True)
+        rep = bytes(d.report)  # type: ignore
+
+        d.consume(
+            [
+                {"type": "axis", "code": "ls_x", "value": 1},
+                {"type": "axis", "code": "gyro_x", "value": 1},
+                {"type": "button", "code": "a", "value": True},
+            ]
+        )
+        # Only the sequence number and crc changed
+        changed = [i for i, (a, b) in enumerate(zip(rep, d.report)) if a != b]  # type: ignore
+        self.assertEqual(changed[0], OFS + 6)
+        self.assertTrue(all(i >= len(rep) - 4 for i in changed[1:]))
+
+        d.consume([{"type": "axis", "code": "left_gyro_x", "value": 1}])
+        self.assertNotEqual(d.report[OFS + 15 : OFS + 17], b"\0\0")  # type: ignore
+
+    def test_paddles_to_clicks(self):
+        d = self.open(paddles_to_clicks="top")
+
+        d.consume([{"type": "button", "code": "extra_l1", "value": True}])
+
+        rep = d.report
+        assert rep
+        left = DS5_BT_BTN_MAP["touchpad_left"].loc
+        touch = DS5_BT_BTN_MAP["touchpad_touch"].loc
+        l1 = DS5_BT_BTN_MAP["extra_l1"].loc
+        self.assertEqual(rep[OFS + 33 : OFS + 36], b"\x80\x01\x20")
+        self.assertTrue(rep[left >> 3] & (1 << (7 - (left & 7))))
+        # Touch is flipped, so it is cleared when touching
+        self.assertFalse(rep[touch >> 3] & (1 << (7 - (touch & 7))))
+        self.assertFalse(rep[l1 >> 3] & (1 << (7 - (l1 & 7))))
+
+
+if __name__ == "__main__":
+    unittest.main()
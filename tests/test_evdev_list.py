@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+
+from hhd.controller.physical.evdev import list_evs
+
+PAD = """\
+I: Bus=0003 Vendor=045e Product=028e Version=0110
+N: Name="Microsoft X-Box 360 pad"
+P: Phys=usb-0000:00:14.0-1/input0
+S: Sysfs=/devices/pci0000:00/0000:00:14.0/usb1/1-1/1-1:1.0/input/input5
+U: Uniq=
+H: Handlers=event5 js0
+B: EV=20000b
+B: KEY=7cdb000000000000 0 0 0 0
+B: ABS=3003f
+"""
+
+KBD = """\
+I: Bus=0011 Vendor=0001 Product=0001 Version=ab83
+N: Name="AT Translated Set 2 keyboard"
+P: Phys=isa0060/serio0/input0
+S: Sysfs=/devices/platform/i8042/serio0/input/input0
+U: Uniq=
+H: Handlers=sysrq kbd event0 leds
+B: EV=120013
+"""
+
+
+class ListEvsTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.fn = os.path.join(self.tmp.name, "devices")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, *devs):
+        with open(self.fn, "w") as f:
+            f.write("\n".join(devs) + "\n")
+
+    def test_parse(self):
+        self.write(KBD, PAD)
+
+        devs = list_evs(fn=self.fn)
+
+        self.assertEqual(list(devs), ["/dev/input/event0", "/dev/input/event5"])
+        pad = devs["/dev/input/event5"]
+        self.assertEqual((pad["vendor"], pad["product"]), (0x045E, 0x028E))
+        self.assertEqual(pad["name"], "Microsoft X-Box 360 pad")
+        self.assertEqual(pad["byte"]["abs"], bytes([0x3F, 0, 0x03]) + bytes(5))
+        self.assertEqual(len(pad["byte"]["key"]), 40)
+
+    def test_cached_table_is_shared_and_read_only(self):
+        self.write(KBD, PAD)
+
+        first = list_evs(fn=self.fn)
+        second = list_evs(fn=self.fn)
+
+        self.assertIs(first, second)
+        with self.assertRaises(TypeError):
+            first["/dev/input/event5"]["name"] = "test"  # type: ignore
+
+    def test_only_changed_devices_are_parsed(self):
+        self.write(KBD, PAD)
+        before = list_evs(fn=self.fn)
+
+        self.write(KBD, PAD.replace("event5 js0", "event6 js0"))
+        after = list_evs(fn=self.fn)
+
+        self.assertIs(after["/dev/input/event0"], before["/dev/input/event0"])
+        self.assertNotIn("/dev/input/event5", after)
+        self.assertEqual(after["/dev/input/event6"]["product"], 0x028E)
+
+    def test_filter_valid(self):
+        self.write(KBD, PAD)
+
+        # The event nodes do not exist here
+        self.assertEqual(len(list_evs(filter_valid=True, fn=self.fn)), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
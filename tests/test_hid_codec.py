@@ -0,0 +1,142 @@
+import random
+import unittest
+
+from hhd.controller.lib.codec import ReportDecoder, compile_decoders
+from hhd.controller.lib.common import (
+    AM,
+    BM,
+    CM,
+    decode_axis,
+    decode_config,
+    get_button,
+)
+
+BTN_MAP = {
+    "a": BM(3 << 3),
+    "b": BM((3 << 3) + 1),
+    "x": BM((3 << 3) + 7, flipped=True),
+    "extra_l1": BM(63 << 3),
+}
+
+AXIS_MAP = {
+    "ls_x": AM(14 << 3, "m8"),
+    "ls_y": AM(15 << 3, "m8", flipped=True),
+    "rt": AM(22 << 3, "u8"),
+    "left_imu_ts": AM(34 << 3, "u8", scale=1),
+    "accel_x": AM(35 << 3, "i16", scale=-0.00212, order="big"),
+    "gyro_x": AM(37 << 3, "i16", scale=0.001065, order="big"),
+    "touchpad_x": AM(40 << 3, "u16"),
+    "touchpad_y": AM(42 << 3, "m16", order="big"),
+    "rs_x": AM(44 << 3, "i32"),
+    "rs_y": AM(48 << 3, "u32", order="big"),
+    "hat_x": AM(52 << 3, "m32", offset=0.5),
+    "lt": AM(56 << 3, "i8"),
+}
+
+CONFIG_MAP = {
+    "battery": CM(5 << 3, "u8", scale=1, bounds=(0, 100)),
+    "is_attached": CM((10 << 3) + 7, "bit"),
+    "is_connected": CM((10 << 3) + 6, "bit", flipped=True),
+    "battery_left": CM(36 << 3, "u8"),
+}
+
+
+class ReportDecoderTest(unittest.TestCase):
+    def reference(self, rep):
+        return (
+            [get_button(rep, m) for m in BTN_MAP.values()]
+            + [decode_axis(rep, m) for m in AXIS_MAP.values()]
+            + [decode_config(rep, m) for m in CONFIG_MAP.values()]
+        )
+
+    def test_matches_reference_decoders(self):
+        dec = ReportDecoder(BTN_MAP, AXIS_MAP, CONFIG_MAP)
+        rng = random.Random(1234)
+        for _ in range(200):
+            rep = bytes(rng.getrandbits(8) for _ in range(64))
+            self.assertEqual(dec.decode(rep), self.reference(rep))
+            self.assertEqual(dec.decode(memoryview(rep)), self.reference(rep))
+
+    def test_short_report_falls_back(self):
+        dec = ReportDecoder(BTN_MAP, AXIS_MAP, CONFIG_MAP)
+        rep = bytes(range(20))
+
+        self.assertEqual(dec.decode(rep), self.reference(rep))
+
+    def test_overlapping_fields_use_separate_structs(self):
+        dec = ReportDecoder(
+            {},
+            {
+                "ls_x": AM(2 << 3, "u16"),
+                "ls_y": AM(3 << 3, "u16"),
+                "rs_x": AM(6 << 3, "i16", order="big"),
+            },
+        )
+        rep = bytes([0, 0, 1, 2, 3, 0, 4, 5])
+
+        self.assertEqual(len(dec.structs), 3)
+        self.assertEqual(
+            dec.decode(rep),
+            [
+                decode_axis(rep, AM(2 << 3, "u16")),
+                decode_axis(rep, AM(3 << 3, "u16")),
+                decode_axis(rep, AM(6 << 3, "i16", order="big")),
+            ],
+        )
+
+    def test_decode_changed_only_returns_changed_fields(self):
+        dec = ReportDecoder(BTN_MAP, AXIS_MAP, CONFIG_MAP)
+        rep = bytearray(64)
+
+        first = dec.decode_changed(rep)
+        self.assertEqual([v for _, v in first], self.reference(rep))
+
+        rep[3] |= 0x80  # a
+        rep[38] = 0x10  # low byte of gyro_x
+        rep[60] = 0xFF  # unmapped
+        changed = dec.decode_changed(rep)
+
+        codes = (*BTN_MAP, *AXIS_MAP, *CONFIG_MAP)
+        self.assertEqual([codes[i] for i, _ in changed], ["a", "gyro_x"])
+        ref = self.reference(rep)
+        for idx, val in changed:
+            self.assertEqual(val, ref[idx])
+        self.assertEqual(dec.decode_changed(rep), [])
+
+    def test_decode_changed_matches_full_decode(self):
+        dec = ReportDecoder(BTN_MAP, AXIS_MAP, CONFIG_MAP)
+        rng = random.Random(4321)
+        state = None
+        rep = bytearray(64)
+        for _ in range(200):
+            for _ in range(rng.randint(0, 4)):
+                rep[rng.randrange(64)] = rng.getrandbits(8)
+            changed = dec.decode_changed(rep)
+            if state is None:
+                state = [v for _, v in changed]
+            for idx, val in changed:
+                state[idx] = val
+            self.assertEqual(state, self.reference(rep))
+
+    def test_decode_changed_with_reused_buffer(self):
+        dec = ReportDecoder(BTN_MAP, AXIS_MAP, CONFIG_MAP)
+        buf = bytearray(128)
+        view = memoryview(buf)
+
+        dec.decode_changed(view[:64])
+        buf[3] = 0x80
+        changed = dec.decode_changed(view[:64])
+
+        self.assertEqual(changed, [(0, True)])
+        self.assertEqual(dec.decode_changed(view[:64]), [])
+
+    def test_compile_per_report_id(self):
+        decs = compile_decoders({1: BTN_MAP}, {2: AXIS_MAP}, {})
+
+        self.assertEqual(decs[1].btn_codes, tuple(BTN_MAP))
+        self.assertEqual(decs[1].axis_codes, ())
+        self.assertEqual(decs[2].axis_codes, tuple(AXIS_MAP))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from hhd.controller.lib import hid
+
+# Usage Page (Generic Desktop), Usage (Game Pad), Collection (Application),
+#   Usage (Pointer), Collection (Physical), End Collection,
+# End Collection,
+# Usage Page (Vendor 0xFFA0), Usage (0x01), Collection (Application),
+#   Input, End Collection
+GAMEPAD_DESC = bytes.fromhex(
+    "05 01 09 05 a1 01 09 01 a1 00 c0 c0 06 a0 ff 09 01 a1 01 81 02 c0"
+)
+
+
+class HidUsagesTest(unittest.TestCase):
+    def test_top_level_collections(self):
+        self.assertEqual(
+            hid.get_usages(GAMEPAD_DESC), [(0x0001, 0x0005), (0xFFA0, 0x0001)]
+        )
+
+    def test_extended_usage(self):
+        # Usage (0xFF00:0x0002), Collection (Application), End Collection
+        desc = bytes.fromhex("0b 02 00 00 ff a1 01 c0")
+        self.assertEqual(hid.get_usages(desc), [(0xFF00, 0x0002)])
+
+    def test_no_collection_uses_first_usage(self):
+        self.assertEqual(hid.get_usages(bytes.fromhex("05 0c 09 01 81 02")), [(12, 1)])
+
+    def test_truncated_descriptor(self):
+        self.assertEqual(hid.get_usages(bytes.fromhex("05 01 09 05 a1")), [(1, 5)])
+
+
+class HidEnumerateTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = self.tmp.name
+        self.hidraw = os.path.join(root, "class", "hidraw")
+        os.makedirs(self.hidraw)
+
+        # USB device, interface, and HID device
+        usb = os.path.join(root, "devices", "usb1", "1-1")
+        intf = os.path.join(usb, "1-1:1.2")
+        dev = os.path.join(intf, "0003:17EF:6182.0001")
+        os.makedirs(dev)
+        self.write(usb, "idVendor", "17ef\n")
+        self.write(usb, "manufacturer", "Lenovo\n")
+        self.write(usb, "product", "Legion Controller\n")
+        self.write(usb, "bcdDevice", "0102\n")
+        self.write(intf, "bInterfaceNumber", "02\n")
+        self.write(
+            dev,
+            "uevent",
+            "HID_ID=0003:000017EF:00006182\nHID_NAME=Lenovo Legion Controller\nHID_UNIQ=\n",
+        )
+        self.write(dev, "report_descriptor", GAMEPAD_DESC, "wb")
+        os.makedirs(os.path.join(self.hidraw, "hidraw1"))
+        os.symlink(dev, os.path.join(self.hidraw, "hidraw1", "device"))
+
+        # Bluetooth device, no USB parent
+        bt = os.path.join(self.hidraw, "hidraw0", "device")
+        os.makedirs(bt)
+        self.write(
+            bt,
+            "uevent",
+            "HID_ID=0005:0000054C:00000CE6\nHID_NAME=DualSense Wireless Controller\nHID_UNIQ=aa:bb\n",
+        )
+        self.write(bt, "report_descriptor", bytes.fromhex("05 01 09 05 a1 01 c0"), "wb")
+
+        # Virtual device, skipped
+        virt = os.path.join(self.hidraw, "hidraw2", "device")
+        os.makedirs(virt)
+        self.write(virt, "uevent", "HID_ID=0006:00001234:00005678\nHID_NAME=Virtual\n")
+
+        self.patcher = patch.object(hid, "HIDRAW_DIR", self.hidraw)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.tmp.cleanup()
+
+    def write(self, dir, name, data, mode="w"):
+        with open(os.path.join(dir, name), mode) as f:
+            f.write(data)
+
+    def test_enumerate(self):
+        devs = hid.enumerate()
+
+        self.assertEqual(
+            [d["path"] for d in devs], [b"/dev/hidraw0"] + 2 * [b"/dev/hidraw1"]
+        )
+        bt, pad, vendor = devs
+        self.assertEqual(bt["vendor_id"], 0x054C)
+        self.assertEqual(bt["manufacturer_string"], "")
+        self.assertEqual(bt["product_string"], "DualSense Wireless Controller")
+        self.assertEqual(bt["serial_number"], "aa:bb")
+        self.assertEqual(bt["interface_number"], -1)
+        self.assertEqual(pad["manufacturer_string"], "Lenovo")
+        self.assertEqual(pad["product_string"], "Legion Controller")
+        self.assertEqual(pad["release_number"], 0x0102)
+        self.assertEqual(pad["interface_number"], 2)
+        self.assertEqual((pad["usage_page"], pad["usage"]), (0x01, 0x05))
+        self.assertEqual((vendor["usage_page"], vendor["usage"]), (0xFFA0, 0x01))
+
+    def test_missing_usb_strings(self):
+        usb = os.path.join(self.tmp.name, "devices", "usb1", "1-1")
+        os.remove(os.path.join(usb, "manufacturer"))
+        os.remove(os.path.join(usb, "product"))
+
+        pad = hid.enumerate(vid=0x17EF)[0]
+
+        self.assertEqual(pad["manufacturer_string"], "")
+        self.assertEqual(pad["product_string"], "")
+
+    def test_enumerate_filters(self):
+        self.assertEqual(len(hid.enumerate(vid=0x17EF)), 2)
+        self.assertEqual(hid.enumerate(vid=0x17EF, pid=0x1234), [])
+
+    def test_enumerate_unique(self):
+        devs = hid.enumerate_unique(usage_page=0xFFA0)
+
+        self.assertEqual(len(devs), 1)
+        self.assertEqual(devs[0]["usage"], 0x01)
+
+
+class HidDeviceTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.fn = os.path.join(self.tmp.name, "hidraw0")
+        os.mkfifo(self.fn)
+        self.dev = hid.Device(path=self.fn)
+
+    def tearDown(self):
+        self.dev.close()
+        self.tmp.cleanup()
+
+    def test_read_write(self):
+        self.dev.write(b"\x01\x02\x03")
+
+        buf = bytearray(8)
+        self.assertEqual(self.dev.readinto(buf), 3)
+        self.assertEqual(buf[:3], b"\x01\x02\x03")
+        self.assertEqual(self.dev.read(timeout=0), b"")
+
+    def test_closed(self):
+        self.dev.close()
+
+        self.assertEqual(self.dev.fd, 0)
+        with self.assertRaises(hid.HIDException):
+            self.dev.read()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import struct
+import unittest
+
+from hhd.controller.physical.imu import (
+    DeviceInfo,
+    IioReader,
+    ScanElement,
+    get_size,
+    get_struct,
+)
+
+
+def se(axis, bits, signed=True, endianness="little", scale=1.0):
+    return ScanElement(axis, endianness, signed, bits, bits, 0, scale, 0, None)
+
+
+# 3x s16 gyro, u16 unused, s64 timestamp aligned to 8 bytes
+DEV = DeviceInfo(
+    "",
+    (
+        se("gyro_x", 16, scale=2),
+        se("gyro_y", 16),
+        se("gyro_z", 16),
+        se(None, 16, signed=False),
+        se("imu_ts", 64),
+    ),
+    "",
+)
+
+
+def scan(x, y, z, ts):
+    return struct.pack("<hhh2xq", x, y, z, ts)
+
+
+class IioReaderTest(unittest.TestCase):
+    def setUp(self):
+        self.r, self.w = os.pipe()
+        self.reader = IioReader([], [], None, None, {}, batch=4)
+        # Mirror `open` without touching sysfs
+        self.reader.dev = DEV
+        self.reader.fd = self.r
+        self.reader.size = get_size(DEV)
+        self.reader.last = None
+        self.reader.prev = {}
+        self.reader.elements = tuple(s for s in DEV.axis if s.axis)
+        self.reader.struct = get_struct(DEV)
+        self.reader.buf = bytearray(self.reader.size * 4)
+        self.reader.view = memoryview(self.reader.buf)
+
+    def tearDown(self):
+        os.close(self.r)
+        os.close(self.w)
+
+    def test_layout(self):
+        st = get_struct(DEV)
+
+        assert st
+        self.assertEqual(st.size, get_size(DEV))
+        self.assertEqual(st.unpack(scan(1, -2, 3, 4)), (1, -2, 3, 4))
+
+    def test_mixed_endianness(self):
+        dev = DEV._replace(axis=(se("gyro_x", 16), se("gyro_y", 16, endianness="big")))
+        self.assertIsNone(get_struct(dev))
+
+    def test_every_sample_is_emitted(self):
+        os.write(self.w, scan(1, 0, 0, 10) + scan(2, 0, 0, 20) + scan(2, 5, 0, 30))
+
+        evs = self.reader.produce([self.r])
+
+        self.assertEqual(
+            [(e["code"], e["value"]) for e in evs],
+            [
+                ("gyro_x", 2),
+                ("gyro_y", 0),
+                ("gyro_z", 0),
+                ("imu_ts", 10),
+                ("gyro_x", 4),
+                ("imu_ts", 20),
+                ("gyro_y", 5),
+                ("imu_ts", 30),
+            ],
+        )
+
+    def test_batch_limit(self):
+        os.write(self.w, b"".join(scan(i, 0, 0, i) for i in range(6)))
+
+        first = self.reader.produce([self.r])
+        second = self.reader.produce([self.r])
+
+        self.assertEqual(
+            [e["value"] for e in first if e["code"] == "imu_ts"], [0, 1, 2, 3]
+        )
+        self.assertEqual([e["value"] for e in second if e["code"] == "imu_ts"], [4, 5])
+
+    def test_slow_path(self):
+        self.reader.struct = None
+        os.write(self.w, scan(1, 2, 3, 4))
+
+        evs = self.reader.produce([self.r])
+
+        self.assertEqual([e["value"] for e in evs], [2, 2, 3, 4])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import unittest
+
+from hhd.controller.base import Producer
+from hhd.controller.latency import Histogram, LatencyTracer
+from hhd.controller.runtime import ControllerRuntime
+
+
+class Pipe(Producer):
+    def __init__(self) -> None:
+        self.r, self.w = os.pipe()
+
+    def open(self):
+        return [self.r]
+
+    def close(self, exit: bool):
+        os.close(self.r)
+        os.close(self.w)
+        return True
+
+    def produce(self, fds):
+        if self.r not in fds:
+            return []
+        os.read(self.r, 1)
+        return [{"type": "button", "code": "a", "value": True}]
+
+
+class HistogramTest(unittest.TestCase):
+    def test_percentiles(self):
+        h = Histogram()
+        for v in range(1, 1001):
+            h.record(v * 1000)
+
+        self.assertEqual(h.count, 1000)
+        self.assertEqual((h.min, h.max), (1000, 1_000_000))
+        # Within the precision of the buckets
+        self.assertAlmostEqual(h.percentile(50), 500_000, delta=500_000 / 16)
+        self.assertAlmostEqual(h.percentile(99), 990_000, delta=990_000 / 16)
+        self.assertEqual(h.percentile(100), 1_000_000)
+
+    def test_huge_values_are_clamped(self):
+        h = Histogram()
+        h.record(1 << 50)
+
+        self.assertEqual(h.percentile(50), 1 << 50)
+        self.assertEqual(h.summary()["count"], 1)
+
+
+class RuntimeLatencyTest(unittest.TestCase):
+    def test_records_frames_with_input(self):
+        tracer = LatencyTracer(enabled=True)
+        rt = ControllerRuntime(tracer=tracer)
+        p = Pipe()
+        rt.prepare(p)
+
+        try:
+            os.write(p.w, b"\0")
+            rt.step()
+            # Timeouts without input are not recorded
+            rt.consume(rt.process(rt.produce(rt.wait(0))))
+        finally:
+            rt.close(True)
+
+        stages = tracer.summary()["stages"]
+        self.assertEqual(stages["total"]["count"], 1)
+        self.assertGreaterEqual(stages["total"]["max_us"], stages["decode"]["max_us"])
+
+    def test_disabled_records_nothing(self):
+        tracer = LatencyTracer(enabled=False)
+        rt = ControllerRuntime(tracer=tracer)
+        p = Pipe()
+        rt.prepare(p)
+
+        try:
+            os.write(p.w, b"\0")
+            rt.step()
+        finally:
+            rt.close(True)
+
+        self.assertEqual(tracer.summary()["stages"]["total"]["count"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
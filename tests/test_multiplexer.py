@@ -0,0 +1,47 @@
+import unittest
+from unittest.mock import patch
+
+from hhd.controller import Multiplexer
+
+
+class MultiplexerQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.now = [100.0]
+        self.patcher = patch(
+            "hhd.controller.base.time.perf_counter", side_effect=lambda: self.now[0]
+        )
+        self.patcher.start()
+        self.mux = Multiplexer()
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test_out_of_order_events_are_sent_by_deadline(self):
+        self.mux.schedule({"type": "button", "code": "b", "value": True}, 102)
+        self.mux.schedule({"type": "button", "code": "a", "value": True}, 101)
+
+        self.now[0] = 101.5
+        evs = self.mux.process([])
+
+        self.assertEqual([ev["code"] for ev in evs], ["a"])
+        self.assertEqual(self.mux.next_deadline(), 102)
+
+    def test_ties_keep_insertion_order(self):
+        for code in ("a", "b", "c"):
+            self.mux.schedule({"type": "button", "code": code, "value": True}, 101)
+
+        self.now[0] = 102
+        evs = self.mux.process([])
+
+        self.assertEqual([ev["code"] for ev in evs], ["a", "b", "c"])
+        self.assertIsNone(self.mux.next_deadline())
+
+    def test_deadline_includes_qam_hold(self):
+        mux = Multiplexer(qam_button="share")
+        mux.process([{"type": "button", "code": "share", "value": True}])
+
+        self.assertEqual(mux.next_deadline(), 100 + Multiplexer.QAM_HOLD_TIME)
+
+
+if __name__ == "__main__":
+    unittest.main()
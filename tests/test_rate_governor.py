@@ -0,0 +1,64 @@
+import unittest
+
+from hhd.controller.governor import ALIGN_SLACK, RATE_WINDOW, RateGovernor
+
+
+def imu(gyro=0.0):
+    return [
+        {"type": "axis", "code": "gyro_x", "value": gyro},
+        {"type": "axis", "code": "accel_x", "value": 9.8},
+        {"type": "axis", "code": "imu_ts", "value": 0},
+    ]
+
+
+class RateGovernorTest(unittest.TestCase):
+    def setUp(self):
+        self.gov = RateGovernor(25, 400, idle_timeout=5, enabled=True)
+        self.now = self.gov.last_input
+
+    def feed(self, evs, seconds, rate=1000):
+        for _ in range(int(seconds * rate)):
+            self.now += 1 / rate
+            self.gov.update(evs, self.now)
+
+    def test_aligns_to_imu_cadence(self):
+        self.feed(imu(1), RATE_WINDOW + 0.1)
+
+        self.assertAlmostEqual(self.gov.cadence or 0, 1000, delta=50)
+        # 3 samples at 1000 Hz cover the 2.5 ms minimum frame
+        self.assertAlmostEqual(
+            self.gov.delay_min, (3 - ALIGN_SLACK) / self.gov.cadence, places=6
+        )
+
+    def test_slow_imu_keeps_report_rate(self):
+        self.feed(imu(1), RATE_WINDOW + 0.1, rate=100)
+
+        self.assertEqual(self.gov.delay_min, 1 / 400)
+
+    def test_idles_at_rest_and_ramps_up(self):
+        self.feed(imu(0.01), 6, rate=100)
+
+        self.assertTrue(self.gov.idle)
+        self.assertEqual(self.gov.delay_max, 1 / 4)
+        self.assertEqual(self.gov.delay_min, 1 / 60)
+
+        self.gov.update([{"type": "button", "code": "a", "value": True}], self.now)
+
+        self.assertFalse(self.gov.idle)
+        self.assertEqual(self.gov.delay_max, 1 / 25)
+
+    def test_motion_keeps_active(self):
+        self.feed(imu(1), 6, rate=100)
+
+        self.assertFalse(self.gov.idle)
+
+    def test_timed_work_counts_as_input(self):
+        self.feed(imu(0.01), 4, rate=100)
+        self.gov.busy(self.now)
+        self.feed(imu(0.01), 4, rate=100)
+
+        self.assertFalse(self.gov.idle)
+
+
+if __name__ == "__main__":
+    unittest.main()
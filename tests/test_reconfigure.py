@@ -0,0 +1,123 @@
+import unittest
+
+from hhd.controller import Consumer, LiveConfig, Multiplexer
+from hhd.controller.runtime import ControllerRuntime
+from hhd.plugins.conf import Config, keys_within
+
+
+class MultiplexerReconfigureTest(unittest.TestCase):
+    def test_swap_guide(self):
+        mux = Multiplexer()
+        mux.reconfigure(swap_guide="select_is_guide")
+
+        evs = mux.process([{"type": "button", "code": "start", "value": True}])
+
+        self.assertEqual([ev["code"] for ev in evs], ["share"])
+
+    def test_reboot_button(self):
+        mux = Multiplexer(select_reboots=True)
+        self.assertEqual(mux.reboot_button, "select")
+
+        mux.reconfigure(select_reboots=False)
+
+        self.assertIsNone(mux.reboot_button)
+
+    def test_releases_buttons_held_across_toggle(self):
+        mux = Multiplexer()
+        evs = mux.process([{"type": "button", "code": "a", "value": True}])
+        self.assertEqual([(ev["code"], ev["value"]) for ev in evs], [("a", True)])
+
+        mux.reconfigure(nintendo_mode=True)
+        evs = mux.process([{"type": "button", "code": "a", "value": False}])
+
+        btns = [(ev["code"], ev["value"]) for ev in evs if ev["type"] == "button"]
+        self.assertIn(("a", False), btns)
+        self.assertEqual(mux.held, set())
+
+    def test_runtime_releases_through_consumers(self):
+        class Recorder(Consumer):
+            def __init__(self) -> None:
+                self.evs = []
+
+            def consume(self, events):
+                self.evs.extend(events)
+
+        out = Recorder()
+        rt = ControllerRuntime(Multiplexer())
+        rt.attach(out)
+        rt.consume(rt.process([{"type": "button", "code": "extra_l1", "value": True}]))
+
+        rt.release()
+        rt.close(True)
+
+        self.assertEqual(
+            out.evs[-1], {"type": "button", "code": "extra_l1", "value": False}
+        )
+
+    def test_rejects_capabilities(self):
+        with self.assertRaises(TypeError):
+            Multiplexer().reconfigure(params={})
+
+
+class ConfigDiffTest(unittest.TestCase):
+    def test_changed_keys(self):
+        a = Config({"mode": {"mode": "dualsense", "dualsense": {"flip_z": False}}})
+        b = a.copy()
+        b["mode.dualsense.flip_z"] = True
+        b["imu_axis"] = "xyz"
+
+        changed = a.diff(b)
+
+        self.assertEqual(changed, {"mode.dualsense.flip_z", "imu_axis"})
+        self.assertTrue(keys_within(changed, ["mode.dualsense", "imu_axis"]))
+        self.assertFalse(keys_within(changed, ["mode.dualsense.sync_gyro"]))
+
+
+class LegionGoHotKeysTest(unittest.TestCase):
+    def test_tablet(self):
+        from hhd.device.legion_go.tablet.base import HOT_KEYS
+
+        hot = {"touchpad.emulation.hold", "xinput.dualsense.paddles_as"}
+        self.assertTrue(keys_within(hot, HOT_KEYS))
+        # Changes the virtual devices
+        self.assertFalse(keys_within({"touchpad.mode"}, HOT_KEYS))
+
+    def test_slim(self):
+        from hhd.device.legion_go.slim.base import HOT_KEYS
+
+        hot = {"swap_legion", "xinput.uinput.paddles_as"}
+        self.assertTrue(keys_within(hot, HOT_KEYS))
+        self.assertFalse(keys_within({"touchpad"}, HOT_KEYS))
+
+
+class LiveConfigTest(unittest.TestCase):
+    def test_runs_on_loop(self):
+        rt = ControllerRuntime()
+        live = LiveConfig()
+        applied = []
+
+        def handler(conf, changed):
+            rt.post(lambda: applied.append(conf))
+            return True
+
+        self.assertFalse(live.apply("a", {"x"}))
+        live.attach(handler)
+        self.assertTrue(live.apply("b", {"x"}))
+        self.assertEqual(applied, [])
+
+        rt.wait(0)
+        self.assertEqual(applied, ["b"])
+
+        live.detach()
+        rt.close(True)
+        self.assertFalse(live.apply("c", {"x"}))
+
+    def test_errors_restart(self):
+        live = LiveConfig()
+        live.attach(lambda conf, changed: 1 / 0)
+
+        self.assertFalse(live.apply({}, set()))
+
+
+if __name__ == "__main__":
+    unittest.main()
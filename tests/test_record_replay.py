@@ -0,0 +1,110 @@
+import os
+import struct
+import tempfile
+import unittest
+
+from hhd.controller.lib.common import BM
+from hhd.controller.lib.record import (
+    RawInputEvent,
+    Recorder,
+    ReplayProducer,
+    pack_input_events,
+    read_log,
+)
+from hhd.controller.physical.evdev import B, GenericGamepadEvdev
+from hhd.controller.physical.hidraw import GenericGamepadHidraw
+from hhd.controller.physical.imu import IioReader, ScanElement
+from hhd.controller.runtime import ControllerRuntime
+
+
+def se(axis, bits, scale=1.0):
+    return ScanElement(axis, "little", True, bits, bits, 0, scale, 0, None)
+
+
+class RecordReplayTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.fn = os.path.join(self.dir.name, "log.hhdrec")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def record(self, kind, meta, reads):
+        rec = Recorder(self.fn, kind, meta)
+        for i, data in enumerate(reads):
+            rec.write(data, ts=1000 * (i + 1))
+        rec.close()
+
+    def test_log_roundtrip(self):
+        self.record("hidraw", {"product_id": 1}, [b"\x01\x02", b""])
+        with open(self.fn, "ab") as f:
+            # Partial write at the end of a capture
+            f.write(b"\x00" * 5)
+
+        kind, meta, records = read_log(self.fn)
+
+        self.assertEqual((kind, meta), ("hidraw", {"product_id": 1}))
+        self.assertEqual(records, [(1000, b"\x01\x02"), (2000, b"")])
+
+    def test_hidraw_through_runtime(self):
+        self.record("hidraw", {}, [bytes([0, 0, 1, 0b01]), bytes([0, 0, 1, 0b10])])
+        d = GenericGamepadHidraw(
+            btn_map={1: {"a": BM(3 << 3, flipped=True), "b": BM((3 << 3) + 6)}},
+            report_size=4,
+        )
+        replay = ReplayProducer(self.fn, d, realtime=False)
+        rt = ControllerRuntime()
+        rt.prepare(replay)
+        rt.always_produce(replay)
+
+        try:
+            evs = [ev for _ in range(3) for ev in rt.produce(rt.wait(0))]
+        finally:
+            rt.close(True)
+
+        self.assertTrue(replay.done)
+        self.assertEqual(
+            [(ev["code"], ev["value"]) for ev in evs],
+            [("a", True), ("b", False), ("b", True)],
+        )
+
+    def test_evdev(self):
+        raw = [
+            RawInputEvent(B("EV_KEY"), B("BTN_SOUTH"), 1),
+            RawInputEvent(B("EV_ABS"), B("ABS_X"), -16384),
+            RawInputEvent(0, 0, 0),
+        ]
+        ranges = [(B("ABS_X"), (-32768, 32767))]
+        self.record("evdev", {"ranges": ranges}, [pack_input_events(raw)])
+        d = GenericGamepadEvdev([], [], postprocess={})
+        replay = ReplayProducer(self.fn, d, realtime=False)
+        replay.open()
+
+        evs = replay.produce([])
+
+        self.assertEqual(
+            evs,
+            [
+                {"type": "button", "code": "a", "value": True},
+                {"type": "axis", "code": "ls_x", "value": -0.5},
+            ],
+        )
+
+    def test_iio_kind_mismatch(self):
+        axis = [se("gyro_x", 16, scale=0.5)._asdict(), se("imu_ts", 64)._asdict()]
+        self.record("iio", {"dev": "", "axis": axis}, [struct.pack("<h6xq", 4, 7)])
+
+        with self.assertRaises(ValueError):
+            ReplayProducer(self.fn, GenericGamepadHidraw()).open()
+
+        replay = ReplayProducer(self.fn, IioReader([], [], None, None, {}))
+        replay.open()
+        evs = replay.produce([])
+
+        self.assertEqual(
+            [(ev["code"], ev["value"]) for ev in evs], [("gyro_x", 2.0), ("imu_ts", 7)]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,162 @@
+import os
+import unittest
+from unittest.mock import Mock, patch
+
+from hhd.controller import runtime
+from hhd.controller.base import Consumer, Producer, can_read
+from hhd.controller.physical.hidraw import GenericGamepadHidraw
+from hhd.controller.runtime import ControllerRuntime
+from hhd.controller.virtual.uinput import UInputDevice
+
+
+class Pipe(Producer):
+    def __init__(self) -> None:
+        self.r, self.w = os.pipe()
+        self.suspends = 0
+
+    def open(self):
+        return [self.r]
+
+    def close(self, exit: bool):
+        os.close(self.r)
+        os.close(self.w)
+        return True
+
+    def suspend(self):
+        self.suspends += 1
+
+
+class Virtual(Pipe, Consumer):
+    def __init__(self) -> None:
+        super().__init__()
+        self.available = True
+
+
+class PipeDevice:
+    def __init__(self) -> None:
+        self.fd, self.w = os.pipe()
+
+    def readinto(self, buf):
+        return os.readv(self.fd, (buf,))
+
+
+class RuntimeSuspendTest(unittest.TestCase):
+    def setUp(self):
+        self.patcher = patch.object(runtime, "SUSPEND_DELAY", 0)
+        self.patcher.start()
+
+        self.rt = ControllerRuntime()
+        self.phys = Pipe()
+        self.out = Virtual()
+        self.rt.prepare(self.phys)
+        self.rt.prepare(self.out)
+        self.rt.attach(self.out)
+        self.rt.allow_suspend(self.phys)
+
+    def tearDown(self):
+        self.rt.close(True)
+        self.patcher.stop()
+
+    def test_suspends_without_clients(self):
+        self.out.available = False
+        self.rt.check_available()
+        self.assertFalse(self.rt.suspended)
+        self.rt.check_available()
+
+        self.assertEqual(self.phys.suspends, 1)
+        self.assertNotIn(self.phys.r, self.rt.fd_to_dev)
+        self.assertIn(self.out.r, self.rt.fd_to_dev)
+        os.write(self.phys.w, b"\0")
+        self.assertEqual(self.rt.wait(0), [])
+
+        self.out.available = True
+        self.rt.check_available()
+
+        self.assertFalse(self.rt.suspended)
+        self.assertEqual(self.rt.wait(0), [self.phys.r])
+
+    def test_consumers_without_availability_are_ignored(self):
+        # e.g., a physical gamepad receiving rumble
+        self.rt.attach(Consumer())
+        self.out.available = False
+
+        self.rt.check_available()
+        self.rt.check_available()
+
+        self.assertTrue(self.rt.suspended)
+
+    def test_unmarked_producers_keep_polling(self):
+        # e.g., the vendor devices with the shortcut buttons
+        shortcuts = Pipe()
+        self.rt.prepare(shortcuts)
+        self.out.available = False
+
+        self.rt.check_available()
+        self.rt.check_available()
+
+        self.assertTrue(self.rt.suspended)
+        self.assertEqual(shortcuts.suspends, 0)
+        os.write(shortcuts.w, b"\0")
+        self.assertEqual(self.rt.wait(0), [shortcuts.r])
+
+    def test_unprepared_producers_are_suspended(self):
+        # e.g., a software trigger
+        trig = Pipe()
+        self.rt.allow_suspend(trig)
+        self.out.available = False
+
+        self.rt.check_available()
+        self.rt.check_available()
+
+        self.assertEqual(trig.suspends, 1)
+        self.out.available = True
+        self.rt.check_available()
+        self.assertNotIn(trig.r, self.rt.fd_to_dev)
+        trig.close(True)
+
+    def test_uinput_side_devices_are_ignored(self):
+        # e.g., the volume keyboard
+        self.rt.attach(UInputDevice())
+        self.out.available = False
+
+        self.rt.check_available()
+        self.rt.check_available()
+
+        self.assertTrue(self.rt.suspended)
+
+    def test_blocks_while_suspended(self):
+        self.rt.epoll = Mock(wraps=self.rt.epoll)
+        self.rt.wait()
+        self.assertEqual(
+            self.rt.epoll.poll.call_args.args, (self.rt.governor.delay_max,)
+        )
+
+        self.out.available = False
+        self.rt.check_available()
+        self.rt.check_available()
+        os.write(self.out.w, b"\0")
+
+        self.assertEqual(self.rt.wait(), [self.out.r])
+        self.assertEqual(self.rt.epoll.poll.call_args.args, (-1,))
+
+
+class HidrawResumeTest(unittest.TestCase):
+    def test_resume_discards_queued_reports(self):
+        d = GenericGamepadHidraw()
+        d.setup_decode()
+        dev = PipeDevice()
+        d.dev = dev  # type: ignore
+        d.fd = dev.fd
+        try:
+            for _ in range(3):
+                os.write(dev.w, bytes(64))
+
+            self.assertIsNone(d.resume())
+            self.assertFalse(can_read(dev.fd))
+        finally:
+            os.close(dev.fd)
+            os.close(dev.w)
+
+
+if __name__ == "__main__":
+    unittest.main()
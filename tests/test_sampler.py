@@ -0,0 +1,85 @@
+import select
+import time
+import unittest
+
+from hhd.controller.lib.sampler import Sampler, TimerFd
+
+
+class SamplerTest(unittest.TestCase):
+    def setUp(self):
+        self.sampler = Sampler()
+
+    def test_timerfd_absolute_deadline(self):
+        timer = TimerFd()
+        try:
+            timer.arm(time.monotonic_ns() + 20_000_000)
+            self.assertFalse(select.select([timer.fd], [], [], 0)[0])
+            self.assertTrue(select.select([timer.fd], [], [], 1)[0])
+        finally:
+            timer.close()
+
+    def test_tasks_share_a_thread(self):
+        calls = {"a": 0, "b": 0}
+
+        def inc(k):
+            calls[k] += 1
+
+        a = self.sampler.add(lambda: inc("a"), 200)
+        b = self.sampler.add(lambda: inc("b"), 100)
+        thread = self.sampler.thread
+        time.sleep(0.2)
+        a.close()
+        b.close()
+        done = dict(calls)
+        time.sleep(0.03)
+
+        self.assertEqual(calls, done)
+        # Loose bounds, the test machine may be loaded
+        self.assertGreater(calls["a"], 20)
+        self.assertGreater(calls["b"], 10)
+        self.assertGreater(calls["a"], calls["b"])
+
+        stats = a.jitter()
+        self.assertEqual(stats.samples, calls["a"] - 1)
+        self.assertAlmostEqual(stats.period, 0.005)
+
+        assert thread
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+        self.assertIsNone(self.sampler.thread)
+
+    def test_resume_closed_task(self):
+        calls = []
+        task = self.sampler.add(lambda: calls.append(1), 200)
+        task.close()
+        time.sleep(0.03)
+        self.assertEqual(calls, [])
+
+        task.resume()
+        task.resume()
+        time.sleep(0.05)
+        task.close()
+
+        self.assertGreater(len(calls), 2)
+        self.assertEqual(self.sampler.tasks, [])
+
+    def test_failing_task_is_removed(self):
+        def fail():
+            raise RuntimeError()
+
+        self.sampler.add(fail, 500)
+        time.sleep(0.05)
+
+        self.assertEqual(self.sampler.tasks, [])
+
+    def test_jitter_reset(self):
+        task = self.sampler.add(lambda: None, 1000)
+        time.sleep(0.05)
+        task.close()
+
+        self.assertGreater(task.jitter(reset=True).samples, 0)
+        self.assertEqual(task.jitter().samples, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import socket
+import struct
+import unittest
+
+from hhd.controller.lib.uhid import (
+    UHID_DATA_MAX,
+    UHID_GET_REPORT,
+    UHID_OPEN,
+    UHID_OUTPUT,
+    UHID_READ_SIZE,
+    UHID_SET_REPORT,
+    UhidDevice,
+)
+
+
+def event(type: int, body: bytes = b""):
+    return (struct.pack("=L", type) + body).ljust(UHID_READ_SIZE, b"\0")
+
+
+def output(data: bytes, rtype: int = 1):
+    return (
+        struct.pack("=L", UHID_OUTPUT)
+        + data.ljust(UHID_DATA_MAX, b"\0")
+        + (struct.pack("=HB", len(data), rtype))
+    )
+
+
+class UhidEventsTest(unittest.TestCase):
+    def setUp(self):
+        # Keeps message boundaries, like the uhid character device
+        self.kernel, dev = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        dev.setblocking(False)
+        self.sock = dev
+        self.dev = UhidDevice(0x054C, 0x0CE6, b"test", b"")
+        self.dev.fd = dev.fileno()
+
+    def tearDown(self):
+        self.dev.fd = 0
+        self.sock.close()
+        self.kernel.close()
+
+    def test_read_all_pending(self):
+        self.kernel.send(event(UHID_OPEN))
+        self.kernel.send(output(b"\x02\x01\xff"))
+        self.kernel.send(event(UHID_GET_REPORT, struct.pack("=LBB", 7, 0x83, 0)))
+        self.kernel.send(
+            event(UHID_SET_REPORT, struct.pack("=LBBH", 8, 0x01, 2, 2) + b"\x01\x87")
+        )
+
+        evs = self.dev.read_events()
+
+        self.assertEqual(
+            [e["type"] for e in evs], ["open", "output", "get_report", "set_report"]
+        )
+        self.assertEqual(
+            evs[1], {"type": "output", "report": 1, "data": b"\x02\x01\xff"}
+        )
+        self.assertEqual(
+            evs[2], {"type": "get_report", "id": 7, "rnum": 0x83, "rtype": 0}
+        )
+        self.assertEqual(evs[3]["id"], 8)  # type: ignore
+        # Data starts with the size, which existing users expect
+        self.assertEqual(evs[3]["data"][:4], b"\x02\x00\x01\x87")  # type: ignore
+        self.assertEqual(self.dev.read_events(), [])
+
+    def test_events_do_not_share_the_buffer(self):
+        self.kernel.send(output(b"\x02\xaa"))
+        self.kernel.send(output(b"\x02\xbb"))
+
+        first, second = self.dev.read_events()
+
+        self.assertEqual(first["data"], b"\x02\xaa")  # type: ignore
+        self.assertEqual(second["data"], b"\x02\xbb")  # type: ignore
+
+    def test_read_event(self):
+        self.assertIsNone(self.dev.read_event())
+        self.kernel.send(event(UHID_OPEN))
+        self.assertEqual(self.dev.read_event(), {"type": "open"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from hhd.controller.base import can_read
+from hhd.controller.virtual import uinput
+from hhd.controller.virtual.uinput import (
+    EV_ABS,
+    EV_KEY,
+    EV_MSC,
+    EV_SYN,
+    INPUT_EVENT,
+    MOTION_AXIS_MAP,
+    MOTION_CAPABILITIES,
+    MSC_TIMESTAMP,
+    SYN_REPORT,
+    InputFrame,
+    UInputDevice,
+)
+
+
+class FakeUInput:
+    def __init__(self, **_) -> None:
+        self.r, self.fd = os.pipe()
+
+    def close(self):
+        os.close(self.r)
+        os.close(self.fd)
+
+
+class InputFrameTest(unittest.TestCase):
+    def setUp(self):
+        self.r, self.w = os.pipe()
+
+    def tearDown(self):
+        os.close(self.r)
+        os.close(self.w)
+
+    def read(self):
+        data = os.read(self.r, 4096)
+        return [ev[2:] for ev in INPUT_EVENT.iter_unpack(data)]
+
+    def test_single_write(self):
+        frame = InputFrame(size=1)
+        frame.write(EV_ABS, 3, -5)
+        frame.write(EV_KEY, 304, 1)
+        frame.syn()
+        frame.flush(self.w)
+
+        self.assertEqual(
+            self.read(), [(EV_ABS, 3, -5), (EV_KEY, 304, 1), (EV_SYN, SYN_REPORT, 0)]
+        )
+
+        # Empty frames are not written
+        frame.flush(self.w)
+        self.assertEqual(frame.ofs, 0)
+
+
+class UInputConsumeTest(unittest.TestCase):
+    def setUp(self):
+        self.patcher = patch.object(uinput, "UInputMonkey", FakeUInput)
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def read(self, dev):
+        data = os.read(dev.dev.r, 4096)
+        return [ev[2:] for ev in INPUT_EVENT.iter_unpack(data)]
+
+    def test_motion_frame(self):
+        d = UInputDevice(
+            capabilities=MOTION_CAPABILITIES,
+            btn_map={},
+            axis_map=MOTION_AXIS_MAP,
+            output_imu_timestamps=True,
+            ignore_cmds=True,
+        )
+        d.open()
+        try:
+            d.consume(
+                [
+                    {"type": "axis", "code": "gyro_x", "value": 0.5},
+                    {"type": "axis", "code": "accel_x", "value": 0.25},
+                    {"type": "axis", "code": "imu_ts", "value": 5_000_000},
+                ]
+            )
+            evs = self.read(d)
+        finally:
+            d.close(True)
+
+        # Written in reverse, the latest value of each axis wins
+        self.assertEqual(evs[0], (EV_MSC, MSC_TIMESTAMP, 5000))
+        self.assertEqual([e[0] for e in evs[1:-1]], [EV_ABS, EV_ABS])
+        self.assertEqual(evs[-1], (EV_SYN, SYN_REPORT, 0))
+
+    def test_reconfigure_releases_remapped_buttons(self):
+        d = UInputDevice(btn_map={"a": 304, "b": 305, "x": 307})
+        d.open()
+        try:
+            self.assertTrue(
+                d.reconfigure(UInputDevice(btn_map={"a": 305, "b": 304, "x": 307}))
+            )
+            evs = self.read(d)
+
+            self.assertTrue(d.reconfigure(UInputDevice(btn_map=d.btn_map)))
+            self.assertFalse(can_read(d.dev.r))
+        finally:
+            d.close(True)
+
+        self.assertEqual(
+            evs, [(EV_KEY, 304, 0), (EV_KEY, 305, 0), (EV_SYN, SYN_REPORT, 0)]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
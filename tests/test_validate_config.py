@@ -0,0 +1,69 @@
+import unittest
+
+from hhd.plugins.conf import Config
+from hhd.plugins.settings import get_options, validate_config
+
+SETTINGS = {
+    "tdp": {
+        "unified": {
+            "type": "container",
+            "children": {
+                "tdp": {"type": "int", "default": 15, "min": 5, "max": 30},
+                "boost": {"type": "bool", "default": True},
+                "mode": {
+                    "type": "discrete",
+                    "default": "balanced",
+                    "options": ["quiet", "balanced"],
+                },
+            },
+        }
+    }
+}
+
+
+def validator(tags, config, value):
+    return False
+
+
+class ValidateConfigTest(unittest.TestCase):
+    def setUp(self):
+        self.conf = Config({"tdp.unified": {"tdp": 50, "mode": "turbo"}})
+
+    def test_full_pass(self):
+        validate_config(self.conf, SETTINGS, validator)
+
+        self.assertEqual(
+            self.conf["tdp.unified"].conf,
+            {"tdp": 30, "boost": True, "mode": "balanced"},
+        )
+
+    def test_only_dirty_keys(self):
+        # Fixed values are rechecked once
+        validate_config(self.conf, SETTINGS, validator)
+        validate_config(self.conf, SETTINGS, validator)
+        self.assertEqual(self.conf.take_dirty(), set())
+
+        # Values replaced without writing to them are not rechecked
+        self.conf._replace({"tdp": {"unified": {"tdp": 50, "mode": "turbo"}}})
+        self.conf["tdp.unified.tdp"] = 1
+        validate_config(self.conf, SETTINGS, validator)
+        self.assertEqual(self.conf["tdp.unified"].conf, {"tdp": 5, "mode": "turbo"})
+
+        self.conf["tdp.unified"] = {"boost": 0}
+        validate_config(self.conf, SETTINGS, validator)
+        self.assertEqual(
+            self.conf["tdp.unified"].conf,
+            {"tdp": 5, "boost": False, "mode": "balanced"},
+        )
+
+    def test_options_are_cached(self):
+        self.assertIs(get_options(SETTINGS), get_options(SETTINGS))
+        options, prefixes = get_options(SETTINGS, "hash")
+        self.assertEqual(
+            prefixes[("tdp", "unified")],
+            ["tdp.unified.tdp", "tdp.unified.boost", "tdp.unified.mode"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()